@@ -7,9 +7,12 @@ from .models import (
     Asset,
     Liability,
     Transaction,
+    MonthlyTransactionRollup,
     RetirementAccount,
     Investment,
     CreditScore,
+    Conversation,
+    ChatMessage,
 )
 
 @admin.register(CustomUser)
@@ -23,7 +26,7 @@ class UserProfileAdmin(admin.ModelAdmin):
 
 @admin.register(Document)
 class DocumentAdmin(admin.ModelAdmin):
-    list_display = ["uploader", "filename", "upload_date", "category", "title", "author"]
+    list_display = ["uploader", "filename", "upload_date", "status", "size", "category", "title", "author"]
 
 @admin.register(Asset)
 class AssetAdmin(admin.ModelAdmin):
@@ -37,6 +40,10 @@ class LiabilityAdmin(admin.ModelAdmin):
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ["user", "description", "amount", "transaction_type", "category", "date", "created_at"]
 
+@admin.register(MonthlyTransactionRollup)
+class MonthlyTransactionRollupAdmin(admin.ModelAdmin):
+    list_display = ["user", "month", "category", "transaction_type", "total_amount", "transaction_count"]
+
 @admin.register(RetirementAccount)
 class RetirementAccountAdmin(admin.ModelAdmin):
     list_display = ["user", "account_name", "current_balance", "employee_contribution", "employer_contribution", "last_updated"]
@@ -47,4 +54,12 @@ class InvestmentAdmin(admin.ModelAdmin):
 
 @admin.register(CreditScore)
 class CreditScoreAdmin(admin.ModelAdmin):
-    list_display = ["user", "score", "last_updated"]
\ No newline at end of file
+    list_display = ["user", "score", "last_updated"]
+
+@admin.register(Conversation)
+class ConversationAdmin(admin.ModelAdmin):
+    list_display = ["id", "user", "created_at"]
+
+@admin.register(ChatMessage)
+class ChatMessageAdmin(admin.ModelAdmin):
+    list_display = ["conversation", "role", "content", "created_at"]
\ No newline at end of file
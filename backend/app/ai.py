@@ -0,0 +1,172 @@
+"""
+OpenRouter chat-completions client. Sync and async variants share request
+building and response parsing. The chat prompt itself is built by
+app/context_builder.py.
+"""
+import json
+import logging
+
+import httpx
+import requests
+from django.conf import settings
+
+from . import metrics
+from .clients import error_reason, get_async_client, get_http_session, get_timeout
+from .profiling import span
+
+logger = logging.getLogger(__name__)
+
+NOT_CONFIGURED_REPLY = "Error: OPENROUTER_API_KEY is not configured on the server."
+UNEXPECTED_REPLY = "Sorry, I received an unexpected response from the AI. Please try again."
+CONNECTION_ERROR_REPLY = "Sorry, I'm having trouble connecting to the AI service right now."
+ERROR_REPLIES = frozenset({NOT_CONFIGURED_REPLY, UNEXPECTED_REPLY, CONNECTION_ERROR_REPLY})
+
+
+def build_summary_prompt(previous_summary: str, messages: list) -> str:
+    """Builds the prompt that folds older conversation turns into a rolling summary."""
+    return f"""
+        Summarize the conversation below between a user and their AI personal finance assistant in at most 150 words.
+        Keep every figure, decision and open question. Merge it with the existing summary, if any.
+        ---
+        EXISTING SUMMARY
+        {previous_summary or "(none)"}
+        ---
+        MESSAGES TO ADD
+        {json.dumps(messages, separators=(',', ':'))}
+        """
+
+
+def build_document_summary_prompt(filename: str, excerpt: str) -> str:
+    """Builds the prompt that summarizes the beginning of an uploaded document."""
+    return f"""
+        Summarize the document below, uploaded by a user of a personal finance app, in at most 80 words.
+        Say what kind of document it is and keep the key figures and dates. Reply with the summary only.
+        ---
+        FILE NAME: {filename}
+        ---
+        {excerpt}
+        """
+
+
+def _build_request(prompt: str):
+    headers = {
+        "Authorization": f"Bearer {settings.OPENROUTER_API_KEY}",
+        "Content-Type": "application/json",
+    }
+    payload = {
+        "model": settings.OPENROUTER_MODEL,
+        "messages": [{"role": "user", "content": prompt}],
+    }
+    return headers, payload
+
+
+def _extract_reply(result: dict) -> str:
+    """Safely extracts the assistant text from a chat-completions response, recording its token usage."""
+    usage = result.get("usage") if isinstance(result, dict) else None
+    if isinstance(usage, dict):
+        for kind in ("prompt", "completion"):
+            if isinstance(usage.get(f"{kind}_tokens"), int):
+                metrics.llm_tokens.observe(usage[f"{kind}_tokens"], kind=kind)
+    choices = result.get("choices") if isinstance(result, dict) else None
+    if choices and isinstance(choices[0], dict):
+        content = (choices[0].get("message") or {}).get("content")
+        if content:
+            return content
+    metrics.upstream_errors.inc(upstream='llm', reason='unexpected_response')
+    return UNEXPECTED_REPLY
+
+
+def _record_error(error: Exception, action: str):
+    metrics.upstream_errors.inc(upstream='llm', reason=error_reason(error))
+    logger.warning("OpenRouter API %s failed: %s", action, error)
+
+
+def call_openrouter_api(prompt: str) -> str:
+    """
+    Calls the OpenRouter API with the provided prompt and financial data.
+    """
+    if not settings.OPENROUTER_API_KEY:
+        return NOT_CONFIGURED_REPLY
+
+    headers, payload = _build_request(prompt)
+    try:
+        with span('llm'), metrics.upstream_duration.time(upstream='llm'):
+            response = get_http_session().post(
+                settings.OPENROUTER_API_URL, headers=headers, json=payload, timeout=get_timeout()
+            )
+        response.raise_for_status()  # Raise an exception for HTTP errors
+        return _extract_reply(response.json())
+    except (requests.exceptions.RequestException, ValueError) as e:
+        _record_error(e, "call")
+        return CONNECTION_ERROR_REPLY
+
+
+async def acall_openrouter_api(prompt: str) -> str:
+    """
+    Async counterpart of call_openrouter_api using the pooled httpx client.
+    """
+    if not settings.OPENROUTER_API_KEY:
+        return NOT_CONFIGURED_REPLY
+
+    headers, payload = _build_request(prompt)
+    try:
+        with span('llm'), metrics.upstream_duration.time(upstream='llm'):
+            response = await get_async_client().post(settings.OPENROUTER_API_URL, headers=headers, json=payload)
+        response.raise_for_status()
+        return _extract_reply(response.json())
+    except (httpx.HTTPError, ValueError) as e:
+        _record_error(e, "call")
+        return CONNECTION_ERROR_REPLY
+
+
+def _stream_delta(line: str):
+    """
+    Parses one server-sent-events line from a streamed completion.
+    Returns the text delta, '' for lines without content, or None at [DONE].
+    """
+    if not line.startswith("data:"):
+        return ""  # Blank separators and keep-alive comments.
+    data = line[len("data:"):].strip()
+    if data == "[DONE]":
+        return None
+    try:
+        choices = json.loads(data).get("choices") or []
+    except (ValueError, AttributeError):
+        return ""
+    if not choices or not isinstance(choices[0], dict):
+        return ""
+    return (choices[0].get("delta") or {}).get("content") or ""
+
+
+async def astream_openrouter_api(prompt: str):
+    """
+    Streams the reply for a prompt, yielding text chunks as OpenRouter produces them.
+    Failures are yielded as the same user-facing error replies call_openrouter_api returns.
+    """
+    if not settings.OPENROUTER_API_KEY:
+        yield NOT_CONFIGURED_REPLY
+        return
+
+    headers, payload = _build_request(prompt)
+    payload["stream"] = True
+    received = False
+    try:
+        async with get_async_client().stream(
+            "POST", settings.OPENROUTER_API_URL, headers=headers, json=payload
+        ) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                delta = _stream_delta(line)
+                if delta is None:
+                    break
+                if delta:
+                    received = True
+                    yield delta
+    except httpx.HTTPError as e:
+        _record_error(e, "stream")
+        yield CONNECTION_ERROR_REPLY
+        return
+
+    if not received:
+        metrics.upstream_errors.inc(upstream='llm', reason='unexpected_response')
+        yield UNEXPECTED_REPLY
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from . import authentication  # noqa: F401  (registers the token cache check)
+        from . import net_worth  # noqa: F401  (registers the net worth cache check)
+        from . import signals  # noqa: F401  (connects the signal handlers)
@@ -0,0 +1,179 @@
+"""
+Token authentication with a cached token-to-user lookup.
+
+DRF's TokenAuthentication reads the Token row (joined to its user) on every
+request. CachedTokenAuthentication keeps that lookup in the TOKEN_AUTH_CACHE_ALIAS
+cache for TOKEN_AUTH_CACHE_TTL seconds, so repeat requests with the same token
+cost no query.
+
+Deleting a token (logout, rotation, expiry, deleting the user) replaces its
+entry with a revocation marker that outlives any copy of the lookup, so a
+revoked token is rejected from the next request on, even if a concurrent
+request was caching it at the time. That only reaches every worker through a
+shared cache (TOKEN_AUTH_CACHE_STORAGE=db, Redis, Memcached); the per-process
+default is for development, and `manage.py check --deploy` fails on it with
+DEBUG off (check_token_cache).
+Saving a user drops the cached lookups of their tokens, so deactivation
+applies at once. Tokens older than TOKEN_EXPIRY seconds, if set, are rejected
+and deleted.
+
+The chat and permission endpoints are plain Django views; token_auth gives
+them the same token authentication as the DRF views.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import transaction
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .metrics import CacheStatsMixin
+
+REVOKED = 'revoked'
+
+
+class TokenCache(CacheStatsMixin):
+    """{token key: (user, token created at)} in a Django cache, with hit/miss counters."""
+
+    STATS = ('hits', 'misses', 'revoked')
+
+    @staticmethod
+    def _cache():
+        return caches[settings.TOKEN_AUTH_CACHE_ALIAS]
+
+    @staticmethod
+    def _key(token_key: str) -> str:
+        # Hashed so token values never appear in cache keys (or a shared cache's key listing).
+        return 'auth-token:' + hashlib.sha256(token_key.encode()).hexdigest()
+
+    def get(self, token_key: str):
+        """(user, created) for a valid token key; raises AuthenticationFailed otherwise."""
+        ttl = settings.TOKEN_AUTH_CACHE_TTL
+        entry = self._cache().get(self._key(token_key)) if ttl else None
+        if entry == REVOKED:
+            self._count('revoked')
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        if entry is not None:
+            self._count('hits')
+            return entry
+
+        self._count('misses')
+        try:
+            token = Token.objects.select_related('user').get(key=token_key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed('Invalid token.')
+        entry = (token.user, token.created)
+        if ttl:
+            # add() rather than set(): a revocation marker written meanwhile must win.
+            self._cache().add(self._key(token_key), entry, ttl)
+        return entry
+
+    def revoke(self, token_key: str):
+        """Rejects the token from now on, whether or not it was cached."""
+        ttl = settings.TOKEN_AUTH_CACHE_TTL
+        if ttl:
+            self._cache().set(self._key(token_key), REVOKED, ttl * 2)
+
+    def invalidate(self, token_key: str):
+        """Drops the cached lookup of a still-valid token, so the next request re-reads it."""
+        self._cache().delete(self._key(token_key))
+
+
+token_cache = TokenCache()
+
+
+def token_expired(created) -> bool:
+    return bool(settings.TOKEN_EXPIRY) and timezone.now() - created > timedelta(seconds=settings.TOKEN_EXPIRY)
+
+
+def issue_token(user) -> Token:
+    """The user's current token, replacing it first if it has expired."""
+    token, created = Token.objects.get_or_create(user=user)
+    if not created and token_expired(token.created):
+        token = rotate_token(user)
+    return token
+
+
+def rotate_token(user) -> Token:
+    """Deletes the user's token (revoking it) and issues a new one."""
+    with transaction.atomic():
+        Token.objects.filter(user=user).delete()  # The post_delete signal revokes the old key.
+        return Token.objects.create(user=user)
+
+
+PER_PROCESS_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_token_cache(app_configs=None, **kwargs):
+    """Token revocations must reach every worker: reject a per-process cache outside DEBUG."""
+    if settings.DEBUG or not settings.TOKEN_AUTH_CACHE_TTL:
+        return []
+    backend = settings.CACHES.get(settings.TOKEN_AUTH_CACHE_ALIAS, {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [checks.Error(
+        f"TOKEN_AUTH_CACHE_ALIAS '{settings.TOKEN_AUTH_CACHE_ALIAS}' uses {backend.rsplit('.', 1)[-1]}, "
+        "which is not shared between workers, so a revoked token stays valid in the others.",
+        hint="Set TOKEN_AUTH_CACHE_STORAGE=db and run `python manage.py createcachetable`, "
+             "or point the alias at Redis/Memcached.",
+        id='app.E001',
+    )]
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication reading the token through token_cache and enforcing TOKEN_EXPIRY."""
+
+    def authenticate_credentials(self, key):
+        user, created = token_cache.get(key)
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed('User inactive or deleted.')
+        if token_expired(created):
+            Token.objects.filter(key=key).delete()
+            raise exceptions.AuthenticationFailed('Token has expired.')
+        return user, Token(key=key, user=user, created=created)
+
+
+def token_auth(view):
+    """
+    Authenticates a plain Django view (sync or async) with CachedTokenAuthentication:
+    a valid `Authorization: Token <key>` header sets request.user, an invalid one is
+    answered with 401, and requests without one keep their session user.
+    """
+    authenticator = CachedTokenAuthentication()
+
+    def authenticate(request):
+        try:
+            result = authenticator.authenticate(request)
+        except exceptions.AuthenticationFailed as e:
+            return JsonResponse({'status': 'error', 'message': str(e.detail)}, status=401)
+        if result is not None:
+            user = result[0]
+
+            async def auser():
+                return user
+
+            request.user, request.auser = user, auser
+        return None
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def wrapped(request, *args, **kwargs):
+            error = await sync_to_async(authenticate)(request)
+            return error or await view(request, *args, **kwargs)
+    else:
+        @wraps(view)
+        def wrapped(request, *args, **kwargs):
+            return authenticate(request) or view(request, *args, **kwargs)
+    return wrapped
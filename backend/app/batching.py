@@ -0,0 +1,207 @@
+"""
+Micro-batching for model predictions.
+
+Each registered model gets a MicroBatcher: request threads submit their items
+and wait, while one background thread collects the queued requests until it
+has MODEL_BATCH_MAX_SIZE items or the oldest request has waited
+MODEL_BATCH_MAX_WAIT_MS, scores them all with one call of the model's batch
+function and hands each request its slice of the results. Concurrent requests
+therefore share one vectorized predict instead of paying for one each.
+
+Requests are never split across batches; one larger than the maximum is
+scored on its own. If a batch fails, its requests are retried one by one, so
+a bad record only fails the request that sent it.
+"""
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+STATS_WINDOW = 2048  # Batches and requests kept for the latency and fill-rate figures.
+
+_scorers = {}
+_batchers = {}
+_registry_lock = threading.Lock()
+
+
+def _percentile_ms(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))] * 1000, 3)
+
+
+class _Request:
+    __slots__ = ('items', 'future', 'enqueued')
+
+    def __init__(self, items):
+        self.items = items
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class MicroBatcher:
+    """Collects concurrent submissions for one model and scores them in batches."""
+
+    def __init__(self, name, score, max_batch_size: int, max_wait: float):
+        self.name = name
+        self._score = score  # list of items -> list of results, one per item
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._carry = None  # A request that did not fit in the previous batch.
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._batches = deque(maxlen=STATS_WINDOW)  # (items, requests, seconds scoring)
+        self._latencies = deque(maxlen=STATS_WINDOW)  # seconds from submit to result, per request
+        self._counts = dict.fromkeys(('requests', 'items', 'batches', 'retries', 'errors'), 0)
+
+    def _ensure_worker(self):
+        # Started on first use and again after a fork, so preloading app servers get a thread per worker.
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._queue = queue.Queue()
+                    self._carry = None
+                    self._thread = threading.Thread(target=self._run, name=f'batcher-{self.name}', daemon=True)
+                    self._thread.start()
+                    self._pid = os.getpid()
+
+    def submit(self, items: list) -> Future:
+        """Queues items for scoring; the Future resolves to their results, in order."""
+        self._ensure_worker()
+        request = _Request(list(items))
+        if not request.items:
+            request.future.set_result([])
+            return request.future
+        self._queue.put(request)
+        return request.future
+
+    def score(self, items: list, timeout=None) -> list:
+        return self.submit(items).result(timeout)
+
+    def _next_batch(self) -> list:
+        first = self._carry or self._queue.get()
+        self._carry = None
+        batch, size = [first], len(first.items)
+        deadline = first.enqueued + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(request.items) > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            try:
+                self._dispatch(batch)
+            except Exception:  # Never let the worker die; the requests have already been answered.
+                logger.exception("Error in %s batcher", self.name)
+
+    def _dispatch(self, batch: list):
+        items = [item for request in batch for item in request.items]
+        started = time.perf_counter()
+        try:
+            results = self._score(items)
+            if len(results) != len(items):
+                raise ValueError(f"{self.name} returned {len(results)} results for {len(items)} items.")
+        except Exception as e:
+            if len(batch) > 1:
+                with self._lock:
+                    self._counts['retries'] += 1
+                for request in batch:
+                    self._dispatch([request])
+                return
+            self._record(batch, len(items), time.perf_counter() - started, failed=True)
+            batch[0].future.set_exception(e)
+            return
+
+        self._record(batch, len(items), time.perf_counter() - started)
+        offset = 0
+        for request in batch:
+            request.future.set_result(results[offset:offset + len(request.items)])
+            offset += len(request.items)
+
+    def _record(self, batch, size, seconds, failed=False):
+        now = time.monotonic()
+        with self._lock:
+            self._counts['batches'] += 1
+            self._counts['requests'] += len(batch)
+            self._counts['items'] += size
+            self._counts['errors'] += failed
+            self._batches.append((size, len(batch), seconds))
+            self._latencies.extend(now - request.enqueued for request in batch)
+
+    def stats(self) -> dict:
+        """
+        Counters since start-up, plus batch fill rate (items over max batch size),
+        requests per batch and latency percentiles over the last STATS_WINDOW batches.
+        """
+        with self._lock:
+            stats = dict(self._counts)
+            batches = list(self._batches)
+            latencies = list(self._latencies)
+        stats.update(max_batch_size=self.max_batch_size, max_wait_ms=round(self.max_wait * 1000, 3))
+        if batches:
+            stats['mean_batch_size'] = round(sum(b[0] for b in batches) / len(batches), 2)
+            stats['mean_fill_rate'] = round(sum(min(b[0], self.max_batch_size) for b in batches)
+                                            / (len(batches) * self.max_batch_size), 4)
+            stats['mean_requests_per_batch'] = round(sum(b[1] for b in batches) / len(batches), 2)
+            stats['score_ms_p50'] = _percentile_ms([b[2] for b in batches], 50)
+        stats.update(latency_ms_p50=_percentile_ms(latencies, 50), latency_ms_p95=_percentile_ms(latencies, 95),
+                     latency_ms_p99=_percentile_ms(latencies, 99))
+        return stats
+
+    def reset_stats(self):
+        with self._lock:
+            for name in self._counts:
+                self._counts[name] = 0
+            self._batches.clear()
+            self._latencies.clear()
+
+
+def register(name, score):
+    """Registers a batch scoring function (list of items -> list of results) under a model name."""
+    with _registry_lock:
+        _scorers[name] = score
+        _batchers.pop(name, None)
+
+
+def get_batcher(name) -> MicroBatcher:
+    """The batcher of a registered model, created with the current settings on first use."""
+    with _registry_lock:
+        if name not in _batchers:
+            if name not in _scorers:
+                raise KeyError(f"No model registered as {name!r}.")
+            _batchers[name] = MicroBatcher(
+                name, _scorers[name], settings.MODEL_BATCH_MAX_SIZE, settings.MODEL_BATCH_MAX_WAIT_MS / 1000,
+            )
+        return _batchers[name]
+
+
+def reset_batchers():
+    """Forgets the batchers so the next use picks up changed settings (their idle threads stay parked)."""
+    with _registry_lock:
+        _batchers.clear()
+
+
+def batcher_stats() -> dict:
+    with _registry_lock:
+        batchers = dict(_batchers)
+    return {name: batcher.stats() for name, batcher in batchers.items()}
@@ -0,0 +1,221 @@
+"""
+Shared helpers for the benchmark management commands: a local stand-in for the
+upstream services, a scratch database and small latency-statistics utilities.
+"""
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SAMPLE_FINANCIAL_DATA = {
+    "assets": {"cash": 5000, "bank_balances": {"checking": 15000, "savings": 50000}, "property_value": 350000},
+    "liabilities": {"credit_card_debt": 2500, "student_loan": 20000, "mortgage": 250000},
+    "transactions": [
+        {"date": "2025-08-01", "description": "Salary Deposit", "amount": 5000, "type": "income"},
+        {"date": "2025-08-03", "description": "Groceries", "amount": -150, "type": "expense", "category": "Food"},
+        {"date": "2025-08-05", "description": "Mortgage Payment", "amount": -1800, "type": "expense", "category": "Housing"},
+        {"date": "2025-07-04", "description": "Groceries", "amount": -120, "type": "expense", "category": "Food"},
+    ],
+    "epf_retirement": {"current_balance": 75000, "employee_contribution_ytd": 6000, "employer_match_ytd": 6000},
+    "credit_score": {"score": 780, "rating": "Excellent"},
+    "investments": {"stocks": [{"ticker": "AAPL", "shares": 10, "current_value": 1500}]},
+}
+
+
+class UpstreamStub:
+    """
+    Threaded local HTTP server that stands in for the mock-data API
+    (GET /UserProfile) and OpenRouter (POST /chat/completions).
+
+    Latencies are simulated with sleeps so the benchmark measures how the app
+    waits on upstreams, not how fast the stub is. Completions requested with
+    "stream": true are sent as server-sent events, one word per chunk, with
+    llm_latency before the first chunk and token_latency between chunks.
+    """
+
+    def __init__(self, financial_data=None, mock_latency=0.0, llm_latency=0.0, token_latency=0.0,
+                 reply="Stub reply."):
+        self.financial_data = financial_data if financial_data is not None else SAMPLE_FINANCIAL_DATA
+        self.mock_latency = mock_latency
+        self.llm_latency = llm_latency
+        self.token_latency = token_latency
+        self.reply = reply
+        self.hits = {'mock': 0, 'llm': 0}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def mock_api_url(self) -> str:
+        return f"{self.base_url}/UserProfile"
+
+    @property
+    def openrouter_url(self) -> str:
+        return f"{self.base_url}/chat/completions"
+
+    def _count(self, name):
+        with self._lock:
+            self.hits[name] += 1
+
+    def _make_handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def _send_json(self, body, status=200):
+                encoded = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def do_GET(self):
+                if self.path.rstrip('/') != '/UserProfile':
+                    return self._send_json({'error': 'not found'}, status=404)
+                stub._count('mock')
+                time.sleep(stub.mock_latency)
+                self._send_json([stub.financial_data])
+
+            def _send_chunk(self, data: bytes):
+                self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+
+            def _send_stream(self):
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Transfer-Encoding', 'chunked')
+                self.end_headers()
+                words = stub.reply.split(' ')
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(stub.token_latency)
+                    token = word if i == len(words) - 1 else word + ' '
+                    event = {'choices': [{'delta': {'content': token}}]}
+                    self._send_chunk(f"data: {json.dumps(event)}\n\n".encode())
+                self._send_chunk(b"data: [DONE]\n\n")
+                self._send_chunk(b"")
+
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length) or b'{}')
+                if self.path.rstrip('/') != '/chat/completions':
+                    return self._send_json({'error': 'not found'}, status=404)
+                stub._count('llm')
+                time.sleep(stub.llm_latency)
+                if body.get('stream'):
+                    return self._send_stream()
+                prompt = ''.join(str(message.get('content', '')) for message in body.get('messages', []))
+                self._send_json({
+                    'choices': [{'message': {'role': 'assistant', 'content': stub.reply}}],
+                    # Rough OpenAI-style usage (4 characters a token), as the real API reports it.
+                    'usage': {'prompt_tokens': len(prompt) // 4, 'completion_tokens': len(stub.reply) // 4},
+                })
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), self._make_handler())
+        self._server.daemon_threads = True
+        self._server.request_queue_size = 512
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+@contextmanager
+def scratch_database():
+    """
+    Runs the block against a freshly migrated test database, so a benchmark can
+    seed as much data as it likes without touching the real one.
+    """
+    from django.db import connection
+
+    old_name = connection.settings_dict['NAME']
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def percentile(values, pct: float) -> float:
+    """Nearest-rank percentile of a list of numbers (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies, wall_time: float) -> dict:
+    """Latency summary in milliseconds plus throughput for one benchmark run."""
+    return {
+        'requests': len(latencies),
+        'wall_s': round(wall_time, 3),
+        'throughput_rps': round(len(latencies) / wall_time, 1) if wall_time else 0.0,
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+    }
+
+
+def synthetic_bank_marketing(rows: int, seed: int = 0):
+    """
+    A DataFrame with the columns of the UCI bank-marketing dataset (bank-full.csv)
+    and a target that depends on a few of them, for benchmarks that have no copy
+    of the real file.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from .ml import CATEGORIES
+
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'age': rng.integers(18, 95, rows),
+        **{column: rng.choice(values, rows) for column, values in CATEGORIES.items()},
+        'default': rng.choice(['no', 'yes'], rows, p=[0.98, 0.02]),
+        'balance': rng.integers(-2000, 50000, rows),
+        'housing': rng.choice(['no', 'yes'], rows),
+        'loan': rng.choice(['no', 'yes'], rows, p=[0.84, 0.16]),
+        'day': rng.integers(1, 32, rows),
+        'duration': rng.integers(0, 3000, rows),
+        'campaign': rng.integers(1, 20, rows),
+        'pdays': rng.integers(-1, 400, rows),
+        'previous': rng.integers(0, 10, rows),
+    })
+    logit = -3 + df['duration'] / 400 + (df['poutcome'] == 'success') * 2 - (df['housing'] == 'yes') * 0.5
+    df['y'] = np.where(rng.random(rows) < 1 / (1 + np.exp(-logit)), 'yes', 'no')
+    return df
+
+
+def write_synthetic_bank_marketing(path, rows: int, seed: int = 0, chunk_rows: int = 100000):
+    """Writes `rows` synthetic rows as a ;-separated CSV, generated a chunk at a time."""
+    for index, start in enumerate(range(0, rows, chunk_rows)):
+        chunk = synthetic_bank_marketing(min(chunk_rows, rows - start), seed + index)
+        chunk.to_csv(path, sep=';', index=False, mode='w' if index == 0 else 'a', header=index == 0)
@@ -0,0 +1,105 @@
+"""
+Shared, pooled HTTP clients for calls to the AI and mock-data services.
+
+Every outbound call goes through one of these clients instead of calling
+``requests.get``/``requests.post`` directly, so connections are kept alive and
+reused between requests and every call is bounded by a timeout.
+"""
+import asyncio
+import threading
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+_session = None
+_session_lock = threading.Lock()
+
+_async_clients = weakref.WeakKeyDictionary()  # event loop -> its AsyncClient
+_async_clients_lock = threading.Lock()
+_async_closers = set()  # Keeps the closer tasks alive; the loop only holds weak references.
+
+
+def get_timeout():
+    """Returns the (connect, read) timeout tuple used for sync upstream calls."""
+    return (settings.UPSTREAM_CONNECT_TIMEOUT, settings.UPSTREAM_READ_TIMEOUT)
+
+
+def get_http_session() -> requests.Session:
+    """
+    Returns the process-wide requests session used by the sync views.
+    The underlying urllib3 pool is thread-safe, so one session is shared by all worker threads.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=settings.UPSTREAM_MAX_CONNECTIONS,
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                _session = session
+    return _session
+
+
+async def _close_with_loop(client: httpx.AsyncClient):
+    """Waits for the loop to shut down (asyncio.run cancels pending tasks) and closes the client on it."""
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await client.aclose()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """
+    Returns the keep-alive httpx client for the running event loop.
+
+    An AsyncClient is bound to the loop it first ran on, so there is one per loop.
+    Under ASGI each worker has a single loop and the client is created once. When
+    an async view is served through WSGI (async_to_sync), every request runs on a
+    fresh loop; its client is closed, connections and all, when asyncio.run
+    shuts that loop down.
+    """
+    loop = asyncio.get_running_loop()
+    with _async_clients_lock:
+        client = _async_clients.get(loop)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(settings.UPSTREAM_READ_TIMEOUT, connect=settings.UPSTREAM_CONNECT_TIMEOUT),
+                limits=httpx.Limits(
+                    max_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.UPSTREAM_MAX_CONNECTIONS,
+                ),
+            )
+            _async_clients[loop] = client
+            closer = loop.create_task(_close_with_loop(client))
+            _async_closers.add(closer)
+            closer.add_done_callback(_async_closers.discard)
+    return client
+
+
+def error_reason(error: Exception) -> str:
+    """A short, low-cardinality label for a failed upstream call, for metrics."""
+    if isinstance(error, (requests.exceptions.Timeout, httpx.TimeoutException)):
+        return 'timeout'
+    if isinstance(error, (requests.exceptions.ConnectionError, httpx.TransportError)):
+        return 'connection'
+    response = getattr(error, 'response', None)
+    if isinstance(error, (requests.exceptions.HTTPError, httpx.HTTPStatusError)) and response is not None:
+        return f'http_{response.status_code}'
+    if isinstance(error, ValueError):
+        return 'invalid_response'
+    return 'error'
+
+
+async def aclose_async_client():
+    """Closes the running loop's async client, e.g. from an ASGI lifespan shutdown hook."""
+    with _async_clients_lock:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
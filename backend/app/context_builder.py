@@ -0,0 +1,259 @@
+"""
+Token-budgeted prompt builder for the chat views.
+
+Data and history are serialized as compact JSON. Only the data categories and the
+transaction date range the query refers to are included, and the history and data
+sections are trimmed to fit PROMPT_TOKEN_BUDGET, measured with a local token
+estimator. The returned ChatContext reports the tokens used by each section.
+"""
+import calendar
+import json
+import re
+from datetime import date, timedelta
+from typing import NamedTuple, Optional
+
+from django.conf import settings
+
+from .profiling import span
+
+OMITTED = "(omitted)"
+INSTRUCTIONS = (
+    "You are a helpful and professional AI personal finance assistant. Your role is to analyze the user's "
+    "financial data to answer their questions and provide actionable insights.\n"
+    "RULES:\n"
+    "1. Your knowledge is STRICTLY limited to the JSON data provided below. Do not use external knowledge.\n"
+    "2. You MUST respect the user's privacy. If a user asks about a data category that is NOT present in the "
+    "provided JSON, you MUST state that you do not have access to that information and suggest they grant "
+    "permission.\n"
+    "3. Provide clear, concise, and user-friendly answers.\n"
+    f"4. A category whose value is \"{OMITTED}\" is shared by the user but was left out because it does not "
+    "look relevant to this question."
+)
+
+CATEGORY_KEYWORDS = {
+    "assets": ("asset", "cash", "bank", "balance", "saving", "property", "house", "home", "account"),
+    "liabilities": ("liabilit", "debt", "loan", "mortgage", "owe", "credit card", "emi", "interest"),
+    "transactions": (
+        "spend", "spent", "expense", "income", "salary", "transaction", "bought", "paid", "pay", "purchase",
+        "bill", "grocer", "budget", "month", "week", "year", "category",
+    ),
+    "epf_retirement": ("epf", "retire", "pension", "provident", "401k"),
+    "credit_score": ("credit score", "score", "cibil", "rating", "creditworth"),
+    "investments": ("invest", "stock", "share", "portfolio", "mutual fund", "fund", "bond", "crypto", "sip"),
+}
+# Questions that need the whole picture select every category.
+BROAD_KEYWORDS = ("net worth", "afford", "overview", "summary", "summarize", "financial health", "everything", "plan")
+
+MONTHS = {name.lower(): number for number, name in enumerate(calendar.month_abbr) if name}
+MONTHS.update({name.lower(): number for number, name in enumerate(calendar.month_name) if name})
+# A month name only counts after "in"/"for"/"during"/"of" or before a year, so "may I ..." is not May.
+_MONTH_PATTERN = re.compile(
+    rf"(?:\b(?:in|for|during|of)\s+({'|'.join(MONTHS)})\b(?:\s+(\d{{4}}))?)|(?:\b({'|'.join(MONTHS)})\s+(\d{{4}}))"
+)
+
+_TOKEN_PIECES = re.compile(r"[A-Za-z]+|\d+|[^\sA-Za-z\d]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Local approximation of a BPE token count: words count one token per four
+    letters, numbers one per three digits, and each punctuation mark one token.
+    """
+    tokens = 0
+    for piece in _TOKEN_PIECES.findall(text):
+        if piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        elif piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        else:
+            tokens += 1
+    return tokens
+
+
+def compact_json(value) -> str:
+    with span('serialize'):
+        return json.dumps(value, separators=(',', ':'), ensure_ascii=False, default=str)
+
+
+def select_categories(user_message: str, available) -> list:
+    """Categories the message refers to, or every available one if none (or all) are implied."""
+    text = user_message.lower()
+    if any(keyword in text for keyword in BROAD_KEYWORDS):
+        return list(available)
+    selected = [
+        category for category in available
+        if any(keyword in text for keyword in CATEGORY_KEYWORDS.get(category, ()))
+    ]
+    return selected or list(available)
+
+
+def _month_range(year: int, month: int):
+    return date(year, month, 1), date(year, month, calendar.monthrange(year, month)[1])
+
+
+def _shift_month(year: int, month: int, delta: int):
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
+
+
+def resolve_date_range(user_message: str, today: date) -> Optional[tuple]:
+    """
+    Maps phrases like "last month", "past 3 months" or "in august" to an inclusive
+    (start, end). A range reaching outside the dates Python can represent ("past
+    10000 years", "in may 0000") is treated as no date filter.
+    """
+    try:
+        return _date_range(user_message.lower(), today)
+    except (OverflowError, ValueError):
+        return None
+
+
+def _date_range(text: str, today: date) -> Optional[tuple]:
+    if "yesterday" in text:
+        day = today - timedelta(days=1)
+        return day, day
+    if "today" in text:
+        return today, today
+    match = re.search(r"(?:last|past|previous)\s+(\d+)\s+(day|week|month|year)s?", text)
+    if match:
+        count, unit = int(match.group(1)), match.group(2)
+        if unit == "month":
+            year, month = _shift_month(today.year, today.month, -count)
+            return date(year, month, min(today.day, calendar.monthrange(year, month)[1])), today
+        days = {"day": 1, "week": 7, "year": 365}[unit] * count
+        return today - timedelta(days=days), today
+    if "this week" in text:
+        return today - timedelta(days=today.weekday()), today
+    if "last week" in text:
+        start = today - timedelta(days=today.weekday() + 7)
+        return start, start + timedelta(days=6)
+    if "this month" in text:
+        return today.replace(day=1), today
+    if "last month" in text or "previous month" in text:
+        return _month_range(*_shift_month(today.year, today.month, -1))
+    if "this year" in text:
+        return date(today.year, 1, 1), today
+    if "last year" in text:
+        return date(today.year - 1, 1, 1), date(today.year - 1, 12, 31)
+    match = _MONTH_PATTERN.search(text)
+    if match:
+        month = MONTHS[match.group(1) or match.group(3)]
+        year = match.group(2) or match.group(4)
+        year = int(year) if year else (today.year if month <= today.month else today.year - 1)
+        return _month_range(year, month)
+    return None
+
+
+def _parse_date(value):
+    try:
+        return date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def filter_transactions(transactions, date_range):
+    """Keeps transactions dated within the range, newest first."""
+    if not isinstance(transactions, list):
+        return transactions
+    dated = [(t, _parse_date(t.get("date")) if isinstance(t, dict) else None) for t in transactions]
+    if date_range:
+        start, end = date_range
+        dated = [(t, day) for t, day in dated if day is not None and start <= day <= end]
+    dated.sort(key=lambda item: item[1] or date.min, reverse=True)
+    return [t for t, _ in dated]
+
+
+class ChatContext(NamedTuple):
+    prompt: str
+    token_usage: dict  # Tokens per section plus the total.
+    categories: list  # Data categories selected for the query.
+    date_range: Optional[tuple]
+
+
+def _fit_history(history: list, budget: int) -> list:
+    """Drops the oldest messages (never the summary) until the history fits."""
+    summary = [m for m in history if m.get("role") == "summary"]
+    messages = [m for m in history if m.get("role") != "summary"]
+    while messages and estimate_tokens(compact_json(summary + messages)) > budget:
+        messages.pop(0)
+    return summary + messages
+
+
+def _largest_list(value, path=()):
+    """Path to the longest list inside nested dicts, or None."""
+    best = None
+    if isinstance(value, list) and len(value) > 1:
+        best = (len(value), path)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            found = _largest_list(item, path + (key,))
+            if found and (best is None or found[0] > best[0]):
+                best = found
+    return best
+
+
+def _fit_data(data: dict, order: list, budget: int) -> dict:
+    """
+    Halves the longest list in the selected categories (keeping its first, i.e.
+    most recent, items) until the data fits. If that is not enough, whole
+    categories are replaced with OMITTED, least relevant first.
+    """
+    data = json.loads(compact_json(data))
+    truncated = []
+    while estimate_tokens(compact_json(data)) > budget:
+        candidates = [found for found in (_largest_list(data[c], (c,)) for c in order if c in data) if found]
+        if not candidates:
+            break
+        length, path = max(candidates)
+        parent = data
+        for key in path[:-1]:
+            parent = parent[key]
+        parent[path[-1]] = parent[path[-1]][:length // 2]
+        if path[0] not in truncated:
+            truncated.append(path[0])
+    if truncated:
+        data["truncated_categories"] = truncated
+    for category in reversed(order):
+        if estimate_tokens(compact_json(data)) <= budget:
+            break
+        data[category] = OMITTED
+    return data
+
+
+def build_chat_context(history: list, accessible_data: dict, user_message: str, today: date = None) -> ChatContext:
+    """Builds the chat prompt within PROMPT_TOKEN_BUDGET."""
+    today = today or date.today()
+    categories = select_categories(user_message, accessible_data.keys())
+    date_range = resolve_date_range(user_message, today)
+
+    data = {}
+    for category, value in accessible_data.items():
+        if category not in categories:
+            data[category] = OMITTED
+        elif category == "transactions":
+            data[category] = filter_transactions(value, date_range)
+        else:
+            data[category] = value
+    if date_range and "transactions" in categories:
+        data["transactions_date_range"] = [date_range[0].isoformat(), date_range[1].isoformat()]
+
+    query = f'Current user query: "{user_message}"'
+    fixed = estimate_tokens(INSTRUCTIONS) + estimate_tokens(query)
+    available = max(settings.PROMPT_TOKEN_BUDGET - fixed, 0)
+    history = _fit_history(history, int(available * settings.PROMPT_HISTORY_SHARE))
+    history_text = compact_json(history)
+    history_tokens = estimate_tokens(history_text)
+    data_text = compact_json(_fit_data(data, categories, max(available - history_tokens, 0)))
+
+    prompt = (
+        f"{INSTRUCTIONS}\n---\nCONTEXT: PREVIOUS CONVERSATION\n{history_text}\n"
+        f"---\nDATA: USER'S ACCESSIBLE FINANCIAL DATA\n{data_text}\n---\n{query}"
+    )
+    token_usage = {
+        "instructions": estimate_tokens(INSTRUCTIONS),
+        "history": history_tokens,
+        "data": estimate_tokens(data_text),
+        "query": estimate_tokens(query),
+    }
+    token_usage["total"] = estimate_tokens(prompt)
+    return ChatContext(prompt, token_usage, categories, date_range)
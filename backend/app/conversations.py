@@ -0,0 +1,116 @@
+"""
+Persistent chat history for the chat views.
+
+The session only holds the conversation id. Turns are appended as ChatMessage
+rows, the prompt reads a fixed window of the most recent ones, and older turns
+are folded into Conversation.summary by a background compaction, so neither the
+session nor the prompt grows with the length of a conversation.
+"""
+from django.conf import settings
+from django.db import transaction
+
+from .ai import ERROR_REPLIES, build_summary_prompt, call_openrouter_api
+from .metrics import BackgroundTasks
+from .models import ChatMessage, Conversation
+
+SESSION_KEY = 'conversation_id'
+LEGACY_SESSION_KEY = 'chat_history'
+
+
+def _owner(user):
+    return user if user.is_authenticated else None
+
+
+def get_conversation(session, user) -> Conversation:
+    """Returns the session's conversation for this user, starting a new one if needed."""
+    owner = _owner(user)
+    conversation_id = session.get(SESSION_KEY)
+    if conversation_id:
+        conversation = Conversation.objects.filter(pk=conversation_id, user=owner).first()
+        if conversation is not None:
+            return conversation
+    conversation = Conversation.objects.create(user=owner)
+    session[SESSION_KEY] = conversation.pk
+    session.pop(LEGACY_SESSION_KEY, None)
+    return conversation
+
+
+async def aget_conversation(session, user) -> Conversation:
+    owner = _owner(user)
+    conversation_id = await session.aget(SESSION_KEY)
+    if conversation_id:
+        conversation = await Conversation.objects.filter(pk=conversation_id, user=owner).afirst()
+        if conversation is not None:
+            return conversation
+    conversation = await Conversation.objects.acreate(user=owner)
+    await session.aset(SESSION_KEY, conversation.pk)
+    await session.apop(LEGACY_SESSION_KEY, None)
+    return conversation
+
+
+def _history(conversation, recent_messages) -> list:
+    history = [{"role": "summary", "content": conversation.summary}] if conversation.summary else []
+    return history + [message.as_dict() for message in reversed(recent_messages)]
+
+
+def load_history(conversation) -> list:
+    """
+    The context shown to the AI: the rolling summary (if any) followed by the last
+    CHAT_HISTORY_WINDOW messages.
+    """
+    recent = list(conversation.messages.order_by('-id')[:settings.CHAT_HISTORY_WINDOW])
+    return _history(conversation, recent)
+
+
+async def aload_history(conversation) -> list:
+    recent = [message async for message in conversation.messages.order_by('-id')[:settings.CHAT_HISTORY_WINDOW]]
+    return _history(conversation, recent)
+
+
+def _turn(conversation, user_message, ai_response):
+    return [
+        ChatMessage(conversation=conversation, role='user', content=user_message),
+        ChatMessage(conversation=conversation, role='assistant', content=ai_response),
+    ]
+
+
+def append_turn(conversation, user_message: str, ai_response: str):
+    """Appends a user/assistant turn and schedules compaction once the thread is long."""
+    ChatMessage.objects.bulk_create(_turn(conversation, user_message, ai_response))
+    if conversation.messages.count() > settings.CHAT_COMPACT_THRESHOLD:
+        schedule_compaction(conversation.pk)
+
+
+async def aappend_turn(conversation, user_message: str, ai_response: str):
+    await ChatMessage.objects.abulk_create(_turn(conversation, user_message, ai_response))
+    if await conversation.messages.acount() > settings.CHAT_COMPACT_THRESHOLD:
+        schedule_compaction(conversation.pk)
+
+
+def compact_conversation(conversation_id):
+    """
+    Folds every message older than the history window into the conversation summary
+    and deletes those rows. Nothing changes if the AI cannot produce a summary.
+    """
+    conversation = Conversation.objects.filter(pk=conversation_id).first()
+    if conversation is None:
+        return
+    older = list(conversation.messages.order_by('-id')[settings.CHAT_HISTORY_WINDOW:])
+    if not older:
+        return
+    older.reverse()
+
+    summary = call_openrouter_api(build_summary_prompt(conversation.summary, [m.as_dict() for m in older]))
+    if summary in ERROR_REPLIES:
+        return
+    with transaction.atomic():
+        Conversation.objects.filter(pk=conversation_id).update(summary=summary)
+        ChatMessage.objects.filter(conversation_id=conversation_id, id__lte=older[-1].id).delete()
+
+
+_compactions = BackgroundTasks(compact_conversation, 'chat-compaction')
+
+
+def schedule_compaction(conversation_id):
+    """Queues a background compaction, at most one pending per conversation."""
+    _compactions.schedule(conversation_id)
@@ -0,0 +1,170 @@
+"""
+Per-category loaders of a signed-in user's financial data for the chat prompt.
+
+Each of the six data categories has a loader that reads the user's rows from
+the models. Chat views only run the loaders of categories that are both granted
+and relevant to the question (see context_builder.select_categories); granted
+categories the question does not need are passed as OMITTED without touching
+the database, and revoked ones are never loaded. The loaders of a request run
+concurrently on a small thread pool, each with its own database connection.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from datetime import date
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from .context_builder import OMITTED, resolve_date_range, select_categories
+from .models import Asset, CreditScore, Investment, Liability, RetirementAccount, Transaction
+from .rollups import monthly_totals
+
+LOADERS = {}
+
+_executor = None
+
+
+def loader(category):
+    """Registers a function (user_id, date_range) -> JSON-serializable data for a category."""
+    def register(function):
+        LOADERS[category] = function
+        return function
+    return register
+
+
+def _amount(value) -> float:
+    return float(value or 0)
+
+
+@loader('assets')
+def load_assets(user_id, date_range=None):
+    rows = Asset.objects.filter(user_id=user_id).order_by('asset_type', 'name')
+    return [
+        {'name': name, 'type': asset_type.lower(), 'value': _amount(value)}
+        for name, asset_type, value in rows.values_list('name', 'asset_type', 'current_value')
+    ]
+
+
+@loader('liabilities')
+def load_liabilities(user_id, date_range=None):
+    rows = Liability.objects.filter(user_id=user_id).order_by('liability_type', 'name')
+    return [
+        {'name': name, 'type': liability_type.lower(), 'owed': _amount(owed), 'interest_rate': _amount(rate)}
+        for name, liability_type, owed, rate in rows.values_list('name', 'liability_type', 'amount_owed', 'interest_rate')
+    ]
+
+
+@loader('transactions')
+def load_transactions(user_id, date_range=None):
+    """
+    The newest CHAT_TRANSACTIONS_LIMIT transactions. For a question about a date
+    range, the transactions in the range go under "recent", next to the range's
+    per-month totals by type from the rollups, so a total over more transactions
+    than the limit is still exact. The totals cover whole calendar months.
+    """
+    rows = Transaction.objects.filter(user_id=user_id)
+    if date_range:
+        rows = rows.filter(date__range=date_range)
+    rows = rows.order_by('-date', '-id').values_list('date', 'description', 'amount', 'transaction_type', 'category')
+    recent = [
+        {'date': day.isoformat(), 'description': description, 'amount': _amount(amount),
+         'type': transaction_type.lower(), 'category': category}
+        for day, description, amount, transaction_type, category in rows[:settings.CHAT_TRANSACTIONS_LIMIT]
+    ]
+    if not date_range:
+        return recent
+    totals = monthly_totals(user_id, *date_range)
+    return {
+        'monthly_totals': {
+            month.strftime('%Y-%m'): {transaction_type.lower(): _amount(total) for transaction_type, total in by_type.items()}
+            for month, by_type in totals.items()
+        },
+        'recent': recent,
+    }
+
+
+@loader('epf_retirement')
+def load_retirement(user_id, date_range=None):
+    account = RetirementAccount.objects.filter(user_id=user_id).first()
+    if account is None:
+        return {}
+    return {
+        'account': account.account_name,
+        'current_balance': _amount(account.current_balance),
+        'employee_contribution': _amount(account.employee_contribution),
+        'employer_contribution': _amount(account.employer_contribution),
+    }
+
+
+@loader('credit_score')
+def load_credit_score(user_id, date_range=None):
+    credit_score = CreditScore.objects.filter(user_id=user_id).first()
+    if credit_score is None:
+        return {}
+    return {'score': credit_score.score, 'rating': credit_score.rating}
+
+
+@loader('investments')
+def load_investments(user_id, date_range=None):
+    rows = Investment.objects.filter(user_id=user_id).order_by('investment_type', 'name').values_list(
+        'name', 'symbol', 'investment_type', 'quantity', 'current_value_per_unit',
+    )
+    return [
+        {'name': name, 'symbol': symbol or None, 'type': investment_type.lower(), 'quantity': _amount(quantity),
+         'unit_value': _amount(price), 'value': round(_amount(quantity * price), 2)}
+        for name, symbol, investment_type, quantity, price in rows
+    ]
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=settings.CHAT_DATA_LOADER_WORKERS, thread_name_prefix='chat-data')
+    return _executor
+
+
+def _run(category, user_id, date_range):
+    try:
+        return LOADERS[category](user_id, date_range)
+    finally:
+        close_old_connections()
+
+
+def plan(permissions: dict, user_message: str, today: date = None):
+    """(categories to load, granted categories, transaction date range) for a question."""
+    granted = [category for category in LOADERS if permissions.get(category)]
+    date_range = resolve_date_range(user_message, today or date.today())
+    return select_categories(user_message, granted), granted, date_range
+
+
+def _assemble(granted, loaded: dict) -> dict:
+    return {category: loaded.get(category, OMITTED) for category in granted}
+
+
+def load_accessible_data(user_id, permissions: dict, user_message: str, today: date = None) -> dict:
+    """
+    {category: data} for every granted category, with only the ones the question
+    needs loaded (concurrently when there are several) and the rest OMITTED.
+    """
+    to_load, granted, date_range = plan(permissions, user_message, today)
+    if len(to_load) <= 1 or settings.CHAT_DATA_LOADER_WORKERS <= 1:
+        loaded = {category: LOADERS[category](user_id, date_range) for category in to_load}
+    else:
+        # Each loader runs in a copy of this context so its queries count towards the request's profile.
+        futures = {
+            category: _get_executor().submit(copy_context().run, _run, category, user_id, date_range)
+            for category in to_load
+        }
+        loaded = {category: future.result() for category, future in futures.items()}
+    return _assemble(granted, loaded)
+
+
+async def aload_accessible_data(user_id, permissions: dict, user_message: str, today: date = None) -> dict:
+    to_load, granted, date_range = plan(permissions, user_message, today)
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(
+        loop.run_in_executor(_get_executor(), copy_context().run, _run, category, user_id, date_range)
+        for category in to_load
+    ))
+    return _assemble(granted, dict(zip(to_load, results)))
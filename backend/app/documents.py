@@ -0,0 +1,313 @@
+"""
+Document uploads: streamed to disk, stored once per content hash, and
+processed in the background.
+
+DocumentUploadHandler replaces Django's upload handlers for the upload view.
+It writes each chunk of the request body straight to a temporary file in
+DOCUMENT_STORAGE_DIR while hashing it, so a file of any size costs one chunk of
+memory and one pass over the data. store_upload() then moves the file to
+<sha256[:2]>/<sha256> (or drops it if that content is already stored) and
+creates the uploader's Document row; uploading the same content again returns
+the existing row.
+
+Extraction of text, title, author and summary runs on a background thread once
+the row is committed. It reads at most DOCUMENT_TEXT_MAX_CHARS of text, a
+chunk or PDF page at a time, and asks the AI for a summary of the beginning,
+falling back to the first lines if the AI is unavailable. PDFs need the
+optional pypdf package. `python manage.py extract_documents` re-runs pending or
+failed extractions, e.g. after a restart.
+"""
+import codecs
+import hashlib
+import os
+import tempfile
+from functools import wraps
+from pathlib import Path
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from django.db import IntegrityError, transaction
+from django.http import JsonResponse
+from django.template.defaultfilters import filesizeformat
+from django.views.decorators.csrf import csrf_exempt
+
+from .ai import ERROR_REPLIES, build_document_summary_prompt, call_openrouter_api
+from .importers import StatementImportError, detect_format
+from .metrics import BackgroundTasks
+from .models import Document
+
+READ_CHUNK = 64 * 1024
+MULTIPART_OVERHEAD = 64 * 1024  # Headers and boundaries around the file in a multipart body.
+SUMMARY_FALLBACK_LINES = 3
+
+
+class DocumentError(ValueError):
+    """An upload that cannot be stored."""
+
+
+def storage_dir() -> Path:
+    return Path(settings.DOCUMENT_STORAGE_DIR)
+
+
+def blob_path(content_hash: str) -> str:
+    """Path of a stored file relative to DOCUMENT_STORAGE_DIR."""
+    return f'{content_hash[:2]}/{content_hash}'
+
+
+class HashedUploadedFile(UploadedFile):
+    """An upload already on disk, with its SHA-256."""
+
+    def __init__(self, path, name, content_type, size, charset, content_hash):
+        super().__init__(open(path, 'rb'), name, content_type, size, charset)
+        self.path = path
+        self.content_hash = content_hash
+
+    def temporary_file_path(self):
+        return self.path
+
+    def discard(self):
+        """Closes the file and removes it if it was not stored."""
+        self.close()
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class DocumentUploadHandler(FileUploadHandler):
+    """
+    Streams each uploaded file to a temporary file while hashing it. A file over
+    DOCUMENT_UPLOAD_MAX_BYTES is dropped (and `too_large` set) rather than
+    aborting the request, so the view can answer 413 for both multipart and raw
+    uploads.
+    """
+
+    def __init__(self, request=None):
+        super().__init__(request)
+        self.too_large = False
+        self.uploads = []
+        self._file = None
+        self._hash = None
+        self._size = 0
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        directory = storage_dir() / 'tmp'
+        directory.mkdir(parents=True, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix='upload-', delete=False)
+        self._hash = hashlib.sha256()
+        self._size = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        if self._file is None:
+            return None  # Over the limit; skip the rest of this file.
+        self._size += len(raw_data)
+        if self._size > settings.DOCUMENT_UPLOAD_MAX_BYTES:
+            self.too_large = True
+            self.upload_interrupted()
+            return None
+        self._hash.update(raw_data)
+        self._file.write(raw_data)
+        return None
+
+    def file_complete(self, file_size):
+        if self._file is None:
+            return None
+        self._file.close()
+        uploaded = HashedUploadedFile(self._file.name, self.file_name, self.content_type, file_size,
+                                      self.charset, self._hash.hexdigest())
+        self._file = None
+        self.uploads.append(uploaded)
+        return uploaded
+
+    def upload_interrupted(self):
+        if self._file is not None:
+            self._file.close()
+            try:
+                os.unlink(self._file.name)
+            except FileNotFoundError:
+                pass
+            self._file = None
+
+
+def streamed_upload(view):
+    """
+    Installs a DocumentUploadHandler on the request before DRF (whose CSRF check
+    may read the body) sees it, rejects a Content-Length over the limit without
+    reading the body, and removes temporary files the view did not store.
+    """
+    @wraps(view)
+    def wrapped(request, *args, **kwargs):
+        if request.method == 'POST':
+            try:
+                length = int(request.META.get('CONTENT_LENGTH') or 0)
+            except ValueError:
+                length = 0
+            if length > settings.DOCUMENT_UPLOAD_MAX_BYTES + MULTIPART_OVERHEAD:
+                return JsonResponse(too_large_error(), status=413)
+        handler = DocumentUploadHandler(request)
+        request.upload_handlers = [handler]
+        request.document_upload_handler = handler
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            for upload in handler.uploads:
+                upload.discard()  # A no-op for files moved into storage.
+    return csrf_exempt(wrapped)
+
+
+def too_large_error() -> dict:
+    return {'error': f"Documents are limited to {filesizeformat(settings.DOCUMENT_UPLOAD_MAX_BYTES)}."}
+
+
+def store_upload(user, upload: HashedUploadedFile):
+    """
+    Stores an upload for the user; returns (document, created). Content that is
+    already stored is not written again, and re-uploading a file the user
+    already has returns their existing document.
+    """
+    if not upload.size:
+        upload.discard()
+        raise DocumentError("The uploaded file is empty.")
+    existing = Document.objects.filter(uploader=user, content_hash=upload.content_hash).first()
+    if existing is not None:
+        upload.discard()
+        return existing, False
+
+    relative = blob_path(upload.content_hash)
+    target = storage_dir() / relative
+    upload.close()
+    if target.exists():
+        upload.discard()  # Someone uploaded the same bytes before; keep the stored copy.
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(upload.path, target)
+
+    document = Document(
+        uploader=user, filename=Path(upload.name or 'upload').name[:255], filepath=relative,
+        content_hash=upload.content_hash, size=upload.size, content_type=(upload.content_type or '')[:100],
+    )
+    done = (Document.objects.filter(content_hash=upload.content_hash, status='DONE')
+            .only('category', 'title', 'author', 'summary', 'text').first())
+    if done is not None:  # Same content extracted for another user: reuse the result.
+        for field in ('category', 'title', 'author', 'summary', 'text'):
+            setattr(document, field, getattr(done, field))
+        document.status = 'DONE'
+    try:
+        with transaction.atomic():
+            document.save()
+    except IntegrityError:  # A concurrent upload of the same file by the same user won.
+        return Document.objects.get(uploader=user, content_hash=upload.content_hash), False
+    if document.status == 'PENDING':
+        transaction.on_commit(lambda: schedule_extraction(document.pk))
+    return document, True
+
+
+# --- Extraction ---
+
+def _read_text(path, limit: int) -> str:
+    """Up to `limit` characters of a text file, decoded as UTF-8 a chunk at a time."""
+    decoder = codecs.getincrementaldecoder('utf-8-sig')(errors='replace')
+    parts, length = [], 0
+    with open(path, 'rb') as stream:
+        while length < limit:
+            chunk = stream.read(READ_CHUNK)
+            if b'\x00' in chunk:
+                raise DocumentError("Unsupported file type: the file is binary.")
+            text = decoder.decode(chunk, final=not chunk)
+            parts.append(text)
+            length += len(text)
+            if not chunk:
+                break
+    return ''.join(parts)[:limit]
+
+
+def _read_pdf(path, limit: int):
+    """(text, title, author) of a PDF, reading pages until `limit` characters."""
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise DocumentError("PDF extraction needs the pypdf package.")
+    reader = PdfReader(path)
+    metadata = reader.metadata or {}
+    parts, length = [], 0
+    for page in reader.pages:
+        text = page.extract_text() or ''
+        parts.append(text)
+        length += len(text)
+        if length >= limit:
+            break
+    return '\n'.join(parts)[:limit], metadata.get('/Title') or None, metadata.get('/Author') or None
+
+
+def _is_pdf(path) -> bool:
+    with open(path, 'rb') as stream:
+        return stream.read(5) == b'%PDF-'
+
+
+def _first_lines(text: str, count: int) -> list:
+    return [line.strip() for line in text.splitlines() if line.strip()][:count]
+
+
+def _summarize(document, text: str) -> str:
+    if not text.strip():
+        return ''
+    excerpt = text[:settings.DOCUMENT_SUMMARY_INPUT_CHARS]
+    summary = call_openrouter_api(build_document_summary_prompt(document.filename, excerpt))
+    if summary in ERROR_REPLIES:
+        summary = ' '.join(_first_lines(text, SUMMARY_FALLBACK_LINES))[:500]
+    return summary.strip()
+
+
+def extract_document(document_id):
+    """Fills in the text, title, author, category and summary of a stored document."""
+    updated = Document.objects.filter(pk=document_id, status__in=('PENDING', 'FAILED')).update(status='PROCESSING')
+    if not updated:
+        return  # Already done, being processed, or deleted.
+    document = Document.objects.get(pk=document_id)
+    path = storage_dir() / document.filepath
+    limit = settings.DOCUMENT_TEXT_MAX_CHARS
+    try:
+        if _is_pdf(path):
+            text, title, author = _read_pdf(path, limit)
+        else:
+            text, title, author = _read_text(path, limit), None, None
+        try:
+            detect_format(document.filename)
+            category = 'statement'
+        except StatementImportError:
+            category = 'pdf' if document.filename.lower().endswith('.pdf') else 'text'
+        first = _first_lines(text, 1)
+        fields = {
+            'text': text,
+            'title': (title or (first[0] if first else Path(document.filename).stem))[:255],
+            'author': author[:255] if author else None,
+            'category': document.category or category,
+            'summary': _summarize(document, text),
+            'status': 'DONE',
+            'error': '',
+        }
+    except FileNotFoundError:
+        fields = {'status': 'FAILED', 'error': "The stored file is missing."}
+    except OSError:
+        fields = {'status': 'FAILED', 'error': "The stored file could not be read."}
+    except (DocumentError, ValueError) as e:
+        fields = {'status': 'FAILED', 'error': str(e)[:1000]}
+    Document.objects.filter(pk=document_id).update(**fields)
+
+
+def _extract_or_fail(document_id):
+    try:
+        extract_document(document_id)
+    except Exception as e:
+        Document.objects.filter(pk=document_id).update(status='FAILED', error=str(e)[:1000])
+        raise
+
+
+_extractions = BackgroundTasks(_extract_or_fail, 'document-extraction')
+
+
+def schedule_extraction(document_id):
+    """Queues a background extraction, at most one pending per document."""
+    _extractions.schedule(document_id)
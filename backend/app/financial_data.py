@@ -0,0 +1,179 @@
+"""
+Access to the user's financial data used as chat context.
+
+Snapshots from the mock API are cached per user with a TTL. Once fresh, an entry
+stays servable for a further stale window while a background refresh replaces
+it (stale-while-revalidate), so the chat path normally skips the upstream call.
+"""
+import logging
+import time
+
+import httpx
+import requests
+from django.conf import settings
+from django.core.cache import caches
+
+from . import metrics
+from .clients import error_reason, get_async_client, get_http_session, get_timeout
+from .profiling import span
+
+logger = logging.getLogger(__name__)
+
+
+def _first_record(data) -> dict:
+    if isinstance(data, list) and len(data) > 0:
+        return data[0]  # Return the first user's data object
+    return {}
+
+
+def _record_status_error(status_code: int):
+    metrics.upstream_errors.inc(upstream='mock_api', reason=f'http_{status_code}')
+    logger.warning("Mock data fetch failed: status %s", status_code)
+
+
+def _record_error(error: Exception):
+    metrics.upstream_errors.inc(upstream='mock_api', reason=error_reason(error))
+    logger.warning("Mock data fetch failed: %s", error)
+
+
+def fetch_mock_financial_data() -> dict:
+    """Fetches financial data from the external mock API service."""
+    try:
+        with span('mock_api'), metrics.upstream_duration.time(upstream='mock_api'):
+            response = get_http_session().get(settings.MOCK_API_URL, timeout=get_timeout())
+        if response.status_code == 200:
+            return _first_record(response.json())
+        _record_status_error(response.status_code)
+        return {}
+    except (requests.exceptions.RequestException, ValueError) as e:
+        _record_error(e)
+        return {}
+
+
+async def afetch_mock_financial_data() -> dict:
+    """Async counterpart of fetch_mock_financial_data using the pooled httpx client."""
+    try:
+        with span('mock_api'), metrics.upstream_duration.time(upstream='mock_api'):
+            response = await get_async_client().get(settings.MOCK_API_URL)
+        if response.status_code == 200:
+            return _first_record(response.json())
+        _record_status_error(response.status_code)
+        return {}
+    except (httpx.HTTPError, ValueError) as e:
+        _record_error(e)
+        return {}
+
+
+class FinancialSnapshotCache(metrics.CacheStatsMixin):
+    """
+    Per-user cache of financial snapshots backed by a Django cache alias.
+
+    Lookups within FINANCIAL_SNAPSHOT_TTL are hits. Within the following
+    FINANCIAL_SNAPSHOT_STALE_TTL the cached snapshot is still returned, and a
+    single background refresh per user is scheduled. Anything older is a miss
+    and is fetched inline. Failed (empty) fetches are never cached.
+    """
+
+    KEY_PREFIX = 'financial_snapshot'
+    STATS = ('hits', 'stale_hits', 'misses', 'refreshes', 'refresh_errors')
+    HIT_STATS = ('hits', 'stale_hits')
+
+    def __init__(self, fetch=fetch_mock_financial_data, afetch=afetch_mock_financial_data, cache_alias='default'):
+        super().__init__()
+        self._fetch = fetch
+        self._afetch = afetch
+        self._cache_alias = cache_alias
+        self._executor = metrics.BackgroundTasks(self._refresh, 'snapshot-refresh', max_workers=2)
+
+    @property
+    def _cache(self):
+        return caches[self._cache_alias]
+
+    def _key(self, user_key) -> str:
+        return f"{self.KEY_PREFIX}:{user_key}"
+
+    @staticmethod
+    def _entry(data) -> dict:
+        return {'fetched_at': time.time(), 'data': data}
+
+    @staticmethod
+    def _timeout() -> float:
+        return settings.FINANCIAL_SNAPSHOT_TTL + settings.FINANCIAL_SNAPSHOT_STALE_TTL
+
+    def _store(self, user_key, data):
+        if data:
+            self._cache.set(self._key(user_key), self._entry(data), self._timeout())
+
+    def _lookup(self, entry):
+        """Returns (data, is_stale) for a usable entry, or None for a miss."""
+        if not entry:
+            return None
+        age = time.time() - entry['fetched_at']
+        if age < settings.FINANCIAL_SNAPSHOT_TTL:
+            return entry['data'], False
+        if age < settings.FINANCIAL_SNAPSHOT_TTL + settings.FINANCIAL_SNAPSHOT_STALE_TTL:
+            return entry['data'], True
+        return None
+
+    def _refresh(self, user_key):
+        try:
+            data = self._fetch()
+            if data:
+                self._store(user_key, data)
+                self._count('refreshes')
+            else:
+                self._count('refresh_errors')
+        except Exception as e:
+            self._count('refresh_errors')
+            logger.warning("Snapshot refresh failed: %s", e)
+
+    def _serve(self, user_key, entry):
+        found = self._lookup(entry)
+        if found is None:
+            return None
+        data, is_stale = found
+        if is_stale:
+            self._count('stale_hits')
+            self._executor.schedule(user_key)  # At most one refresh per user at a time.
+        else:
+            self._count('hits')
+        return data
+
+    def get(self, user_key) -> dict:
+        data = self._serve(user_key, self._cache.get(self._key(user_key)))
+        if data is not None:
+            return data
+        self._count('misses')
+        data = self._fetch()
+        self._store(user_key, data)
+        return data
+
+    async def aget(self, user_key) -> dict:
+        data = self._serve(user_key, await self._cache.aget(self._key(user_key)))
+        if data is not None:
+            return data
+        self._count('misses')
+        data = await self._afetch()
+        if data:
+            await self._cache.aset(self._key(user_key), self._entry(data), self._timeout())
+        return data
+
+    def invalidate(self, user_key):
+        """Drops the cached snapshot so the next lookup fetches from upstream."""
+        self._cache.delete(self._key(user_key))
+
+
+snapshot_cache = FinancialSnapshotCache()
+
+
+def get_financial_snapshot(user_key) -> dict:
+    """Returns the cached financial snapshot for a user, fetching it if needed."""
+    return snapshot_cache.get(user_key)
+
+
+async def aget_financial_snapshot(user_key) -> dict:
+    return await snapshot_cache.aget(user_key)
+
+
+def invalidate_financial_snapshot(user_key):
+    snapshot_cache.invalidate(user_key)
@@ -0,0 +1,343 @@
+"""
+Streaming import of bank statements (CSV or OFX) into Transaction rows.
+
+Files are read line by line and handled in batches of rows: each batch is
+validated, checked against the hashes already imported and written with one
+bulk_create inside its own database transaction, so memory use does not grow
+with the size of the file. The monthly rollups of the users that received rows
+are recomputed once at the end. Every imported row stores a content hash in
+Transaction.import_hash, which makes re-importing a statement a no-op.
+"""
+import codecs
+import csv
+import hashlib
+import re
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.db import IntegrityError, transaction
+
+from .models import CustomUser, Transaction
+from .rollups import rebuild_rollups
+
+FORMATS = ('csv', 'ofx')
+DEFAULT_BATCH_SIZE = 2000
+MAX_REPORTED_ERRORS = 100
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d %b %Y')
+TYPE_ALIASES = {
+    'income': 'INCOME', 'credit': 'INCOME', 'cr': 'INCOME', 'dep': 'INCOME', 'int': 'INCOME', 'div': 'INCOME',
+    'directdep': 'INCOME',
+    'expense': 'EXPENSE', 'debit': 'EXPENSE', 'dr': 'EXPENSE', 'payment': 'EXPENSE', 'pos': 'EXPENSE',
+    'atm': 'EXPENSE', 'fee': 'EXPENSE', 'srvchg': 'EXPENSE', 'check': 'EXPENSE', 'directdebit': 'EXPENSE',
+    'repeatpmt': 'EXPENSE',
+    'transfer': 'TRANSFER', 'xfer': 'TRANSFER',
+}
+CSV_COLUMNS = {
+    'date': ('date', 'transaction date', 'posted', 'posting date', 'value date'),
+    'description': ('description', 'details', 'narration', 'memo', 'name', 'payee'),
+    'amount': ('amount', 'value', 'transaction amount'),
+    'type': ('type', 'transaction type', 'transaction_type', 'dr/cr'),
+    'category': ('category',),
+    'user': ('user', 'username', 'user_id'),
+}
+
+
+class StatementImportError(ValueError):
+    """Raised when a statement cannot be imported at all (unknown format, missing columns)."""
+
+
+class ImportResult:
+    """Counters for one import run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.created = 0
+        self.duplicates = 0
+        self.error_count = 0
+        self.errors = []  # The first MAX_REPORTED_ERRORS as (row number, message).
+        self.user_ids = set()  # Users that received new transactions.
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'row': row_number, 'error': message})
+
+    def as_dict(self) -> dict:
+        return {
+            'rows': self.rows,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'error_count': self.error_count,
+            'errors': self.errors,
+        }
+
+
+def detect_format(filename: str) -> str:
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension in ('ofx', 'qfx'):
+        return 'ofx'
+    if extension in ('csv', 'txt'):
+        return 'csv'
+    raise StatementImportError(f"Cannot tell the format of {filename!r}; expected a .csv or .ofx file.")
+
+
+def _lines(stream, encoding='utf-8-sig'):
+    """Decodes a binary stream (file, UploadedFile) one line at a time."""
+    return codecs.iterdecode(stream, encoding, errors='replace')
+
+
+def iter_csv_rows(stream):
+    """Yields (row number, row dict) from a CSV statement, with columns mapped to CSV_COLUMNS names."""
+    reader = csv.reader(_lines(stream))
+    header = [name.strip().lower() for name in next(reader, [])]
+    columns = {}
+    for field, aliases in CSV_COLUMNS.items():
+        for alias in aliases:
+            if alias in header:
+                columns[field] = header.index(alias)
+                break
+    missing = [field for field in ('date', 'description', 'amount') if field not in columns]
+    if missing:
+        raise StatementImportError(f"CSV header is missing the {', '.join(missing)} column(s).")
+
+    for row_number, values in enumerate(reader, start=2):
+        if not any(value.strip() for value in values):
+            continue
+        yield row_number, {
+            field: values[index].strip() if index < len(values) else ''
+            for field, index in columns.items()
+        }
+
+
+_OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+
+def iter_ofx_rows(stream):
+    """
+    Yields (row number, row dict) for each <STMTTRN> in an OFX statement. Works for
+    both SGML (OFX 1.x, unclosed tags) and XML (OFX 2.x) files, and does not need
+    the tags to be on separate lines.
+    """
+    transactions = []  # Completed rows from the current chunk.
+    state = {'current': None, 'row_number': 0}
+
+    def consume(text):
+        for closing, tag, value in _OFX_TAG.findall(text):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if not closing:
+                    state['row_number'] += 1
+                    state['current'] = {}
+                elif state['current'] is not None:
+                    transactions.append((state['row_number'], state['current']))
+                    state['current'] = None
+            elif state['current'] is not None and not closing and value.strip():
+                state['current'][tag] = value.strip()
+
+    buffer = ''
+    for line in _lines(stream, 'utf-8'):
+        buffer += line
+        # A value only ends at the next tag, so the last tag waits for more input.
+        cut = buffer.rfind('<')
+        if cut > 0:
+            consume(buffer[:cut])
+            buffer = buffer[cut:]
+            yield from transactions
+            transactions.clear()
+    consume(buffer)
+    yield from transactions
+
+
+def _ofx_to_row(fields: dict) -> dict:
+    return {
+        'date': fields.get('DTPOSTED', '')[:8],
+        'description': fields.get('NAME') or fields.get('MEMO') or fields.get('PAYEE', ''),
+        'amount': fields.get('TRNAMT', ''),
+        'type': fields.get('TRNTYPE', ''),
+        'fitid': fields.get('FITID', ''),
+    }
+
+
+def parse_date(value: str) -> date:
+    value = value.strip()
+    if len(value) == 8 and value.isdigit():
+        return datetime.strptime(value, '%Y%m%d').date()
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    raise ValueError(f"Unrecognised date {value!r}.")
+
+
+def parse_amount(value: str) -> Decimal:
+    cleaned = value.replace(',', '').replace(' ', '')
+    if cleaned.startswith('(') and cleaned.endswith(')'):
+        cleaned = '-' + cleaned[1:-1]
+    try:
+        amount = Decimal(cleaned)
+    except InvalidOperation:
+        raise ValueError(f"Unrecognised amount {value!r}.")
+    if not amount.is_finite() or abs(amount) >= 10 ** 10:
+        raise ValueError(f"Unrecognised amount {value!r}.")
+    return amount.quantize(Decimal('0.01'))
+
+
+def _transaction_type(value: str, amount: Decimal) -> str:
+    key = value.strip().lower().replace(' ', '').replace('_', '')
+    if key:
+        if key.upper() in TYPE_ALIASES.values():
+            return key.upper()
+        if key in TYPE_ALIASES:
+            return TYPE_ALIASES[key]
+        raise ValueError(f"Unrecognised transaction type {value!r}.")
+    return 'EXPENSE' if amount < 0 else 'INCOME'
+
+
+def import_hash(user_id, day, amount, transaction_type, description, category, occurrence=0, fitid='', run=0) -> str:
+    """
+    Content hash of a statement row, unique across users. Bank-assigned OFX ids are used when present;
+    otherwise identical rows on the same day are told apart by their occurrence number, and by their
+    run number when the day's rows are not contiguous in the file (see _Occurrences).
+    """
+    if fitid:
+        content = f"fitid|{fitid}"
+    else:
+        number = f"{occurrence}.{run}" if run else occurrence
+        content = f"{day.isoformat()}|{amount}|{transaction_type}|{description.lower()}|{(category or '').lower()}|{number}"
+    return hashlib.sha256(f"{user_id}|{content}".encode()).hexdigest()
+
+
+class _Occurrences:
+    """
+    Numbers repeated identical rows (same user, date, amount, type, description
+    and category). Only the counts of each user's current run of same-day rows
+    are kept, so memory stays flat for statements grouped by date, in either
+    order. A day that comes back after other days starts a new run, numbered
+    from 0 again but told apart by its run number; what is remembered for that
+    is one counter per (user, day), never one entry per row.
+    """
+
+    def __init__(self):
+        self._current = {}  # user_id -> (day, run, {key: count})
+        self._runs = {}  # (user_id, day) -> runs started
+
+    def next(self, user_id, day, key) -> tuple:
+        """(occurrence, run) of the row."""
+        current = self._current.get(user_id)
+        if current is None or current[0] != day:
+            run = self._runs.get((user_id, day), 0)
+            self._runs[(user_id, day)] = run + 1
+            current = self._current[user_id] = (day, run, {})
+        _, run, counts = current
+        number = counts.get(key, 0)
+        counts[key] = number + 1
+        return number, run
+
+
+class _UserResolver:
+    """Maps the CSV user column (id or username) to user ids, caching lookups."""
+
+    def __init__(self):
+        self._ids = {}
+
+    def __call__(self, value: str) -> int:
+        if value not in self._ids:
+            lookup = {'pk': value} if value.isdigit() else {'username': value}
+            user_id = CustomUser.objects.filter(**lookup).values_list('pk', flat=True).first()
+            if user_id is None:
+                raise ValueError(f"Unknown user {value!r}.")
+            self._ids[value] = user_id
+        return self._ids[value]
+
+
+def _build(row: dict, user_id, occurrences) -> Transaction:
+    day = parse_date(row.get('date', ''))
+    amount = parse_amount(row.get('amount', ''))
+    transaction_type = _transaction_type(row.get('type', ''), amount)
+    description = (row.get('description') or '').strip()[:255]
+    if not description:
+        raise ValueError("Missing description.")
+    category = (row.get('category') or '').strip()[:50] or None
+    amount = abs(amount)
+    occurrence, run = occurrences.next(user_id, day, (amount, transaction_type, description.lower(), category))
+    return Transaction(
+        user_id=user_id,
+        description=description,
+        amount=amount,
+        transaction_type=transaction_type,
+        category=category,
+        date=day,
+        import_hash=import_hash(
+            user_id, day, amount, transaction_type, description, category, occurrence, row.get('fitid', ''), run,
+        ),
+    )
+
+
+def _write_batch(batch: list, result: ImportResult):
+    """Inserts the rows of a batch that have not been imported before."""
+    unique = {}
+    for t in batch:
+        if t.import_hash in unique:
+            result.duplicates += 1
+        else:
+            unique[t.import_hash] = t
+
+    for attempt in range(2):
+        existing = set(
+            Transaction.objects.filter(import_hash__in=list(unique)).values_list('import_hash', flat=True)
+        )
+        new = [t for import_hash, t in unique.items() if import_hash not in existing]
+        try:
+            with transaction.atomic():
+                Transaction.objects.bulk_create(new)
+        except IntegrityError:
+            # A concurrent import inserted some of these rows; look again once.
+            if attempt:
+                raise
+            continue
+        result.duplicates += len(unique) - len(new)
+        result.created += len(new)
+        result.user_ids.update(t.user_id for t in new)
+        return
+
+
+def import_transactions(stream, fmt: str, user=None, batch_size: int = DEFAULT_BATCH_SIZE) -> ImportResult:
+    """
+    Imports a CSV or OFX statement from a binary stream for `user`. Without a user,
+    each CSV row names its owner in a user/username column (id or username).
+    Invalid rows are skipped and reported in the result.
+    """
+    if fmt not in FORMATS:
+        raise StatementImportError(f"Unsupported format {fmt!r}; expected one of {', '.join(FORMATS)}.")
+    if user is None and fmt == 'ofx':
+        raise StatementImportError("OFX statements can only be imported for a given user.")
+
+    rows = iter_csv_rows(stream) if fmt == 'csv' else ((n, _ofx_to_row(f)) for n, f in iter_ofx_rows(stream))
+    resolve_user = _UserResolver()
+    occurrences = _Occurrences()
+    result = ImportResult()
+    batch = []
+    try:
+        for row_number, row in rows:
+            if user is None and 'user' not in row:
+                raise StatementImportError("The CSV has no user/username column, so a user must be given.")
+            result.rows += 1
+            try:
+                user_id = user.pk if user is not None else resolve_user(row.get('user', ''))
+                batch.append(_build(row, user_id, occurrences))
+            except ValueError as e:
+                result.add_error(row_number, str(e))
+            if len(batch) >= batch_size:
+                _write_batch(batch, result)
+                batch = []
+        if batch:
+            _write_batch(batch, result)
+    finally:
+        # One grouped recompute is far cheaper than adjusting rollups batch by batch,
+        # and it also covers the batches written before a failure.
+        user_ids = sorted(result.user_ids)
+        for start in range(0, len(user_ids), 500):
+            rebuild_rollups(user_ids=user_ids[start:start + 500])
+    return result
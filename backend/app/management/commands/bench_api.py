@@ -0,0 +1,162 @@
+import itertools
+import json
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.authentication import issue_token
+from app.benchmarks import UpstreamStub, scratch_database, summarize
+from app.models import CustomUser
+from app.seeding import seed_usernames, seed_users
+
+SCENARIOS = ('login', 'register', 'financial-profile', 'chat')
+QUESTIONS = (
+    "How much did I spend on groceries last month?",
+    "What is my net worth?",
+    "Am I saving enough for retirement?",
+    "Which of my debts should I pay off first?",
+    "How is my investment portfolio split?",
+    "Give me an overview of my finances.",
+)
+PASSWORD = 'bench-password'
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a scratch database with synthetic users and measures /api/login/, /api/register/, "
+        "/api/financial-profile/ and /api/chat/ (against a local fake LLM): p50/p95/p99 latency and "
+        "queries per request. Fails if a scenario is slower than the stored baseline by more than "
+        "--tolerance at p95 or makes more queries; --save-baseline stores this run instead."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200, help="Users to seed.")
+        parser.add_argument('--transactions', type=int, default=200, help="Transactions per seeded user.")
+        parser.add_argument('--requests', type=int, default=50, help="Timed requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=5, help="Untimed requests per scenario.")
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+        parser.add_argument('--llm-latency-ms', type=float, default=0.0, help="Simulated LLM response time.")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed p95 slowdown over the baseline.")
+        parser.add_argument('--save-baseline', action='store_true', help="Store this run as the baseline.")
+
+    def handle(self, *args, **options):
+        scenarios = options['scenarios'].split(',')
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}.")
+
+        stub = UpstreamStub(llm_latency=options['llm_latency_ms'] / 1000,
+                            reply="You spent about 370 on groceries last month.")
+        with stub, scratch_database(), override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            MOCK_API_URL=stub.mock_api_url,
+            OPENROUTER_API_URL=stub.openrouter_url,
+            OPENROUTER_API_KEY='bench',
+            CHAT_COMPACT_THRESHOLD=10 ** 6,  # Keep background compaction out of the measurements.
+        ):
+            seeded = seed_users(options['users'], options['transactions'], seed=0, password=PASSWORD, prefix='bench')
+            self.stdout.write(f"seeded {seeded.users} users, {seeded.rows['transactions']} transactions "
+                              f"in {seeded.seconds:.1f}s")
+            self.usernames = seed_usernames('bench', options['users'])
+            results = {}
+            for scenario in scenarios:
+                results[scenario] = self._measure(scenario, options['requests'], options['warmup'])
+
+        self._report(results)
+        baseline_path = Path(settings.BENCHMARK_BASELINE_DIR) / 'api.json'
+        run = {'users': options['users'], 'transactions': options['transactions'], 'scenarios': results}
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(run, indent=2) + '\n')
+            self.stdout.write(f"baseline saved to {baseline_path}")
+        elif baseline_path.exists():
+            self._compare(run, json.loads(baseline_path.read_text()), options['tolerance'])
+
+    def _requests(self, scenario):
+        """An endless supply of (client, method, path, data) for a scenario."""
+        if scenario == 'login':
+            client = Client()
+            for i in itertools.count():
+                email = self.usernames[i % len(self.usernames)]
+                yield client, 'post', '/api/login/', {'email': email, 'password': PASSWORD}
+        elif scenario == 'register':
+            client = Client()
+            for i in itertools.count():
+                email = f'bench-new{i:06d}@example.com'
+                yield client, 'post', '/api/register/', {'email': email, 'password': PASSWORD, 'password2': PASSWORD}
+        elif scenario == 'financial-profile':
+            clients = [
+                Client(HTTP_AUTHORIZATION=f'Token {issue_token(user).key}')
+                for user in CustomUser.objects.filter(username__in=self.usernames[:20])
+            ]
+            for i in itertools.count():
+                yield clients[i % len(clients)], 'get', '/api/financial-profile/', None
+        elif scenario == 'chat':
+            clients = []
+            for user in CustomUser.objects.filter(username__in=self.usernames[:20]):
+                client = Client()
+                client.force_login(user, backend='django.contrib.auth.backends.ModelBackend')
+                clients.append(client)
+            for i in itertools.count():
+                # Numbered so no reply comes from the response cache.
+                message = f"{QUESTIONS[i % len(QUESTIONS)]} (#{i})"
+                yield clients[i % len(clients)], 'post', '/api/chat/', json.dumps({'message': message})
+
+    def _measure(self, scenario, n, warmup) -> dict:
+        latencies, queries, errors = [], [], 0
+        requests = self._requests(scenario)
+        for index in range(warmup + n):
+            client, method, path, data = next(requests)
+            kwargs = {'content_type': 'application/json'} if isinstance(data, str) else {}
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = getattr(client, method)(path, data, **kwargs)
+                elapsed = time.perf_counter() - started
+            if index < warmup:
+                continue
+            errors += response.status_code >= 400
+            latencies.append(elapsed)
+            queries.append(len(captured))
+        summary = summarize(latencies, sum(latencies))
+        return {
+            'p50_ms': summary['p50_ms'], 'p95_ms': summary['p95_ms'], 'p99_ms': summary['p99_ms'],
+            'mean_ms': summary['mean_ms'], 'queries': round(statistics.fmean(queries), 2), 'errors': errors,
+        }
+
+    def _report(self, results):
+        self.stdout.write(f"{'scenario':<20}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}{'errors':>8}")
+        for scenario, row in results.items():
+            self.stdout.write(f"{scenario:<20}{row['p50_ms']:>9.2f}{row['p95_ms']:>9.2f}{row['p99_ms']:>9.2f}"
+                              f"{row['queries']:>9.2f}{row['errors']:>8}")
+
+    def _compare(self, run, baseline, tolerance):
+        if (run['users'], run['transactions']) != (baseline['users'], baseline['transactions']):
+            self.stdout.write(self.style.WARNING(
+                f"baseline was seeded with {baseline['users']} users x {baseline['transactions']} transactions; "
+                f"this run used {run['users']} x {run['transactions']}"
+            ))
+        regressions = []
+        for scenario, row in run['scenarios'].items():
+            before = baseline['scenarios'].get(scenario)
+            if before is None:
+                continue
+            limit_ms = before['p95_ms'] * (1 + tolerance)
+            self.stdout.write(f"{scenario:<20}p95 {row['p95_ms']:.2f} ms vs {before['p95_ms']:.2f} ms, "
+                              f"queries {row['queries']:.2f} vs {before['queries']:.2f}")
+            if row['p95_ms'] > limit_ms:
+                regressions.append(f"{scenario} p95 {row['p95_ms']:.2f} ms > limit {limit_ms:.2f} ms")
+            if row['queries'] > before['queries']:
+                regressions.append(f"{scenario} makes {row['queries']:.2f} queries per request, "
+                                   f"baseline {before['queries']:.2f}")
+            if row['errors'] > before['errors']:
+                regressions.append(f"{scenario} had {row['errors']} errors, baseline {before['errors']}")
+        if regressions:
+            raise CommandError("API benchmark regressed: " + "; ".join(regressions))
+        self.stdout.write("baseline comparison: OK")
+
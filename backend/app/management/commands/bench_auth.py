@@ -0,0 +1,48 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.authentication import issue_token, token_cache
+from app.benchmarks import scratch_database
+from app.models import CustomUser
+
+ENDPOINTS = ('/api/net-worth/', '/api/portfolio/', '/api/transactions/', '/api/transactions/monthly/')
+
+
+class Command(BaseCommand):
+    help = (
+        "Counts the database queries of token-authenticated GET requests with the token "
+        "cache disabled (TOKEN_AUTH_CACHE_TTL=0, DRF's plain lookup) and enabled."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Requests per endpoint and mode.")
+
+    def handle(self, *args, **options):
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            user = CustomUser.objects.create_user('bench-auth', password='bench')
+            client = Client(HTTP_AUTHORIZATION=f'Token {issue_token(user).key}')
+            self.stdout.write(f"{'endpoint':<28}{'mode':<10}{'queries':>9}{'auth q':>8}{'ms':>8}")
+            for endpoint in ENDPOINTS:
+                for mode, ttl in (('uncached', 0), ('cached', 60)):
+                    with override_settings(TOKEN_AUTH_CACHE_TTL=ttl):
+                        queries, auth, ms = self._run(client, endpoint, options['requests'])
+                    self.stdout.write(f"{endpoint:<28}{mode:<10}{queries:>9.2f}{auth:>8.2f}{ms:>8.2f}")
+            self.stdout.write(f"token cache: {token_cache.stats()}")
+
+    def _run(self, client, endpoint, n):
+        client.get(endpoint)  # Warm the token cache and the endpoint's own caches.
+        queries, auth, elapsed = [], [], []
+        for _ in range(n):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                response = client.get(endpoint)
+                elapsed.append(time.perf_counter() - started)
+            assert response.status_code == 200, response.content
+            queries.append(len(captured))
+            auth.append(sum('authtoken_token' in query['sql'] for query in captured))
+        return statistics.fmean(queries), statistics.fmean(auth), statistics.fmean(elapsed) * 1000
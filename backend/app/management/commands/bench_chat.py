@@ -0,0 +1,92 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+
+from app.benchmarks import UpstreamStub, summarize
+from app.financial_data import snapshot_cache
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmarks concurrent chats per worker for the sync chat_handler and the async "
+        "chat view, against a local stub of the mock-data API and OpenRouter. The stream row "
+        "reports time to first token for the SSE view."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help="Chat requests per mode.")
+        parser.add_argument('--concurrency', type=int, default=50, help="In-flight chats for the async view.")
+        parser.add_argument('--sync-threads', type=int, default=1, help="Threads per sync worker (1 = one WSGI worker).")
+        parser.add_argument('--llm-latency', type=float, default=0.2, help="Simulated LLM latency in seconds.")
+        parser.add_argument('--token-latency', type=float, default=0.02, help="Simulated delay between streamed tokens.")
+        parser.add_argument('--mock-latency', type=float, default=0.02, help="Simulated mock-API latency in seconds.")
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        # Distinct messages so every chat misses the LLM response cache and reaches the stub.
+        def bodies(mode):
+            return [json.dumps({'message': f'How much did I spend last month? ({mode} #{i})'}) for i in range(n)]
+
+        stub = UpstreamStub(
+            mock_latency=options['mock_latency'],
+            llm_latency=options['llm_latency'],
+            token_latency=options['token_latency'],
+            reply="Based on your transactions you spent about 370 last month, mostly on groceries.",
+        )
+        with stub:
+            overrides = override_settings(
+                ALLOWED_HOSTS=['testserver'],
+                MOCK_API_URL=stub.mock_api_url,
+                OPENROUTER_API_URL=stub.openrouter_url,
+                OPENROUTER_API_KEY='bench',
+                SESSION_ENGINE='django.contrib.sessions.backends.cache',
+            )
+            with overrides:
+                sync_stats = self._run_sync(bodies('sync'), options['sync_threads'])
+                async_stats = asyncio.run(self._run_async(bodies('async'), options['concurrency']))
+                stream_stats = asyncio.run(self._run_async(bodies('stream'), options['concurrency'], stream=True))
+
+        self.stdout.write(f"{'mode':<8}" + ''.join(f"{key:>16}" for key in sync_stats))
+        for mode, stats in (('sync', sync_stats), ('async', async_stats), ('stream', stream_stats)):
+            self.stdout.write(f"{mode:<8}" + ''.join(f"{value:>16}" for value in stats.values()))
+        self.stdout.write(f"upstream calls: {stub.hits}")
+        self.stdout.write(f"snapshot cache: {snapshot_cache.stats()}")
+
+    def _run_sync(self, bodies, threads):
+        def one(body):
+            client = Client()
+            start = time.perf_counter()
+            response = client.post('/api/chat/', body, content_type='application/json')
+            assert response.status_code == 200, response.content
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            latencies = list(pool.map(one, bodies))
+        return summarize(latencies, time.perf_counter() - start)
+
+    async def _run_async(self, bodies, concurrency, stream=False):
+        semaphore = asyncio.Semaphore(concurrency)
+        path = '/api/chat/stream/' if stream else '/api/chat/async/'
+
+        async def one(body):
+            async with semaphore:
+                client = AsyncClient()
+                start = time.perf_counter()
+                response = await client.post(path, body, content_type='application/json')
+                assert response.status_code == 200, response.content
+                if not stream:
+                    return time.perf_counter() - start
+                first_token = None
+                async for _ in response.streaming_content:
+                    if first_token is None:
+                        first_token = time.perf_counter() - start
+                return first_token
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(one(body) for body in bodies))
+        return summarize(latencies, time.perf_counter() - start)
@@ -0,0 +1,84 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.benchmarks import UpstreamStub, scratch_database
+from app.models import CustomUser
+from app.permissions import permission_cache
+
+SESSION_ENGINES = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}
+
+
+def _classify(sql: str) -> str:
+    verb = sql.lstrip().split(None, 1)[0].upper()
+    return 'write' if verb in ('INSERT', 'UPDATE', 'DELETE', 'REPLACE') else 'read' if verb == 'SELECT' else 'other'
+
+
+class Command(BaseCommand):
+    help = (
+        "Counts the database queries and writes of each /api/chat/ request, per session "
+        "backend, for a signed-in user chatting against a local stub of the upstream services. "
+        "The first request (which starts the conversation) is reported separately."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50, help="Chat requests per session backend.")
+        parser.add_argument('--backends', default=','.join(SESSION_ENGINES))
+
+    def handle(self, *args, **options):
+        stub = UpstreamStub(reply="You spent about 370 last month, mostly on groceries.")
+        with stub, scratch_database(), override_settings(
+            ALLOWED_HOSTS=['testserver'],
+            MOCK_API_URL=stub.mock_api_url,
+            OPENROUTER_API_URL=stub.openrouter_url,
+            OPENROUTER_API_KEY='bench',
+            CHAT_COMPACT_THRESHOLD=10 ** 6,  # Keep background compaction out of the counts.
+        ):
+            self.stdout.write(
+                f"{'backend':<16}{'request':<10}{'queries':>9}{'reads':>7}{'writes':>8}"
+                f"{'session q':>11}{'session w':>11}{'ms':>8}"
+            )
+            for index, backend in enumerate(options['backends'].split(',')):
+                with override_settings(SESSION_ENGINE=SESSION_ENGINES[backend]):
+                    rows = self._run(f'bench{index}', options['requests'])
+                for label, counts in rows:
+                    self.stdout.write(
+                        f"{backend:<16}{label:<10}{counts['queries']:>9.1f}{counts['read']:>7.1f}"
+                        f"{counts['write']:>8.1f}{counts['session']:>11.1f}{counts['session_write']:>11.1f}"
+                        f"{counts['ms']:>8.2f}"
+                    )
+
+    def _run(self, username, n):
+        user = CustomUser.objects.create_user(username, password='bench')
+        client = Client()
+        client.force_login(user)
+        permission_cache.clear()
+        samples = []
+        for i in range(n):
+            body = json.dumps({'message': f'How much did I spend last month? (#{i})'})
+            with CaptureQueriesContext(connection) as queries:
+                started = time.perf_counter()
+                response = client.post('/api/chat/', body, content_type='application/json')
+                elapsed = time.perf_counter() - started
+            assert response.status_code == 200, response.content
+            counts = {'queries': len(queries), 'read': 0, 'write': 0, 'other': 0, 'session': 0, 'session_write': 0,
+                      'ms': elapsed * 1000}
+            for query in queries:
+                kind = _classify(query['sql'])
+                counts[kind] += 1
+                if 'django_session' in query['sql']:
+                    counts['session'] += 1
+                    counts['session_write'] += kind == 'write'
+            samples.append(counts)
+        rest = samples[1:] or samples
+        mean = {key: statistics.fmean(sample[key] for sample in rest) for key in samples[0]}
+        return [('first', samples[0]), ('mean rest', mean)]
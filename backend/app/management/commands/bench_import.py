@@ -0,0 +1,103 @@
+import json
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Imported in a fresh interpreter: blocks all network access, then loads the
+# WSGI application and the URLconf (which is what pulls in app.views on a worker's
+# first request).
+COLD_START_SCRIPT = r"""
+import os, socket, sys, time
+
+def _no_network(*args, **kwargs):
+    raise RuntimeError("network access during import")
+
+socket.socket.connect = _no_network
+socket.create_connection = _no_network
+socket.getaddrinfo = _no_network
+
+start = time.perf_counter()
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core_project.settings')
+import core_project.wsgi
+from django.urls import get_resolver
+get_resolver().url_patterns
+print("COLD_START_MS=%.2f" % ((time.perf_counter() - start) * 1000))
+"""
+
+FORBIDDEN_MODULES = ('pandas', 'sklearn', 'numpy', 'scipy')
+IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)$')
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures cold start of core_project.wsgi (plus the URLconf) with python -X importtime "
+        "and fails if it regresses, touches the network, or imports the ML stack."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Fresh interpreters to start; the median is used.")
+        parser.add_argument('--budget-ms', type=float, default=1500.0, help="Absolute cold-start budget.")
+        parser.add_argument('--tolerance', type=float, default=0.25, help="Allowed slowdown over the saved baseline.")
+        parser.add_argument('--top', type=int, default=10, help="Slowest top-level imports to list.")
+        parser.add_argument('--save-baseline', action='store_true', help="Store this run's median as the baseline.")
+
+    def handle(self, *args, **options):
+        timings, modules, imported = [], {}, set()
+        for _ in range(options['runs']):
+            cold_start_ms, modules, imported = self._run_once()
+            timings.append(cold_start_ms)
+        median_ms = statistics.median(timings)
+
+        self.stdout.write(f"cold start: median {median_ms:.1f} ms over {len(timings)} runs "
+                          f"(min {min(timings):.1f}, max {max(timings):.1f})")
+        slowest = sorted(modules.items(), key=lambda item: item[1], reverse=True)[:options['top']]
+        for name, cumulative_us in slowest:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+
+        loaded = sorted(name for name in imported if name.split('.')[0] in FORBIDDEN_MODULES)
+        if loaded:
+            raise CommandError(f"ML stack imported at startup: {', '.join(loaded)}")
+
+        baseline_path = Path(settings.BENCHMARK_BASELINE_DIR) / 'import_time.json'
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps({'cold_start_ms': round(median_ms, 2)}, indent=2) + '\n')
+            self.stdout.write(f"baseline saved to {baseline_path}")
+            return
+
+        if median_ms > options['budget_ms']:
+            raise CommandError(f"cold start {median_ms:.1f} ms exceeds budget of {options['budget_ms']:.1f} ms")
+        if baseline_path.exists():
+            baseline_ms = json.loads(baseline_path.read_text())['cold_start_ms']
+            limit_ms = baseline_ms * (1 + options['tolerance'])
+            if median_ms > limit_ms:
+                raise CommandError(
+                    f"cold start regressed: {median_ms:.1f} ms vs baseline {baseline_ms:.1f} ms "
+                    f"(limit {limit_ms:.1f} ms)"
+                )
+            self.stdout.write(f"baseline {baseline_ms:.1f} ms, limit {limit_ms:.1f} ms: OK")
+
+    def _run_once(self):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', COLD_START_SCRIPT],
+            cwd=settings.BASE_DIR, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            tail = result.stderr.strip().splitlines()[-1:] or ['']
+            raise CommandError(f"cold start failed: {tail[0]}")
+
+        match = re.search(r'COLD_START_MS=([\d.]+)', result.stdout)
+        top_level, imported = {}, set()
+        for line in result.stderr.splitlines():
+            parsed = IMPORTTIME_LINE.match(line)
+            if not parsed:
+                continue
+            imported.add(parsed.group(4))
+            if len(parsed.group(3)) == 1:
+                top_level[parsed.group(4)] = int(parsed.group(2))
+        return float(match.group(1)), top_level, imported
@@ -0,0 +1,103 @@
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+
+from app import portfolio
+from app.benchmarks import scratch_database
+from app.models import CustomUser, Investment
+
+INVESTMENT_TYPES = [choice for choice, _ in Investment.INVESTMENT_TYPE_CHOICES]
+CENT = Decimal('0.01')
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a scratch database with investment holdings and compares portfolio valuation "
+        "through the Investment.total_value property, the ORM aggregates and the NumPy batch path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--holdings', type=int, default=5000, help="Holdings per user.")
+        parser.add_argument('--repeat', type=int, default=5, help="Timed runs per method.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        with scratch_database():
+            users = [CustomUser.objects.create_user(f'bench{i}', password='bench') for i in range(options['users'])]
+            for user in users:
+                self._seed(user, options['holdings'])
+            self._run(users[0], options['repeat'])
+
+    def _seed(self, user, n):
+        Investment.objects.bulk_create([
+            Investment(
+                user=user,
+                name=f'Holding {i}',
+                investment_type=random.choice(INVESTMENT_TYPES),
+                quantity=Decimal(random.randint(1, 10 ** 9)) / 10 ** 6,
+                current_value_per_unit=Decimal(random.randint(1, 10 ** 6)) / 100,
+            )
+            for i in range(n)
+        ], batch_size=2000)
+
+    def _timed(self, repeat, fn):
+        samples, result = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = fn()
+            samples.append(time.perf_counter() - started)
+        return round(statistics.median(samples) * 1000, 2), result
+
+    def _run(self, user, repeat):
+        holdings = Investment.objects.filter(user=user)
+        everyone = Investment.objects.all()
+        shocks = {'STOCK': Decimal('-0.25'), 'CRYPTO': Decimal('-0.5'), '*': Decimal('0.02')}
+
+        # Each run builds a fresh queryset so nothing is served from a result cache.
+        def python_total():
+            return sum((h.total_value for h in holdings.all()), Decimal('0')).quantize(CENT)
+
+        def python_by_type():
+            totals = {}
+            for h in holdings.all():
+                totals[h.investment_type] = totals.get(h.investment_type, Decimal('0')) + h.total_value
+            return {key: value.quantize(CENT) for key, value in totals.items()}
+
+        def python_revalue():
+            factors = {t: 1 + shocks.get(t, shocks['*']) for t in INVESTMENT_TYPES}
+            return sum((h.total_value * factors[h.investment_type] for h in everyone.all()), Decimal('0')).quantize(CENT)
+
+        loaded = portfolio.load_holdings(everyone)
+
+        rows = [
+            ('total, property loop', python_total),
+            ('total, ORM aggregate', lambda: holdings.all().total_value()),
+            ('total, NumPy', lambda: portfolio.total_value(portfolio.load_holdings(holdings.all()))),
+            ('by type, property loop', python_by_type),
+            ('by type, ORM group by', lambda: holdings.all().value_by_type()),
+            ('by type, NumPy', lambda: portfolio.value_by_type(portfolio.load_holdings(holdings.all()))),
+            ('what-if all users, loop', python_revalue),
+            ('what-if all users, NumPy', lambda: portfolio.revalue(portfolio.load_holdings(everyone.all()), shocks)['total']),
+            ('what-if, NumPy preloaded', lambda: portfolio.revalue(loaded, shocks)['total']),
+        ]
+        self.stdout.write(f"one user: {holdings.count()} holdings; all users: {everyone.count()} holdings")
+        self.stdout.write(f"{'method':<28}{'median_ms':>12}  result")
+        results = {}
+        for label, fn in rows:
+            ms, result = self._timed(repeat, fn)
+            results[label] = result
+            self.stdout.write(f"{label:<28}{ms:>12}  {result}")
+
+        checks = {
+            'total': [results[k] for k in results if k.startswith('total')],
+            'by type': [results[k] for k in results if k.startswith('by type')],
+            'what-if': [results[k] for k in results if k.startswith('what-if')],
+        }
+        for name, values in checks.items():
+            matches = all(value == values[0] for value in values)
+            self.stdout.write(f"{name} results identical: {matches}")
@@ -0,0 +1,85 @@
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone as django_timezone
+
+from app.benchmarks import scratch_database
+from app.models import CustomUser, Investment
+from app.price_feed import ingest_price_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a scratch database with holdings and times price-feed ingestion: a full refresh, "
+        "a re-run of the same feed, and, for reference, the same refresh with bulk_update."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--holdings', type=int, default=100000)
+        parser.add_argument('--symbols', type=int, default=5000)
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        symbols = [f'SYM{i:05d}' for i in range(options['symbols'])]
+        with scratch_database(), tempfile.TemporaryDirectory() as directory:
+            self._seed(options['users'], options['holdings'], symbols)
+            now = datetime.now(timezone.utc)
+            first = self._write_feed(directory, 'first.csv', symbols, now)
+            second = self._write_feed(directory, 'second.csv', symbols, now + timedelta(minutes=1))
+
+            for label, path in (('refresh', first), ('same feed again', first), ('next feed', second)):
+                started = time.perf_counter()
+                result = ingest_price_feed(path)
+                self.stdout.write(
+                    f"{label:<18}{time.perf_counter() - started:>8.2f}s  {result.as_dict()}"
+                )
+
+            started = time.perf_counter()
+            updated = self._bulk_update_reference(second)
+            self.stdout.write(f"{'bulk_update ref':<18}{time.perf_counter() - started:>8.2f}s  {{'updated': {updated}}}")
+
+    def _seed(self, users, holdings, symbols):
+        CustomUser.objects.bulk_create([CustomUser(username=f'bench{i}') for i in range(users)])
+        user_ids = list(CustomUser.objects.values_list('pk', flat=True))
+        Investment.objects.bulk_create([
+            Investment(
+                user_id=random.choice(user_ids),
+                name=f'Holding {i}',
+                symbol=random.choice(symbols),
+                investment_type='STOCK',
+                quantity=Decimal(random.randint(1, 10 ** 6)) / 1000,
+                current_value_per_unit=Decimal('100.00'),
+            )
+            for i in range(holdings)
+        ], batch_size=5000)
+
+    def _write_feed(self, directory, name, symbols, timestamp):
+        path = os.path.join(directory, name)
+        with open(path, 'w') as feed:
+            feed.write('symbol,price,timestamp\n')
+            for symbol in symbols:
+                feed.write(f"{symbol},{random.randint(1, 10 ** 6) / 100:.2f},{timestamp.isoformat()}\n")
+        return path
+
+    def _bulk_update_reference(self, path):
+        """Loads every holding and writes the new prices with Model.objects.bulk_update."""
+        quotes = {}
+        with open(path) as feed:
+            next(feed)
+            for line in feed:
+                symbol, price, _ = line.strip().split(',')
+                quotes[symbol] = Decimal(price) + 1
+        holdings = list(Investment.objects.only('id', 'symbol', 'current_value_per_unit'))
+        now = django_timezone.now()
+        for holding in holdings:
+            holding.current_value_per_unit = quotes[holding.symbol]
+            holding.updated_at = now
+        Investment.objects.bulk_update(holdings, ['current_value_per_unit', 'updated_at'], batch_size=1000)
+        return len(holdings)
@@ -0,0 +1,114 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from app import batching, ml
+from app.benchmarks import scratch_database, summarize, synthetic_bank_marketing
+from app.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Trains the marketing model on synthetic data into a temporary model directory and "
+        "measures scoring throughput through /api/marketing/score/ for several batch sizes, "
+        "against scoring the same records one request at a time. Then sends single-record "
+        "requests from concurrent threads with micro-batching off (max batch size 1) and on."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--train-rows', type=int, default=45000)
+        parser.add_argument('--records', type=int, default=2000, help="Records scored per measurement.")
+        parser.add_argument('--batch-sizes', default='1,100,1000')
+        parser.add_argument('--concurrency', default='1,8,32', help="Client threads for the micro-batching runs.")
+        parser.add_argument('--max-wait-ms', type=float, default=None, help="Default: MODEL_BATCH_MAX_WAIT_MS.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory, scratch_database(), override_settings(
+            ALLOWED_HOSTS=['testserver'], MARKETING_MODEL_DIR=directory, MARKETING_MODEL_VERSION=None,
+        ):
+            dataset = os.path.join(directory, 'bank.csv')
+            synthetic_bank_marketing(options['train_rows'], options['seed']).to_csv(dataset, sep=';', index=False)
+            started = time.perf_counter()
+            pipeline, metrics = ml.train_marketing_model(dataset)
+            version = ml.save_model_artifact(pipeline, metrics)
+            self.stdout.write(f"trained version {version} in {time.perf_counter() - started:.2f}s "
+                              f"(accuracy {metrics['accuracy']})")
+
+            records = synthetic_bank_marketing(options['records'], options['seed'] + 1)[ml.FEATURES]
+            records = json.loads(records.to_json(orient='records'))
+            client = Client()
+            client.force_login(CustomUser.objects.create_user('bench', password='bench'))
+
+            ml.clear_model_cache()
+            started = time.perf_counter()
+            self._post(client, records[:1])
+            self.stdout.write(f"first request (loads the artifact): {(time.perf_counter() - started) * 1000:.1f}ms")
+
+            self.stdout.write(f"{'batch size':>10}{'requests':>10}{'records/s':>12}{'ms/request':>12}")
+            for batch_size in [int(size) for size in options['batch_sizes'].split(',')]:
+                requests = 0
+                started = time.perf_counter()
+                for start in range(0, len(records), batch_size):
+                    self._post(client, records[start:start + batch_size])
+                    requests += 1
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f"{batch_size:>10}{requests:>10}{len(records) / elapsed:>12.0f}"
+                                  f"{elapsed / requests * 1000:>12.2f}")
+
+            self.stdout.write("\nsingle-record requests from concurrent clients:")
+            self.stdout.write(f"{'mode':<10}{'clients':>8}{'req/s':>9}{'p50_ms':>9}{'p99_ms':>9}"
+                              f"{'batch':>8}{'fill':>8}")
+            max_wait = options['max_wait_ms']
+            for concurrency in [int(n) for n in options['concurrency'].split(',')]:
+                for mode, max_size in (('unbatched', 1), ('batched', None)):
+                    overrides = {'MODEL_BATCH_MAX_SIZE': max_size} if max_size else {}
+                    if max_wait is not None:
+                        overrides['MODEL_BATCH_MAX_WAIT_MS'] = max_wait
+                    with override_settings(**overrides):
+                        batching.reset_batchers()
+                        summary = self._concurrent(records, concurrency)
+                        stats = batching.get_batcher('marketing').stats()
+                    self.stdout.write(
+                        f"{mode:<10}{concurrency:>8}{summary['throughput_rps']:>9.0f}{summary['p50_ms']:>9.2f}"
+                        f"{summary['p99_ms']:>9.2f}{stats.get('mean_batch_size', 0):>8.1f}"
+                        f"{stats.get('mean_fill_rate', 0):>8.3f}"
+                    )
+            batching.reset_batchers()
+            ml.clear_model_cache()
+
+    def _concurrent(self, records, concurrency):
+        """Each thread posts one record at a time; returns summarize() of all requests."""
+        user = CustomUser.objects.get(username='bench')
+        clients = []
+        for _ in range(concurrency):
+            client = Client()
+            client.force_login(user)
+            clients.append(client)
+        latencies, lock = [], threading.Lock()
+
+        def worker(client, share):
+            for record in share:
+                started = time.perf_counter()
+                self._post(client, [record])
+                with lock:
+                    latencies.append(time.perf_counter() - started)
+
+        threads = [threading.Thread(target=worker, args=(client, records[i::concurrency]))
+                   for i, client in enumerate(clients)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return summarize(latencies, time.perf_counter() - started)
+
+    def _post(self, client, records):
+        response = client.post('/api/marketing/score/', {'records': records}, content_type='application/json')
+        assert response.status_code == 200, response.content
+        return response.json()
@@ -0,0 +1,95 @@
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import ml
+from app.benchmarks import write_synthetic_bank_marketing
+
+APPROACHES = ('original', 'in-memory', 'chunked')
+
+
+def original_training(dataset_path):
+    """The training code this module replaced: default dtypes, per-row apply and dense get_dummies."""
+    import pandas as pd
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.metrics import accuracy_score
+    from sklearn.model_selection import train_test_split
+
+    df = pd.read_csv(dataset_path, delimiter=';')
+    for col in ['default', 'housing', 'loan', 'y']:
+        df[col] = df[col].apply(lambda x: 1 if x == 'yes' else 0)
+    df = pd.get_dummies(df, columns=['job', 'marital', 'education', 'contact', 'month', 'poutcome'], drop_first=True)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df.drop('y', axis=1), df['y'], test_size=0.3, random_state=42, stratify=df['y'],
+    )
+    model = LogisticRegression(solver='liblinear', random_state=42)
+    model.fit(X_train, y_train)
+    return {'accuracy': round(float(accuracy_score(y_test, model.predict(X_test))), 4)}
+
+
+def _peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # KiB on Linux
+
+
+class Command(BaseCommand):
+    help = (
+        "Writes a synthetic bank-marketing CSV of --rows rows and trains on it with the original "
+        "code, the in-memory pipeline and the chunked SGD pipeline, each in its own process, "
+        "reporting wall time, peak RSS and accuracy."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=45211 * 10)
+        parser.add_argument('--chunk-size', type=int, default=ml.DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--epochs', type=int, default=ml.DEFAULT_EPOCHS)
+        parser.add_argument('--approaches', default=','.join(APPROACHES))
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--run', choices=APPROACHES, help="Internal: train once in this process and print JSON.")
+        parser.add_argument('--dataset', help="Internal: dataset for --run.")
+
+    def handle(self, *args, **options):
+        if options['run']:
+            return self._run(options)
+        with tempfile.TemporaryDirectory() as directory:
+            dataset = os.path.join(directory, 'bank.csv')
+            write_synthetic_bank_marketing(dataset, options['rows'], options['seed'])
+            self.stdout.write(f"{options['rows']} rows, {os.path.getsize(dataset) / 1e6:.0f} MB")
+            self.stdout.write(f"{'approach':<12}{'wall_s':>9}{'peak_rss_mb':>13}{'training_mb':>13}{'accuracy':>10}")
+            for approach in options['approaches'].split(','):
+                result = json.loads(subprocess.run(
+                    [sys.executable, sys.argv[0], 'bench_training', '--run', approach, '--dataset', dataset,
+                     '--chunk-size', str(options['chunk_size']), '--epochs', str(options['epochs'])],
+                    check=True, capture_output=True, text=True,
+                ).stdout.strip().splitlines()[-1])
+                self.stdout.write(
+                    f"{approach:<12}{result['wall_s']:>9.2f}{result['peak_rss_mb']:>13.0f}"
+                    f"{result['peak_rss_mb'] - result['baseline_rss_mb']:>13.0f}{result['accuracy']:>10.4f}"
+                )
+
+    def _run(self, options):
+        # Load the libraries first, so the baseline excludes them and the growth is training alone.
+        import pandas  # noqa: F401
+        import sklearn.compose  # noqa: F401
+        import sklearn.linear_model  # noqa: F401
+        import sklearn.model_selection  # noqa: F401
+
+        baseline = _peak_rss_mb()
+        started = time.perf_counter()
+        if options['run'] == 'original':
+            metrics = original_training(options['dataset'])
+        elif options['run'] == 'in-memory':
+            metrics = ml.train_marketing_model(options['dataset'])[1]
+        else:
+            metrics = ml.train_marketing_model_incremental(options['dataset'], options['chunk_size'], options['epochs'])[1]
+        self.stdout.write(json.dumps({
+            'wall_s': time.perf_counter() - started,
+            'baseline_rss_mb': baseline,
+            'peak_rss_mb': _peak_rss_mb(),
+            'accuracy': metrics['accuracy'],
+        }))
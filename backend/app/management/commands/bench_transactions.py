@@ -0,0 +1,95 @@
+import random
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from app.benchmarks import scratch_database
+from app.models import CustomUser, Transaction
+from app.pagination import KeysetPagination
+
+CATEGORIES = ['Groceries', 'Rent', 'Utilities', 'Dining', 'Travel', 'Shopping', 'Health', 'Salary', 'Fuel', 'Other']
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds a scratch database with transactions and compares the keyset-paginated "
+        "/api/transactions/ endpoint with LIMIT/OFFSET at increasing page depths."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--transactions', type=int, default=200000, help="Rows seeded for the benchmark user.")
+        parser.add_argument('--other-users', type=int, default=4, help="Other users seeded with the same number of rows.")
+        parser.add_argument('--limit', type=int, default=50, help="Page size.")
+        parser.add_argument('--repeat', type=int, default=20, help="Timed requests per depth.")
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+        n = options['transactions']
+        with scratch_database(), override_settings(ALLOWED_HOSTS=['testserver']):
+            started = time.perf_counter()
+            users = [CustomUser.objects.create_user(f'bench{i}', password='bench') for i in range(options['other_users'] + 1)]
+            for user in users:
+                self._seed(user, n)
+            self.stdout.write(f"seeded {n * len(users)} transactions in {time.perf_counter() - started:.1f}s")
+            self._run(users[0], n, options['limit'], options['repeat'])
+
+    def _seed(self, user, n, batch_size=5000):
+        start = date.today() - timedelta(days=5 * 365)
+        for offset in range(0, n, batch_size):
+            Transaction.objects.bulk_create([
+                Transaction(
+                    user=user,
+                    description=f'Transaction {offset + i}',
+                    amount=round(random.uniform(1, 2000), 2),
+                    transaction_type=random.choice(('INCOME', 'EXPENSE', 'EXPENSE', 'EXPENSE')),
+                    category=random.choice(CATEGORIES),
+                    date=start + timedelta(days=random.randrange(5 * 365)),
+                )
+                for i in range(min(batch_size, n - offset))
+            ])
+
+    def _run(self, user, n, limit, repeat):
+        client = Client()
+        client.force_login(user)
+        ordered = Transaction.objects.filter(user=user).order_by('-date', '-id')
+
+        def timed(fn):
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                fn()
+                samples.append(time.perf_counter() - started)
+            return round(statistics.median(samples) * 1000, 2)
+
+        self.stdout.write(f"{'depth':>10}{'keyset_api_ms':>16}{'keyset_sql_ms':>16}{'offset_sql_ms':>16}")
+        depths = sorted({d for d in (0, 1000, 10000, 100000, 1000000, n - limit) if 0 <= d <= n - limit})
+        for depth in depths:
+            params = {'limit': limit}
+            if depth:
+                # The cursor a client would hold after paging down to this depth.
+                row = ordered.values_list('date', 'id')[depth - 1]
+                params['cursor'] = KeysetPagination.encode_cursor(row)
+            api_ms = timed(lambda: client.get('/api/transactions/', params))
+            keyset_ms = timed(lambda: KeysetPagination().paginate_queryset(ordered, _Request(params)))
+            offset_ms = timed(lambda: list(ordered[depth:depth + limit]))
+            self.stdout.write(f"{depth:>10}{api_ms:>16}{keyset_ms:>16}{offset_ms:>16}")
+
+        category_ms = timed(lambda: client.get('/api/transactions/', {'category': 'Travel', 'limit': limit}))
+        self.stdout.write(f"category filter page: {category_ms} ms")
+        self.stdout.write("query plans:")
+        self.stdout.write(f"  newest first: {ordered[:limit].explain()}")
+        self.stdout.write(f"  by category:  {ordered.filter(category='Travel')[:limit].explain()}")
+
+
+class _Request:
+    """Just enough of a DRF request for calling the paginator directly."""
+
+    def __init__(self, params):
+        self.query_params = params
+
+    def build_absolute_uri(self):
+        return 'http://testserver/api/transactions/'
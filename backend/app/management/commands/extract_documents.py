@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app.documents import extract_document
+from app.models import Document
+
+
+class Command(BaseCommand):
+    help = (
+        "Extracts the text, title, author and summary of documents still waiting for it, "
+        "e.g. after the server restarted with extractions queued."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--failed', action='store_true', help="Also retry documents whose extraction failed.")
+        parser.add_argument('--stuck', action='store_true',
+                            help="Also redo documents left PROCESSING by a stopped server (only while no server runs).")
+
+    def handle(self, *args, **options):
+        if options['stuck']:
+            Document.objects.filter(status='PROCESSING').update(status='PENDING')
+        statuses = ['PENDING'] + (['FAILED'] if options['failed'] else [])
+        ids = list(Document.objects.filter(status__in=statuses).order_by('pk').values_list('pk', flat=True))
+        for pk in ids:
+            extract_document(pk)
+        done = Document.objects.filter(pk__in=ids, status='DONE').count()
+        self.stdout.write(self.style.SUCCESS(f"Extracted {done} of {len(ids)} documents."))
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.importers import DEFAULT_BATCH_SIZE, FORMATS, StatementImportError, detect_format, import_transactions
+from app.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports CSV or OFX bank statements into Transaction rows, streaming each file in "
+        "batches. Rows imported before are skipped. Without --user, CSV files must name "
+        "each row's owner in a user/username column."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="Statement files (.csv or .ofx).")
+        parser.add_argument('--user', help="Owner of the imported transactions (id or username).")
+        parser.add_argument('--format', choices=FORMATS, help="Override the format detected from the extension.")
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            lookup = {'pk': options['user']} if options['user'].isdigit() else {'username': options['user']}
+            user = CustomUser.objects.filter(**lookup).first()
+            if user is None:
+                raise CommandError(f"No user matching {options['user']!r}.")
+
+        for path in options['paths']:
+            started = time.perf_counter()
+            try:
+                with open(path, 'rb') as stream:
+                    result = import_transactions(
+                        stream, options['format'] or detect_format(path), user=user, batch_size=options['batch_size'],
+                    )
+            except (OSError, StatementImportError) as e:
+                raise CommandError(f"{path}: {e}")
+            elapsed = time.perf_counter() - started
+            rate = result.rows / elapsed if elapsed else 0
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: {result.created} created, {result.duplicates} duplicates, "
+                f"{result.error_count} invalid of {result.rows} rows in {elapsed:.1f}s ({rate:,.0f} rows/s)"
+            ))
+            for error in result.errors:
+                self.stdout.write(f"  row {error['row']}: {error['error']}")
@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app.price_feed import DEFAULT_CHUNK_SIZE, ingest_price_feed
+
+
+class Command(BaseCommand):
+    help = (
+        "Applies a price feed (CSV rows of symbol, price, timestamp) from a file or URL to "
+        "Investment.current_value_per_unit. Stale and unchanged quotes are skipped, so the "
+        "same feed can be ingested any number of times."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('source', help="Path or http(s) URL of the feed.")
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help="Symbols per UPDATE.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        try:
+            result = ingest_price_feed(options['source'], options['chunk_size'])
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {options['source']}: {e}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{result.quotes} quotes for {result.symbols} symbols ({result.invalid} invalid): "
+            f"{result.updated} holdings updated in {time.perf_counter() - started:.2f}s"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuilds and reindexes the SQLite full-text search tables and their triggers (migrate already "
+        "restores triggers dropped by a migration). Does nothing on other databases."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--optimize', action='store_true',
+                            help="Only merge the index segments, e.g. after a large import.")
+
+    def handle(self, *args, **options):
+        rebuild_index(optimize=options['optimize'])
+        self.stdout.write(self.style.SUCCESS("Optimized the search index." if options['optimize']
+                                             else "Rebuilt the search index."))
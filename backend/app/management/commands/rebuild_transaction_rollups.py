@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.models import CustomUser
+from app.rollups import rebuild_rollups
+
+
+class Command(BaseCommand):
+    help = "Recomputes the monthly transaction rollups from the Transaction table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Only rebuild this user's rollups (id or username).")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            lookup = {'pk': options['user']} if options['user'].isdigit() else {'username': options['user']}
+            user = CustomUser.objects.filter(**lookup).first()
+            if user is None:
+                raise CommandError(f"No user matching {options['user']!r}.")
+        rows = rebuild_rollups(user)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows} rollup rows."))
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app.seeding import seed_users
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic users with assets, liabilities, a year of transactions, investments, "
+        "retirement accounts, credit scores and financial profiles, using bulk inserts. Users are "
+        "named <prefix><n>@example.com and log in with --password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--transactions', type=int, default=200, help="Transactions per user.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed; the same seed gives the same data.")
+        parser.add_argument('--password', default='password')
+        parser.add_argument('--prefix', default='seed')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['transactions'] < 0:
+            raise CommandError("--users must be positive and --transactions not negative.")
+        result = seed_users(
+            options['users'], options['transactions'], seed=options['seed'], password=options['password'],
+            prefix=options['prefix'], progress=lambda done, total: self.stdout.write(f"  {done}/{total} users"),
+        )
+        rows = ', '.join(f"{count} {name.replace('_', ' ')}" for name, count in result.rows.items())
+        self.stdout.write(self.style.SUCCESS(f"Seeded {result.users} users ({rows}) in {result.seconds:.2f}s."))
@@ -0,0 +1,509 @@
+"""
+In-process metrics registry with Prometheus text exposition.
+
+Counters and histograms are plain Python objects updated under a lock: an
+increment or observation is a dict update, cheap enough for the request path.
+Module-level metrics below are the ones the app records; caches that already
+keep hit/miss counters (snapshot, permission, token and response caches, the
+model batchers) are read at scrape time through collectors instead; the caches
+get their counters from CacheStatsMixin.
+
+With several worker processes, set METRICS_DIR: every process then writes a
+snapshot of its metrics to <METRICS_DIR>/<pid>-<start>.json every
+METRICS_FLUSH_INTERVAL seconds (and at exit), and the /metrics endpoint
+serves the sum over all snapshots, its own live values included. Snapshots of
+exited workers are kept so counters do not go backwards; empty the directory
+when restarting the whole server. Without METRICS_DIR each process reports
+only its own values.
+"""
+import atexit
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import close_old_connections, connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+SIZE_BUCKETS = (64, 256, 1024, 4096, 16384, 65536)
+TOKEN_BUCKETS = (16, 64, 256, 512, 1024, 2048, 4096, 8192)
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+_collectors = []
+_registry_lock = threading.Lock()
+
+
+def _label_key(labelnames, labels: dict) -> tuple:
+    if len(labels) != len(labelnames):
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}.")
+    try:
+        return tuple([str(labels[name]) for name in labelnames])
+    except KeyError:
+        raise ValueError(f"Expected labels {labelnames}, got {tuple(labels)}.")
+
+
+class Counter:
+    """A monotonically increasing count per label set."""
+
+    kind = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(self.labelnames, labels), 0)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {json.dumps(key): value for key, value in self._values.items()}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram:
+    """Observation counts in cumulative buckets, plus their sum, per label set."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DURATION_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label key -> [count per bucket (last one +Inf), sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def time(self, **labels):
+        return _Timer(self, labels)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {json.dumps(key): [list(counts), total] for key, (counts, total) in self._values.items()}
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.started, **self.labels)
+
+
+def counter(name, documentation, labelnames=()) -> Counter:
+    return _register(Counter(name, documentation, labelnames))
+
+
+def histogram(name, documentation, labelnames=(), buckets=DURATION_BUCKETS) -> Histogram:
+    return _register(Histogram(name, documentation, labelnames, buckets))
+
+
+def _register(metric):
+    with _registry_lock:
+        if metric.name in _registry:
+            raise ValueError(f"Metric {metric.name} is already registered.")
+        _registry[metric.name] = metric
+    return metric
+
+
+def collector(function):
+    """
+    Registers a function returning {metric name: (documentation, labelnames,
+    {label values tuple: count})}, read as counters at flush and scrape time.
+    """
+    _collectors.append(function)
+    return function
+
+
+# --- Cache counters and background tasks ---
+
+class CacheStatsMixin:
+    """
+    Lookup counters for a cache class. STATS names the counters, HIT_STATS and
+    MISS_STATS the ones that make up hit_ratio; call _count(name) per event.
+    cache_metrics() below reads stats() at scrape time.
+    """
+
+    STATS = ('hits', 'misses')
+    HIT_STATS = ('hits',)
+    MISS_STATS = ('misses',)
+
+    def __init__(self):
+        self._stats_lock = threading.Lock()
+        self._stats = dict.fromkeys(self.STATS, 0)
+
+    def _count(self, name):
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> dict:
+        """Counters since start-up (or the last reset_stats call), plus hit_ratio."""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        hits = sum(stats[name] for name in self.HIT_STATS)
+        lookups = hits + sum(stats[name] for name in self.MISS_STATS)
+        stats['hit_ratio'] = round(hits / lookups, 4) if lookups else 0.0
+        return stats
+
+    def reset_stats(self):
+        with self._stats_lock:
+            for name in self._stats:
+                self._stats[name] = 0
+
+
+class BackgroundTasks:
+    """
+    Runs `function(key)` on a small thread pool, with at most one task queued or
+    running per key. Failures are logged; each task closes its thread's stale
+    database connections when it ends.
+    """
+
+    def __init__(self, function, name, max_workers=1):
+        self._function = function
+        self._name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, key) -> bool:
+        """Queues a task for `key`; False if one is already pending."""
+        with self._lock:
+            if key in self._pending:
+                return False
+            self._pending.add(key)
+        self._executor.submit(self._run, key)
+        return True
+
+    def _run(self, key):
+        try:
+            self._function(key)
+        except Exception:
+            logger.exception("Error in %s task for %r", self._name, key)
+        finally:
+            with self._lock:
+                self._pending.discard(key)
+            close_old_connections()
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+# --- Snapshots and multi-process aggregation ---
+
+def snapshot() -> dict:
+    """{name: {type, help, labels, buckets?, samples}} for this process."""
+    with _registry_lock:
+        metrics = list(_registry.values())
+    result = {}
+    for metric in metrics:
+        entry = {'type': metric.kind, 'help': metric.documentation, 'labels': list(metric.labelnames),
+                 'samples': metric.snapshot()}
+        if metric.kind == 'histogram':
+            entry['buckets'] = list(metric.buckets)
+        result[metric.name] = entry
+    for function in list(_collectors):
+        try:
+            collected = function()
+        except Exception:  # A broken collector must not take the endpoint down.
+            logger.exception("Error in metrics collector %s", function.__name__)
+            continue
+        for name, (documentation, labelnames, values) in collected.items():
+            result[name] = {'type': 'counter', 'help': documentation, 'labels': list(labelnames),
+                            'samples': {json.dumps([str(v) for v in key]): value for key, value in values.items()}}
+    return result
+
+
+def merge(snapshots) -> dict:
+    """Sums snapshots from several processes."""
+    merged = {}
+    for snap in snapshots:
+        for name, entry in snap.items():
+            target = merged.setdefault(name, dict(entry, samples={}))
+            for key, value in entry['samples'].items():
+                current = target['samples'].get(key)
+                if entry['type'] == 'histogram':
+                    if current is None or len(current[0]) != len(value[0]):
+                        target['samples'][key] = [list(value[0]), value[1]]
+                    else:
+                        current[0] = [a + b for a, b in zip(current[0], value[0])]
+                        current[1] += value[1]
+                else:
+                    target['samples'][key] = (current or 0) + value
+    return merged
+
+
+class _Flusher:
+    """Writes this process's snapshot to METRICS_DIR periodically; restarted after a fork."""
+
+    def __init__(self):
+        self._pid = None
+        self._lock = threading.Lock()
+        self.path = None
+
+    def ensure_started(self):
+        if not settings.METRICS_DIR or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                _clear_inherited()  # A forked worker starts from zero; the parent's values are in its own file.
+            self.path = Path(settings.METRICS_DIR) / f'{os.getpid()}-{time.time_ns()}.json'
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='metrics-flush', daemon=True).start()
+
+    def _run(self):
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            self.flush()
+
+    def flush(self):
+        if self.path is None or self._pid != os.getpid():
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            temporary = self.path.with_suffix('.tmp')
+            temporary.write_text(json.dumps(snapshot()))
+            os.replace(temporary, self.path)  # Readers never see a half-written file.
+        except OSError:
+            logger.exception("Error writing metrics snapshot to %s", self.path)
+
+
+def _clear_inherited():
+    with _registry_lock:
+        metrics = list(_registry.values())
+    for metric in metrics:
+        metric.clear()
+
+
+_flusher = _Flusher()
+atexit.register(_flusher.flush)
+
+
+def ensure_flushing():
+    """Starts the snapshot writer of this process if METRICS_DIR is set."""
+    _flusher.ensure_started()
+
+
+def aggregated_snapshot() -> dict:
+    """This process's live metrics plus the latest snapshots of all other processes."""
+    snapshots = [snapshot()]
+    if settings.METRICS_DIR:
+        _flusher.ensure_started()
+        for path in Path(settings.METRICS_DIR).glob('*.json'):
+            if path == _flusher.path:
+                continue
+            try:
+                snapshots.append(json.loads(path.read_text()))
+            except (OSError, ValueError):
+                continue  # Being replaced or removed right now.
+    return merge(snapshots)
+
+
+# --- Prometheus text format ---
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names, values, extra=()) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)] + list(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return '+Inf' if value > 0 else '-Inf'
+        return repr(value)
+    return str(value)
+
+
+def render(metrics: dict) -> str:
+    """Prometheus text exposition format (version 0.0.4)."""
+    lines = []
+    for name in sorted(metrics):
+        entry = metrics[name]
+        lines.append(f"# HELP {name} {entry['help']}")
+        lines.append(f"# TYPE {name} {entry['type']}")
+        for key in sorted(entry['samples']):
+            values, value = json.loads(key), entry['samples'][key]
+            if entry['type'] == 'histogram':
+                counts, total = value
+                cumulative = 0
+                for bound, count in zip(list(entry['buckets']) + [math.inf], counts):
+                    cumulative += count
+                    le = 'le="%s"' % ('+Inf' if math.isinf(bound) else _number(float(bound)))
+                    lines.append(f"{name}_bucket{_labels(entry['labels'], values, [le])} {cumulative}")
+                lines.append(f"{name}_sum{_labels(entry['labels'], values)} {_number(float(total))}")
+                lines.append(f"{name}_count{_labels(entry['labels'], values)} {cumulative}")
+            else:
+                lines.append(f"{name}{_labels(entry['labels'], values)} {_number(value)}")
+    return '\n'.join(lines) + '\n'
+
+
+# --- Request metrics ---
+
+class _RequestCounts:
+    __slots__ = ('queries',)
+
+    def __init__(self):
+        self.queries = 0
+
+
+_request_counts = ContextVar('request_metrics', default=None)
+
+
+def _count_query(execute, sql, params, many, context):
+    counts = _request_counts.get()
+    if counts is not None:
+        counts.queries += 1
+    return execute(sql, params, many, context)
+
+
+def _install_query_counter(connection):
+    if _count_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_count_query)
+
+
+@receiver(connection_created)
+def install_query_counter(sender, connection, **kwargs):
+    _install_query_counter(connection)
+
+
+def _view_name(request) -> str:
+    match = getattr(request, 'resolver_match', None)
+    return (match.url_name or match.view_name) if match is not None else 'unmatched'
+
+
+class MetricsMiddleware:
+    """Counts every request with its latency, queries and, when saved, session size."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            _install_query_counter(connection)
+
+    def _record(self, request, response, counts, started):
+        view = _view_name(request)
+        http_requests.inc(view=view, method=request.method, status=response.status_code)
+        http_request_duration.observe(time.perf_counter() - started, view=view)
+        http_request_queries.observe(counts.queries, view=view)
+        session = getattr(request, 'session', None)
+        if session is not None and session.modified and not session.is_empty():
+            session_size.observe(len(session.encode(dict(session.items()))))
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        ensure_flushing()
+        counts, started = _RequestCounts(), time.perf_counter()
+        token = _request_counts.set(counts)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_counts.reset(token)
+        self._record(request, response, counts, started)
+        return response
+
+    async def __acall__(self, request):
+        ensure_flushing()
+        counts, started = _RequestCounts(), time.perf_counter()
+        token = _request_counts.set(counts)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_counts.reset(token)
+        self._record(request, response, counts, started)
+        return response
+
+
+# --- The app's metrics ---
+
+http_requests = counter('http_requests_total', "HTTP requests handled.", ('view', 'method', 'status'))
+http_request_duration = histogram('http_request_duration_seconds', "HTTP request latency.", ('view',))
+http_request_queries = histogram('http_request_queries', "Database queries per HTTP request.", ('view',),
+                                 QUERY_BUCKETS)
+session_size = histogram('session_size_bytes', "Encoded size of sessions when they are saved.", (), SIZE_BUCKETS)
+upstream_duration = histogram('upstream_request_duration_seconds', "Latency of calls to upstream services "
+                                                                   "(llm: OpenRouter, mock_api: financial data).",
+                              ('upstream',))
+upstream_errors = counter('upstream_errors_total', "Failed calls to upstream services.", ('upstream', 'reason'))
+llm_tokens = histogram('llm_tokens', "Tokens per OpenRouter completion, as reported by the API.", ('kind',),
+                       TOKEN_BUCKETS)
+
+
+@collector
+def cache_metrics():
+    """Hit/miss counters the caches and model batchers already keep."""
+    from .authentication import token_cache
+    from .batching import batcher_stats
+    from .financial_data import snapshot_cache
+    from .permissions import permission_cache
+    from .response_cache import response_cache
+
+    lookups = {}
+    for cache, stats in (('financial_snapshot', snapshot_cache.stats()), ('permissions', permission_cache.stats()),
+                         ('auth_token', token_cache.stats()), ('llm_response', response_cache.stats())):
+        for name, result in (('hits', 'hit'), ('stale_hits', 'stale_hit'), ('misses', 'miss')):
+            if name in stats:
+                lookups[(cache, result)] = stats[name]
+    batches = {}
+    for model, stats in batcher_stats().items():
+        for name in ('requests', 'items', 'batches', 'errors'):
+            batches[(model, name)] = stats[name]
+    return {
+        'cache_lookups_total': ("Cache lookups by result (hit, stale_hit, miss).", ('cache', 'result'), lookups),
+        'model_batcher_events_total': ("Model micro-batcher requests, items, batches and errors.",
+                                       ('model', 'event'), batches),
+    }
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_transaction_import_hash'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='investment',
+            name='price_as_of',
+            field=models.DateTimeField(blank=True, help_text='Timestamp of the feed quote that set current_value_per_unit', null=True),
+        ),
+        migrations.AddField(
+            model_name='investment',
+            name='symbol',
+            field=models.CharField(blank=True, db_index=True, default='', help_text='Ticker or scheme code used by the price feed', max_length=20),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 15:07
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_investment_symbol_price_as_of'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataPermissions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='data_permissions', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('mask', models.PositiveSmallIntegerField(default=63)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,97 @@
+"""
+Full-text search indexes (see app/search.py): FTS5 tables kept in sync by
+triggers on SQLite, GIN expression indexes on PostgreSQL, nothing elsewhere.
+
+The SQL is built from the definitions below, a frozen copy of app/search.py
+as of this migration, so later changes to that module do not alter it.
+"""
+from django.db import migrations
+
+# (FTS table, source table, owner column, indexed columns)
+INDEXES = (
+    ('app_document_fts', 'app_document', 'uploader_id', ('title', 'author', 'summary', 'filename')),
+    ('app_transaction_fts', 'app_transaction', 'user_id', ('description', 'category')),
+)
+SEPARATORS = ' \t\r\n\u00a0-/.,\'\u2019&():;#*"+@|\u2013'
+
+
+def _sql_string(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _partitioned(owner, column):
+    prefix = f"('u' || {owner} || '_')"
+    expression = f"coalesce({column}, '')"
+    for separator in SEPARATORS:
+        expression = f"replace({expression}, {_sql_string(separator)}, ' ' || {prefix})"
+    return f"{prefix} || {expression}"
+
+
+def _values(owner, columns, row):
+    return ', '.join(_partitioned(f'{row}.{owner}', f'{row}.{column}') for column in columns)
+
+
+def _fts5_sql(fts, source, owner, columns):
+    names = ', '.join(columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {_values(owner, columns, 'old')});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {_values(owner, columns, 'new')});"
+    watched = ', '.join((owner,) + columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='', "
+        f"tokenize=\"unicode61 remove_diacritics 2 tokenchars '_'\")",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {source} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {source} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {watched} ON {source} BEGIN {delete} {insert} END",
+        f"INSERT INTO {fts}({fts}) VALUES ('delete-all')",
+        f"INSERT INTO {fts}(rowid, {names}) SELECT id, {_values(owner, columns, source)} FROM {source}",
+    ]
+
+
+def _gin_indexes(apps):
+    from django.contrib.postgres.indexes import GinIndex
+    from django.contrib.postgres.search import SearchVector
+
+    return (
+        (apps.get_model('app', 'Document'),
+         GinIndex(SearchVector('title', 'author', 'summary', 'filename', config='simple'), name='document_search_idx')),
+        (apps.get_model('app', 'Transaction'),
+         GinIndex(SearchVector('description', 'category', config='simple'), name='transaction_search_idx')),
+    )
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+            if not cursor.fetchone()[0]:
+                return
+        for index in INDEXES:
+            for sql in _fts5_sql(*index):
+                schema_editor.execute(sql)
+    elif vendor == 'postgresql':
+        for model, index in _gin_indexes(apps):
+            schema_editor.add_index(model, index)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        for fts, *_ in INDEXES:
+            for trigger in ('insert', 'delete', 'update'):
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {fts}_{trigger}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {fts}")
+    elif vendor == 'postgresql':
+        for model, index in _gin_indexes(apps):
+            schema_editor.remove_index(model, index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_document_upload'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
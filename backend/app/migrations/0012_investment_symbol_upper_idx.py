@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:02
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_search_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='investment',
+            name='symbol',
+            field=models.CharField(blank=True, default='', help_text='Ticker or scheme code used by the price feed', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='investment',
+            index=models.Index(django.db.models.functions.text.Upper('symbol'), name='investment_symbol_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,328 @@
+"""
+Bank marketing prediction model.
+
+The model is a scikit-learn Pipeline (encoders plus a linear classifier) trained
+by `python manage.py train_marketing_model` and saved as a versioned joblib
+artifact in MARKETING_MODEL_DIR. Scoring loads an artifact once per process and
+scores a whole batch of records with one predict_proba call.
+
+The dataset is read with compact dtypes (small integers and pandas categoricals)
+and one-hot encoded into sparse matrices against the fixed category lists below.
+train_marketing_model() fits LogisticRegression on the whole file in memory;
+train_marketing_model_incremental() streams it in chunks into an SGDClassifier
+with partial_fit, so its memory use depends on the chunk size rather than on
+the size of the file.
+
+pandas and scikit-learn are imported inside the functions that use them, so
+importing this module (and app.views) stays cheap for web workers and
+management commands that never train or score.
+"""
+import os
+import re
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+from django.conf import settings
+
+from . import batching
+
+TARGET = 'y'
+NUMERIC_DTYPES = {
+    'age': 'int16', 'balance': 'int32', 'day': 'int8', 'duration': 'int32',
+    'campaign': 'int16', 'pdays': 'int16', 'previous': 'int16',
+}
+BINARY_COLUMNS = ['default', 'housing', 'loan']
+# Values of the UCI bank-marketing dataset (bank-full.csv). Anything else is
+# encoded as all zeros, the same as an unseen category at scoring time.
+CATEGORIES = {
+    'job': ['admin.', 'blue-collar', 'entrepreneur', 'housemaid', 'management', 'retired', 'self-employed',
+            'services', 'student', 'technician', 'unemployed', 'unknown'],
+    'marital': ['divorced', 'married', 'single'],
+    'education': ['primary', 'secondary', 'tertiary', 'unknown'],
+    'contact': ['cellular', 'telephone', 'unknown'],
+    'month': ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec'],
+    'poutcome': ['failure', 'other', 'success', 'unknown'],
+}
+YES_NO = ['no', 'yes']
+CATEGORICAL_COLUMNS = list(CATEGORIES)
+NUMERIC_COLUMNS = list(NUMERIC_DTYPES)
+FEATURES = NUMERIC_COLUMNS + BINARY_COLUMNS + CATEGORICAL_COLUMNS
+
+TEST_SIZE = 0.3
+RANDOM_STATE = 42
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_EPOCHS = 5
+
+ARTIFACT_PREFIX = 'marketing-v'
+_ARTIFACT_NAME = re.compile(rf'^{ARTIFACT_PREFIX}(\d+)\.joblib$')
+
+_loaded = {}
+_load_lock = threading.Lock()
+
+
+class ModelArtifactError(Exception):
+    """Raised when no usable model artifact can be found."""
+
+
+def dataset_dtypes() -> dict:
+    import pandas as pd
+
+    dtypes = dict(NUMERIC_DTYPES)
+    for column in BINARY_COLUMNS + [TARGET]:
+        dtypes[column] = pd.CategoricalDtype(YES_NO)
+    for column, categories in CATEGORIES.items():
+        dtypes[column] = pd.CategoricalDtype(categories)
+    return dtypes
+
+
+def _read_csv(path, **kwargs):
+    import pandas as pd
+
+    return pd.read_csv(path, delimiter=';', usecols=FEATURES + [TARGET], dtype=dataset_dtypes(), **kwargs)
+
+
+def load_dataset(path):
+    return _read_csv(path)
+
+
+def iter_dataset(path, chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """The dataset as DataFrames of up to chunk_size rows."""
+    with _read_csv(path, chunksize=chunk_size) as reader:
+        yield from reader
+
+
+def target_labels(frame):
+    return (frame[TARGET] == 'yes').to_numpy(dtype='int8')
+
+
+def build_encoders():
+    """
+    Scaled numeric columns and sparse one-hot columns, as one CSR matrix. The
+    categories are fixed, so every chunk of a file is encoded the same way.
+    """
+    from sklearn.compose import ColumnTransformer
+    from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+    return ColumnTransformer([
+        ('numeric', StandardScaler(), NUMERIC_COLUMNS),
+        # yes/no columns become a single 0/1 column.
+        ('binary', OneHotEncoder(categories=[YES_NO] * len(BINARY_COLUMNS), drop='if_binary',
+                                 handle_unknown='ignore'), BINARY_COLUMNS),
+        # Same encoding as pd.get_dummies(drop_first=True); unseen categories score as all zeros.
+        ('categorical', OneHotEncoder(categories=[CATEGORIES[c] for c in CATEGORICAL_COLUMNS], drop='first',
+                                      handle_unknown='ignore'), CATEGORICAL_COLUMNS),
+    ], sparse_threshold=1.0)
+
+
+def build_pipeline():
+    """Encoders and classifier in one Pipeline, so the artifact scores raw records."""
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    return Pipeline([
+        ('encoders', build_encoders()),
+        ('classifier', LogisticRegression(solver='liblinear', random_state=RANDOM_STATE)),
+    ])
+
+
+def _metrics(confusion, train_rows: int) -> dict:
+    """Accuracy and per-class precision/recall/F1 from a 2x2 confusion matrix (rows are truth)."""
+    total = int(confusion.sum())
+    report = {}
+    for label, name in enumerate(YES_NO):
+        hits = int(confusion[label, label])
+        predicted, actual = int(confusion[:, label].sum()), int(confusion[label, :].sum())
+        precision = hits / predicted if predicted else 0.0
+        recall = hits / actual if actual else 0.0
+        report[name] = {
+            'precision': round(precision, 4),
+            'recall': round(recall, 4),
+            'f1-score': round(2 * precision * recall / (precision + recall), 4) if precision + recall else 0.0,
+            'support': actual,
+        }
+    return {
+        'accuracy': round((int(confusion[0, 0]) + int(confusion[1, 1])) / total, 4) if total else 0.0,
+        'report': report,
+        'train_rows': train_rows,
+        'test_rows': total,
+    }
+
+
+def train_marketing_model(dataset_path, params=None):
+    """
+    Trains the pipeline in memory on a stratified 70% split of the dataset and
+    evaluates it on the rest. `params` are Pipeline parameters such as
+    {'classifier__C': 0.1}. Returns (pipeline, metrics).
+    """
+    from sklearn.metrics import confusion_matrix
+    from sklearn.model_selection import train_test_split
+
+    df = load_dataset(dataset_path)
+    X_train, X_test, y_train, y_test = train_test_split(
+        df[FEATURES], target_labels(df), test_size=TEST_SIZE, random_state=RANDOM_STATE, stratify=target_labels(df),
+    )
+    del df
+
+    pipeline = build_pipeline().set_params(**(params or {}))
+    pipeline.fit(X_train, y_train)
+    confusion = confusion_matrix(y_test, pipeline.predict(X_test), labels=[0, 1])
+    return pipeline, _metrics(confusion, len(X_train))
+
+
+def _split_chunks(dataset_path, chunk_size: int):
+    """
+    (features, labels, test mask) per chunk. The mask is drawn from a generator
+    seeded the same way on every pass, so each pass sees the same split.
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    for chunk in iter_dataset(dataset_path, chunk_size):
+        yield chunk[FEATURES], target_labels(chunk), rng.random(len(chunk)) < TEST_SIZE
+
+
+def train_marketing_model_incremental(dataset_path, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                      epochs: int = DEFAULT_EPOCHS):
+    """
+    Trains on the dataset a chunk at a time: one pass fits the scaler, `epochs`
+    passes fit an SGD logistic regression with partial_fit (rows shuffled within
+    each chunk), and a last pass evaluates the held-out rows. About 30% of rows
+    are held out at random. Returns (pipeline, metrics) like train_marketing_model.
+    """
+    import numpy as np
+    from sklearn.linear_model import SGDClassifier
+    from sklearn.pipeline import Pipeline
+
+    encoders, scaler, train_rows = build_encoders(), None, 0
+    for X, y, test in _split_chunks(dataset_path, chunk_size):
+        train = X[~test]
+        if not len(train):
+            continue
+        if scaler is None:
+            encoders.fit(train)
+            scaler = encoders.named_transformers_['numeric']
+        else:
+            scaler.partial_fit(train[NUMERIC_COLUMNS])
+        train_rows += len(train)
+    if scaler is None:
+        raise ValueError("The dataset has no training rows.")
+
+    classifier = SGDClassifier(loss='log_loss', random_state=RANDOM_STATE)
+    shuffle = np.random.default_rng(RANDOM_STATE)
+    for _ in range(epochs):
+        for X, y, test in _split_chunks(dataset_path, chunk_size):
+            rows = shuffle.permutation(np.flatnonzero(~test))
+            if len(rows):
+                classifier.partial_fit(encoders.transform(X.iloc[rows]), y[rows], classes=[0, 1])
+
+    pipeline = Pipeline([('encoders', encoders), ('classifier', classifier)])
+    confusion = np.zeros((2, 2), dtype=np.int64)
+    for X, y, test in _split_chunks(dataset_path, chunk_size):
+        if test.any():
+            np.add.at(confusion, (y[test], pipeline.predict(X[test])), 1)
+    return pipeline, _metrics(confusion, train_rows)
+
+
+def model_dir() -> Path:
+    return Path(settings.MARKETING_MODEL_DIR)
+
+
+def artifact_versions() -> list:
+    """Versions saved in MARKETING_MODEL_DIR, oldest first."""
+    directory = model_dir()
+    if not directory.is_dir():
+        return []
+    return sorted(int(match.group(1)) for match in map(_ARTIFACT_NAME.match, os.listdir(directory)) if match)
+
+
+def artifact_path(version: int) -> Path:
+    return model_dir() / f"{ARTIFACT_PREFIX}{version:04d}.joblib"
+
+
+def save_model_artifact(pipeline, metrics: dict) -> int:
+    """Saves the pipeline as the next version and returns that version number."""
+    import joblib
+    import sklearn
+
+    directory = model_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    version = (artifact_versions() or [0])[-1] + 1
+    artifact = {
+        'version': version,
+        'trained_at': datetime.now(timezone.utc).isoformat(),
+        'sklearn_version': sklearn.__version__,
+        'features': FEATURES,
+        'metrics': metrics,
+        'pipeline': pipeline,
+    }
+    path = artifact_path(version)
+    temporary = path.with_suffix('.tmp')
+    joblib.dump(artifact, temporary)
+    os.replace(temporary, path)  # Workers never see a half-written artifact.
+    return version
+
+
+def load_model_artifact(version=None) -> dict:
+    """
+    The artifact for `version` (default: MARKETING_MODEL_VERSION, else the latest),
+    loaded from disk once per process and then served from memory.
+    """
+    import joblib
+
+    version = version or settings.MARKETING_MODEL_VERSION
+    key = version or 'latest'
+    artifact = _loaded.get(key)
+    if artifact is not None:
+        return artifact
+    with _load_lock:
+        if key not in _loaded:
+            if version is None:
+                versions = artifact_versions()
+                if not versions:
+                    raise ModelArtifactError(
+                        f"No marketing model in {model_dir()}; run `python manage.py train_marketing_model`."
+                    )
+                version = versions[-1]
+            path = artifact_path(int(version))
+            if not path.exists():
+                raise ModelArtifactError(f"Marketing model version {version} not found at {path}.")
+            _loaded[key] = joblib.load(path)
+        return _loaded[key]
+
+
+def clear_model_cache():
+    """Forgets loaded artifacts so the next score reloads (e.g. after training a new version)."""
+    with _load_lock:
+        _loaded.clear()
+
+
+def validate_records(records: list):
+    missing = sorted({feature for record in records for feature in FEATURES if feature not in record})
+    if missing:
+        raise ValueError(f"Records are missing: {', '.join(missing)}.")
+
+
+def score_records(records: list, version=None) -> tuple:
+    """
+    Probability of subscription for each record (a dict with the FEATURES keys),
+    computed in a single vectorized predict_proba call. Returns (version, scores).
+    """
+    import pandas as pd
+
+    artifact = load_model_artifact(version)
+    validate_records(records)
+    frame = pd.DataFrame.from_records(records, columns=artifact['features'])
+    for column in NUMERIC_COLUMNS:
+        frame[column] = pd.to_numeric(frame[column], errors='raise')
+    scores = artifact['pipeline'].predict_proba(frame)[:, 1]
+    return artifact['version'], [round(float(score), 6) for score in scores]
+
+
+def _score_batch(records: list) -> list:
+    version, scores = score_records(records)
+    return [(version, score) for score in scores]
+
+
+# Served through app/batching.py, which merges concurrent requests into one score_records call.
+batching.register('marketing', _score_batch)
@@ -0,0 +1,143 @@
+"""
+Cross-validated hyperparameter search for the marketing model.
+
+Every candidate parameter set is scored with stratified k-fold cross-validation.
+The (candidate, fold) fits run in a joblib process pool (loky), so a search
+uses every CPU core. Scores are cached on disk per dataset content hash and
+candidate, next to the model artifacts. Re-running a search, or widening it,
+only fits the candidates that have not been scored on that data before.
+"""
+import hashlib
+import json
+import os
+import re
+import time
+
+from .ml import FEATURES, RANDOM_STATE, build_pipeline, load_dataset, model_dir, target_labels
+
+SCORINGS = ('accuracy', 'f1', 'roc_auc')
+PARAM_GRID = {
+    'classifier__C': [0.01, 0.1, 1.0, 10.0],
+    'classifier__class_weight': [None, 'balanced'],
+}
+
+
+def param_grid() -> dict:
+    """
+    PARAM_GRID plus the L1/L2 choice (both supported by the pipeline's liblinear
+    solver) in the installed scikit-learn's terms: `l1_ratio` from 1.8, which
+    deprecates `penalty`, and `penalty` before it.
+    """
+    import sklearn
+
+    version = tuple(int(part) for part in re.findall(r'\d+', sklearn.__version__)[:2])
+    if version >= (1, 8):
+        return dict(PARAM_GRID, classifier__l1_ratio=[0.0, 1.0])
+    return dict(PARAM_GRID, classifier__penalty=['l2', 'l1'])
+
+
+def dataset_hash(path) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as stream:
+        for block in iter(lambda: stream.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def candidates(search: str = 'grid', n_iter: int = 10, seed: int = RANDOM_STATE) -> list:
+    """The grid, or up to n_iter distinct random draws from it with C sampled log-uniformly."""
+    from scipy.stats import loguniform
+    from sklearn.model_selection import ParameterGrid, ParameterSampler
+
+    grid = param_grid()
+    if search == 'grid':
+        return list(ParameterGrid(grid))
+    distributions = dict(grid, classifier__C=loguniform(1e-3, 1e2))
+    drawn = {}
+    for params in ParameterSampler(distributions, n_iter=n_iter, random_state=seed):
+        # Rounded so the cache keys of a re-run match exactly.
+        params = {**params, 'classifier__C': round(float(params['classifier__C']), 6)}
+        drawn.setdefault(_key(params, 0), params)
+    return list(drawn.values())
+
+
+def _key(params: dict, folds: int) -> str:
+    return json.dumps({'params': params, 'folds': folds, 'seed': RANDOM_STATE}, sort_keys=True)
+
+
+class ResultCache:
+    """Cross-validation scores of one dataset, stored as JSON in MARKETING_MODEL_DIR/cv-cache."""
+
+    def __init__(self, data_hash: str):
+        self.path = model_dir() / 'cv-cache' / f'{data_hash}.json'
+        try:
+            with open(self.path) as stream:
+                self._results = json.load(stream)
+        except (OSError, ValueError):
+            self._results = {}
+
+    def get(self, params: dict, folds: int):
+        return self._results.get(_key(params, folds))
+
+    def put(self, params: dict, folds: int, result: dict):
+        self._results[_key(params, folds)] = result
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix('.tmp')
+        with open(temporary, 'w') as stream:
+            json.dump(self._results, stream)
+        os.replace(temporary, self.path)
+
+
+def _score_fold(X, y, train, test, params: dict) -> dict:
+    """Fits one candidate on one fold; runs in a worker process."""
+    from sklearn.metrics import accuracy_score, f1_score, roc_auc_score
+
+    started = time.perf_counter()
+    pipeline = build_pipeline().set_params(**params)
+    pipeline.fit(X.iloc[train], y[train])
+    fit_time = time.perf_counter() - started
+    probabilities = pipeline.predict_proba(X.iloc[test])[:, 1]
+    predictions = (probabilities >= 0.5).astype(int)
+    return {
+        'accuracy': accuracy_score(y[test], predictions),
+        'f1': f1_score(y[test], predictions, zero_division=0),
+        'roc_auc': roc_auc_score(y[test], probabilities),
+        'fit_time': fit_time,
+    }
+
+
+def _summarize(fold_scores: list) -> dict:
+    import numpy as np
+
+    summary = {}
+    for name in SCORINGS + ('fit_time',):
+        values = np.array([scores[name] for scores in fold_scores])
+        summary[name] = round(float(values.mean()), 4)
+        summary[f'{name}_std'] = round(float(values.std()), 4)
+    return summary
+
+
+def search(dataset_path, params_list: list, folds: int = 5, n_jobs: int = -1, scoring: str = 'roc_auc') -> list:
+    """
+    Cross-validates each parameter set and returns one row per candidate, best
+    first by mean `scoring`: {'params', 'cached', accuracy, f1, roc_auc and
+    fit_time means with their *_std}.
+    """
+    from joblib import Parallel, delayed
+    from sklearn.model_selection import StratifiedKFold
+
+    cache = ResultCache(dataset_hash(dataset_path))
+    pending = [params for params in params_list if cache.get(params, folds) is None]
+    if pending:
+        df = load_dataset(dataset_path)
+        X, y = df[FEATURES], target_labels(df)
+        splits = list(StratifiedKFold(folds, shuffle=True, random_state=RANDOM_STATE).split(X, y))
+        # Ordered results, candidate by candidate, so each one is cached as soon as its folds finish.
+        scores = Parallel(n_jobs=n_jobs, return_as='generator')(
+            delayed(_score_fold)(X, y, train, test, params) for params in pending for train, test in splits
+        )
+        for params in pending:
+            cache.put(params, folds, _summarize([next(scores) for _ in splits]))
+
+    rows = [{'params': params, 'cached': params not in pending, **cache.get(params, folds)} for params in params_list]
+    return sorted(rows, key=lambda row: row[scoring], reverse=True)
@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import OperationalError, connections, models
+from django.db.models.functions import Abs, Cast, Round, Upper
+from django.db.models.lookups import LessThan
 from django.contrib.auth.models import AbstractUser
 from django.core.validators import MinValueValidator, MaxValueValidator
 import decimal
@@ -38,7 +40,17 @@ class UserProfile(models.Model):
 class Document(models.Model):
     """
     Represents an uploaded document with its metadata.
+
+    Uploaded files are stored once per content hash (see app/documents.py);
+    title, author, summary and text are filled in by a background extraction.
     """
+    STATUS_CHOICES = [
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('DONE', 'Done'),
+        ('FAILED', 'Failed'),
+    ]
+
     uploader = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='documents')
     filename = models.CharField(max_length=255)
     filepath = models.CharField(max_length=512)
@@ -47,6 +59,17 @@ class Document(models.Model):
     title = models.CharField(max_length=255, blank=True, null=True)
     author = models.CharField(max_length=255, blank=True, null=True)
     summary = models.TextField(blank=True, null=True)
+    content_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True, help_text="SHA-256 of the file")
+    size = models.PositiveBigIntegerField(default=0, help_text="File size in bytes")
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    text = models.TextField(blank=True, default='', help_text="Extracted text, up to DOCUMENT_TEXT_MAX_CHARS")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    error = models.TextField(blank=True, default='')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['uploader', 'content_hash'], name='unique_document_per_uploader'),
+        ]
 
     def __str__(self):
         return self.title or self.filename
@@ -94,6 +117,17 @@ class Liability(models.Model):
     def __str__(self):
         return f"{self.user.username}'s {self.name} ({self.get_liability_type_display()})"
 
+class TransactionQuerySet(models.QuerySet):
+    def delete(self):
+        """
+        Deletes the transactions and takes them out of the monthly rollups with
+        one write per affected rollup row, instead of one per transaction from
+        the post_delete signal.
+        """
+        from .rollups import delete_transactions  # app.rollups imports this module.
+        return delete_transactions(self, super().delete)
+
+
 class Transaction(models.Model):
     """
     Represents a single financial transaction, like income, an expense, or a transfer.
@@ -111,13 +145,46 @@ class Transaction(models.Model):
     category = models.CharField(max_length=50, blank=True, null=True, help_text="e.g., Groceries, Salary, Utilities")
     date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    import_hash = models.CharField(
+        max_length=64, blank=True, null=True, unique=True, editable=False,
+        help_text="Content hash of the statement row this was imported from; used to skip re-imports.",
+    )
 
     class Meta:
         ordering = ['-date']
+        indexes = [
+            # Newest-first history; id breaks ties in the keyset pagination order.
+            models.Index(fields=['user', '-date', '-id'], name='transaction_user_date_idx'),
+            models.Index(fields=['user', 'category', 'date'], name='transaction_user_cat_date_idx'),
+        ]
+
+    objects = TransactionQuerySet.as_manager()
 
     def __str__(self):
         return f"{self.date} - {self.description} ({self.get_transaction_type_display()}) - {self.amount}"
 
+class MonthlyTransactionRollup(models.Model):
+    """
+    Materialized per-month totals of a user's transactions, one row per
+    (month, category, transaction_type). Kept up to date by the signals in
+    app/signals.py; `python manage.py rebuild_transaction_rollups` recomputes it.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='transaction_rollups')
+    month = models.DateField(help_text="First day of the month")
+    category = models.CharField(max_length=50, blank=True, default='', help_text="Empty for uncategorized transactions")
+    transaction_type = models.CharField(max_length=10, choices=Transaction.TRANSACTION_TYPE_CHOICES)
+    total_amount = models.DecimalField(max_digits=15, decimal_places=2, default=0)
+    transaction_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-month', 'transaction_type', 'category']
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month', 'category', 'transaction_type'], name='unique_transaction_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} {self.month:%Y-%m} {self.category or '-'} ({self.transaction_type}): {self.total_amount}"
+
 # --- Retirement and Investment Models ---
 
 class RetirementAccount(models.Model):
@@ -134,6 +201,94 @@ class RetirementAccount(models.Model):
     def __str__(self):
         return f"{self.user.username}'s {self.account_name}"
 
+class InvestmentQuerySet(models.QuerySet):
+    """
+    Valuation done in the database: each holding is worth quantity times
+    current_value_per_unit, summed without loading the rows.
+
+    SQLite stores decimals as floating point, so there the sums are taken over
+    exact integers (millionths of a unit times cents) and scaled back in Python.
+    """
+    VALUE_FIELD = models.DecimalField(max_digits=30, decimal_places=8)
+    MINOR_UNITS = 10 ** 8  # quantity has 6 decimal places and the unit value 2.
+    # A holding worth less than this is fewer than 2 ** 63 minor units.
+    MAX_MINOR_UNITS_VALUE = 9 * 10 ** 10
+
+    @classmethod
+    def value_expression(cls):
+        return models.ExpressionWrapper(models.F('quantity') * models.F('current_value_per_unit'), output_field=cls.VALUE_FIELD)
+
+    @staticmethod
+    def minor_units_expression():
+        """A holding's value as an exact integer, in 1 / MINOR_UNITS of a currency unit."""
+        def scaled(field, scale):
+            return Cast(Round(models.F(field) * scale), models.BigIntegerField())
+        return scaled('quantity', 10 ** 6) * scaled('current_value_per_unit', 10 ** 2)
+
+    @classmethod
+    def fits_minor_units(cls):
+        """True for holdings whose minor_units_expression() fits in a signed 64-bit integer."""
+        return LessThan(Abs(cls.value_expression()), models.Value(cls.MAX_MINOR_UNITS_VALUE))
+
+    @classmethod
+    def from_minor_units(cls, total) -> decimal.Decimal:
+        """Converts a sum of minor_units_expression() back to a currency amount, to the cent."""
+        return _to_cents(total, cls.MINOR_UNITS)
+
+    def with_value(self):
+        """Annotates each holding with its `value`."""
+        return self.annotate(value=self.value_expression())
+
+    def _sum_values(self, group_by=()):
+        """Totals of the holding values, grouped by the given fields, in cents."""
+        rows = self.order_by()
+        if connections[self.db].vendor != 'sqlite':
+            total = models.Sum(self.value_expression(), output_field=self.VALUE_FIELD)
+            totals = list(rows.values(*group_by).annotate(total=total)) if group_by else [rows.aggregate(total=total)]
+            return [dict(row, total=_to_cents(row['total'])) for row in totals]
+
+        # The bounds come back in the same query and show whether the integer sum fits in 64 bits.
+        aggregates = {
+            'total': models.Sum(self.minor_units_expression()),
+            'holdings': models.Count('pk'),
+            'max_quantity': models.Max(Abs('quantity')),
+            'max_price': models.Max(Abs('current_value_per_unit')),
+        }
+        try:
+            totals = list(rows.values(*group_by).annotate(**aggregates)) if group_by else [rows.aggregate(**aggregates)]
+        except OperationalError:
+            totals = None  # The SUM itself overflowed.
+        if totals is not None and all(_minor_units_bound(row) < 2 ** 63 for row in totals):
+            return [
+                {**{field: row[field] for field in group_by}, 'total': self.from_minor_units(row['total'])}
+                for row in totals
+            ]
+
+        # Too large for exact integers in SQLite; sum the Decimals in Python instead.
+        sums = {}
+        with decimal.localcontext(prec=60):
+            for *key, quantity, price in rows.values_list(*group_by, 'quantity', 'current_value_per_unit'):
+                sums[tuple(key)] = sums.get(tuple(key), 0) + quantity * price
+        return [dict(zip(group_by, key), total=_to_cents(value)) for key, value in sums.items()]
+
+    def total_value(self) -> decimal.Decimal:
+        return self._sum_values()[0]['total']
+
+    def value_by_type(self) -> dict:
+        """{investment_type: total value} in one grouped query."""
+        return {row['investment_type']: row['total'] for row in self._sum_values(('investment_type',))}
+
+
+def _minor_units_bound(row) -> int:
+    """Upper bound of an integer sum of quantity (millionths) times unit value (cents)."""
+    return row['holdings'] * (int(row['max_quantity'] or 0) + 1) * 10 ** 6 * (int(row['max_price'] or 0) + 1) * 10 ** 2
+
+
+def _to_cents(value, scale=1) -> decimal.Decimal:
+    with decimal.localcontext(prec=60):
+        return (decimal.Decimal(value or 0) / scale).quantize(decimal.Decimal('0.01'), rounding=decimal.ROUND_HALF_UP)
+
+
 class Investment(models.Model):
     """
     Represents a user's investments in stocks, mutual funds, etc.
@@ -148,11 +303,21 @@ class Investment(models.Model):
 
     user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='investments')
     name = models.CharField(max_length=100, help_text="e.g., Reliance Industries, Nifty 50 Index Fund")
+    symbol = models.CharField(max_length=20, blank=True, default='', help_text="Ticker or scheme code used by the price feed")
     investment_type = models.CharField(max_length=15, choices=INVESTMENT_TYPE_CHOICES)
     quantity = models.DecimalField(max_digits=15, decimal_places=6, default=0.0, help_text="e.g., number of shares or units")
     current_value_per_unit = models.DecimalField(max_digits=15, decimal_places=2)
+    price_as_of = models.DateTimeField(null=True, blank=True, help_text="Timestamp of the feed quote that set current_value_per_unit")
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = InvestmentQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # The price feed matches symbols case-insensitively (app/price_feed.py).
+            models.Index(Upper('symbol'), name='investment_symbol_upper_idx'),
+        ]
+
     @property
     def total_value(self):
         if self.quantity is not None and self.current_value_per_unit is not None:
@@ -195,3 +360,66 @@ class CreditScore(models.Model):
 
     def __str__(self):
         return f"{self.user.username}'s Credit Score: {self.score} ({self.rating})"
+
+
+# --- Chat Models ---
+
+class DataPermissions(models.Model):
+    """
+    Which financial data categories the AI assistant may see for a user, as one
+    bit per entry of CATEGORIES. Users without a row share everything.
+    """
+    CATEGORIES = ('assets', 'liabilities', 'transactions', 'epf_retirement', 'credit_score', 'investments')
+    ALL = (1 << len(CATEGORIES)) - 1
+
+    user = models.OneToOneField(CustomUser, on_delete=models.CASCADE, primary_key=True, related_name='data_permissions')
+    mask = models.PositiveSmallIntegerField(default=ALL)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def bit(cls, category) -> int:
+        return 1 << cls.CATEGORIES.index(category)
+
+    @classmethod
+    def to_dict(cls, mask) -> dict:
+        return {category: bool(mask & (1 << i)) for i, category in enumerate(cls.CATEGORIES)}
+
+    def __str__(self):
+        return f"{self.user_id} permissions: {self.mask:06b}"
+
+class Conversation(models.Model):
+    """
+    A chat thread with the AI assistant. Anonymous chats are tied to the session
+    that holds the conversation id; older turns are folded into `summary`.
+    """
+    user = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='conversations', null=True, blank=True)
+    summary = models.TextField(blank=True, default='', help_text="Rolling summary of compacted older turns")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        owner = self.user.username if self.user_id else "anonymous"
+        return f"Conversation {self.pk} ({owner})"
+
+class ChatMessage(models.Model):
+    """
+    A single turn in a conversation. Rows are only ever appended, and deleted
+    once they have been compacted into the conversation summary.
+    """
+    ROLE_CHOICES = [
+        ('user', 'User'),
+        ('assistant', 'Assistant'),
+    ]
+
+    conversation = models.ForeignKey(Conversation, on_delete=models.CASCADE, related_name='messages')
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES)
+    content = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+
+    def as_dict(self):
+        return {"role": self.role, "content": self.content}
+
+    def __str__(self):
+        return f"{self.conversation_id} - {self.role}: {self.content[:50]}"
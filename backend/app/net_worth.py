@@ -0,0 +1,141 @@
+"""
+Net worth computed from the source rows, cached per user.
+
+All totals come from one SELECT: each source table is summed in a correlated
+subquery (with conditional aggregates for the asset breakdown), so there is a
+single round trip however many assets or holdings a user has. Investments are
+summed as exact integers (InvestmentQuerySet.minor_units_expression()), since
+SQLite multiplies decimals as floats, and scaled back in Python, so the figure
+matches the portfolio endpoint to the cent. Only a holding too large for 64-bit
+minor units costs a second query, through total_value(). Results are cached
+under a per-user version that the model signals bump on every change to the
+underlying rows, so a process sharing NET_WORTH_CACHE_ALIAS never serves a
+figure after the data it was computed from has changed. The invalidation only
+reaches other workers when that alias is a shared backend, which
+check_net_worth_cache() enforces outside DEBUG.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import caches
+from django.db import OperationalError
+from django.db.models import BigIntegerField, Count, DecimalField, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .authentication import PER_PROCESS_CACHES
+from .models import Asset, CustomUser, Investment, InvestmentQuerySet, Liability, RetirementAccount
+
+LIQUID_ASSET_TYPES = ('CASH', 'BANK')
+COMPONENTS = ('assets', 'liquid_assets', 'investments', 'retirement', 'liabilities')
+
+_AMOUNT = DecimalField(max_digits=30, decimal_places=8)
+_ZERO = Decimal('0.00')
+
+
+def _subquery(model, aggregate, output_field):
+    """Correlated subquery computing `aggregate` over the user's rows of `model`."""
+    rows = (
+        model.objects.filter(user=OuterRef('pk')).order_by().values('user')
+        .annotate(result=aggregate).values('result')
+    )
+    return Subquery(rows, output_field=output_field)
+
+
+def _total(model, expression, condition=None):
+    total = _subquery(model, Sum(expression, filter=condition, output_field=_AMOUNT), _AMOUNT)
+    return Coalesce(total, Value(Decimal('0'), output_field=_AMOUNT))
+
+
+def _components():
+    # Prefixed so the annotations do not clash with the reverse relations on CustomUser.
+    fits = Q(InvestmentQuerySet.fits_minor_units())
+    return {
+        'total_assets': _total(Asset, 'current_value'),
+        'total_liquid_assets': _total(Asset, 'current_value', Q(asset_type__in=LIQUID_ASSET_TYPES)),
+        'total_investments': _subquery(
+            Investment, Sum(InvestmentQuerySet.minor_units_expression(), filter=fits), BigIntegerField(),
+        ),
+        'oversized_investments': _subquery(Investment, Count('pk', filter=~fits), IntegerField()),
+        'total_retirement': _total(RetirementAccount, 'current_balance'),
+        'total_liabilities': _total(Liability, 'amount_owed'),
+    }
+
+
+def _read(user_id, components) -> dict:
+    return CustomUser.objects.filter(pk=user_id).values(**components).first() or {}
+
+
+def compute_net_worth(user_id) -> dict:
+    """
+    Totals for one user, read in a single query. Net worth is assets plus
+    investments plus retirement savings, minus liabilities.
+    """
+    components = _components()
+    try:
+        row = _read(user_id, components)
+    except OperationalError:
+        row = None  # SQLite's integer SUM of the investments overflowed.
+    if row is None:
+        del components['total_investments'], components['oversized_investments']
+        row = _read(user_id, components)
+    if 'total_investments' in row and not row['oversized_investments']:
+        row['total_investments'] = InvestmentQuerySet.from_minor_units(row['total_investments'])
+    else:
+        row['total_investments'] = Investment.objects.filter(user_id=user_id).total_value()
+    totals = {name: Decimal(row.get(f'total_{name}') or 0).quantize(_ZERO) for name in COMPONENTS}
+    totals['net_worth'] = totals['assets'] + totals['investments'] + totals['retirement'] - totals['liabilities']
+    return totals
+
+
+def _cache():
+    return caches[settings.NET_WORTH_CACHE_ALIAS]
+
+
+def _version_key(user_id) -> str:
+    return f"net_worth_version:{user_id}"
+
+
+def get_net_worth(user_id) -> dict:
+    """Cached compute_net_worth()."""
+    if not settings.NET_WORTH_CACHE_TTL:
+        return compute_net_worth(user_id)
+    cache = _cache()
+    key = f"net_worth:{user_id}:{cache.get(_version_key(user_id), 0)}"
+    totals = cache.get(key)
+    if totals is None:
+        totals = compute_net_worth(user_id)
+        cache.set(key, totals, settings.NET_WORTH_CACHE_TTL)
+    return totals
+
+
+def invalidate_net_worth(*user_ids):
+    """
+    Makes the cached totals of these users unreachable. Besides deleting the
+    entry, the version is bumped so a computation that started before the
+    change cannot store its stale result under the current key.
+    """
+    cache = _cache()
+    for user_id in user_ids:
+        cache.delete(f"net_worth:{user_id}:{cache.get(_version_key(user_id), 0)}")
+        try:
+            cache.incr(_version_key(user_id))
+        except ValueError:
+            cache.set(_version_key(user_id), 1, None)
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_net_worth_cache(app_configs=None, **kwargs):
+    """Net worth invalidations must reach every worker: reject a per-process cache outside DEBUG."""
+    if settings.DEBUG or not settings.NET_WORTH_CACHE_TTL:
+        return []
+    backend = settings.CACHES.get(settings.NET_WORTH_CACHE_ALIAS, {}).get('BACKEND')
+    if backend not in PER_PROCESS_CACHES:
+        return []
+    return [checks.Error(
+        f"NET_WORTH_CACHE_ALIAS '{settings.NET_WORTH_CACHE_ALIAS}' uses {backend.rsplit('.', 1)[-1]}, "
+        "which is not shared between workers, so the others keep serving a stale net worth.",
+        hint="Set NET_WORTH_CACHE_STORAGE=db and run `python manage.py createcachetable`, "
+             "or point the alias at Redis/Memcached.",
+        id='app.E002',
+    )]
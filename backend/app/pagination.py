@@ -0,0 +1,80 @@
+"""
+Pagination classes for the REST API.
+"""
+import base64
+from datetime import date
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Newest-first cursor pagination on (date, id).
+
+    The cursor encodes the (date, id) of the last row served, and the next page
+    is the rows strictly after it. With an index on (user, date) every page is a
+    short index range scan, however deep it is, where LIMIT/OFFSET has to step
+    over all the earlier rows.
+    """
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    date_field = 'date'
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    @staticmethod
+    def encode_cursor(position) -> str:
+        day, pk = position
+        return base64.urlsafe_b64encode(f"{day.isoformat()}|{pk}".encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(value):
+        try:
+            padded = value + '=' * (-len(value) % 4)
+            day, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+            return date.fromisoformat(day), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            raise NotFound("Invalid cursor.")
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        page_size = self.get_page_size(request)
+        field = self.date_field
+
+        queryset = queryset.order_by(f'-{field}', '-id')
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            day, pk = self.decode_cursor(cursor)
+            # The plain range on the date keeps the index usable; the OR breaks ties on id.
+            queryset = queryset.filter(**{f'{field}__lte': day}).filter(
+                Q(**{f'{field}__lt': day}) | Q(id__lt=pk)
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_next = len(rows) > page_size
+        rows = rows[:page_size]
+        self.next_cursor = self.encode_cursor((getattr(rows[-1], field), rows[-1].pk)) if has_next else None
+        return rows
+
+    def get_next_link(self):
+        if self.next_cursor is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'next_cursor': self.next_cursor,
+            'results': data,
+        })
@@ -0,0 +1,94 @@
+"""
+Data-sharing permissions for the chat views.
+
+A signed-in user's permissions are one DataPermissions row (a bitmask over the
+six data categories) read through an in-process cache, so a chat request costs
+no session write and, once cached, no query. Saving or deleting a row drops the
+cached entry in the process that made the change, on commit; other worker
+processes pick the change up within PERMISSIONS_CACHE_TTL seconds. Anonymous
+users keep their permissions in the session, as before.
+"""
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from .metrics import CacheStatsMixin
+from .models import DataPermissions
+
+CATEGORIES = DataPermissions.CATEGORIES
+DEFAULT_PERMISSIONS = DataPermissions.to_dict(DataPermissions.ALL)
+SESSION_KEY = 'permissions'
+
+
+class PermissionCache(CacheStatsMixin):
+    """In-process {user id: (mask, read at)} with a TTL and hit/miss counters."""
+
+    def __init__(self):
+        super().__init__()
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id) -> int:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and now - entry[1] < settings.PERMISSIONS_CACHE_TTL:
+                self._count('hits')
+                return entry[0]
+            self._count('misses')
+        mask = DataPermissions.objects.filter(user_id=user_id).values_list('mask', flat=True).first()
+        mask = DataPermissions.ALL if mask is None else mask
+        with self._lock:
+            if len(self._entries) >= settings.PERMISSIONS_CACHE_MAX_ENTRIES:
+                self._entries.clear()
+            self._entries[user_id] = (mask, now)
+        return mask
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = len(self._entries)
+        return dict(super().stats(), entries=entries)
+
+
+permission_cache = PermissionCache()
+
+
+def get_permissions(user, session) -> dict:
+    """{category: bool} for the user, or for an anonymous session."""
+    if user.is_authenticated:
+        return DataPermissions.to_dict(permission_cache.get(user.pk))
+    return session.get(SESSION_KEY, DEFAULT_PERMISSIONS)
+
+
+async def aget_permissions(user, session) -> dict:
+    if user.is_authenticated:
+        return DataPermissions.to_dict(await sync_to_async(permission_cache.get)(user.pk))
+    return await session.aget(SESSION_KEY, DEFAULT_PERMISSIONS)
+
+
+def set_permission(user, session, category, has_access: bool):
+    """Grants or revokes one category. Raises ValueError for an unknown category."""
+    if category not in CATEGORIES:
+        raise ValueError(f"Unknown category {category!r}; expected one of {', '.join(CATEGORIES)}.")
+    if not user.is_authenticated:
+        permissions = dict(session.get(SESSION_KEY, DEFAULT_PERMISSIONS))
+        permissions[category] = has_access
+        session[SESSION_KEY] = permissions
+        return
+
+    bit = DataPermissions.bit(category)
+    with transaction.atomic():
+        row, _ = DataPermissions.objects.select_for_update().get_or_create(user_id=user.pk)
+        row.mask = row.mask | bit if has_access else row.mask & ~bit
+        row.save(update_fields=['mask', 'updated_at'])  # The post_save signal drops the cached mask.
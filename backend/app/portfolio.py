@@ -0,0 +1,123 @@
+"""
+Vectorized valuation and what-if revaluation of Investment holdings.
+
+Holdings are read in one query into NumPy arrays of integers in minor units:
+quantity in millionths and unit value in cents, matching the model's decimal
+places. Values are then exact integer products rather than floating point, so
+totals agree to the cent with the Decimal arithmetic of Investment.total_value.
+Arrays that could overflow int64 fall back to Python integers.
+
+numpy is imported inside the functions, like pandas in app/ml.py, so importing
+this module stays cheap.
+"""
+from decimal import ROUND_HALF_UP, Decimal, localcontext
+from typing import NamedTuple
+
+QUANTITY_SCALE = 10 ** 6  # Investment.quantity has 6 decimal places.
+PRICE_SCALE = 10 ** 2  # Investment.current_value_per_unit has 2.
+FACTOR_SCALE = 10 ** 6  # What-if shocks are applied with 6 decimal places.
+# Allowed shocks: prices can fall to zero or rise 100-fold. Wider moves would overflow the int64 factors.
+MIN_SHOCK = Decimal('-1')
+MAX_SHOCK = Decimal('100')
+_INT64_MAX = 2 ** 63 - 1
+
+
+class Holdings(NamedTuple):
+    ids: object  # int64 array of Investment ids
+    investment_types: object  # str array
+    quantity: object  # int64 array, millionths of a unit
+    price: object  # int64 array, cents per unit
+
+
+def load_holdings(queryset) -> Holdings:
+    """Reads the holdings of an Investment queryset into arrays with one query."""
+    import numpy as np
+
+    rows = list(queryset.order_by().values_list('id', 'investment_type', 'quantity', 'current_value_per_unit'))
+    return Holdings(
+        ids=np.array([row[0] for row in rows], dtype=np.int64),
+        investment_types=np.array([row[1] for row in rows], dtype=str),
+        quantity=_to_minor_units([row[2] for row in rows], QUANTITY_SCALE),
+        price=_to_minor_units([row[3] for row in rows], PRICE_SCALE),
+    )
+
+
+def _to_minor_units(values, scale: int):
+    import numpy as np
+
+    # The model's max_digits keep every field well inside int64 once scaled.
+    return np.array([int((value or 0) * scale) for value in values], dtype=np.int64)
+
+
+def _exact_product(*arrays):
+    """Elementwise product, in Python integers if the int64 result (or its sum) could overflow."""
+    import numpy as np
+
+    bound = len(arrays[0])
+    for array in arrays:
+        bound *= int(np.abs(array).max()) if len(array) else 0
+    if bound > _INT64_MAX:
+        arrays = [array.astype(object) for array in arrays]
+    product = arrays[0]
+    for array in arrays[1:]:
+        product = product * array
+    return product
+
+
+def _to_decimal(minor_units, scale: int) -> Decimal:
+    """Rounds an integer amount in 1/scale units to cents, without losing digits."""
+    with localcontext(prec=60):
+        return (Decimal(int(minor_units)) / scale).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def _totals_by_type(investment_types, values, scale: int) -> dict:
+    import numpy as np
+
+    labels, inverse = np.unique(investment_types, return_inverse=True)
+    totals = np.zeros(len(labels), dtype=values.dtype)
+    np.add.at(totals, inverse, values)
+    return {str(label): _to_decimal(total, scale) for label, total in zip(labels, totals)}
+
+
+def holding_values(holdings: Holdings):
+    """Value of each holding in units of 1e-8 (quantity scale times price scale)."""
+    return _exact_product(holdings.quantity, holdings.price)
+
+
+def total_value(holdings: Holdings) -> Decimal:
+    return _to_decimal(holding_values(holdings).sum(), QUANTITY_SCALE * PRICE_SCALE)
+
+
+def value_by_type(holdings: Holdings) -> dict:
+    return _totals_by_type(holdings.investment_types, holding_values(holdings), QUANTITY_SCALE * PRICE_SCALE)
+
+
+def _factors(investment_types, shocks: dict):
+    """Per-holding multipliers (1 + shock) in FACTOR_SCALE units; a '*' shock applies to unlisted types."""
+    import numpy as np
+
+    default = shocks.get('*', 0)
+    factors = np.full(len(investment_types), FACTOR_SCALE, dtype=np.int64)
+    for investment_type in np.unique(investment_types):
+        shock = Decimal(str(shocks.get(str(investment_type), default)))
+        if not MIN_SHOCK <= shock <= MAX_SHOCK:
+            raise ValueError(f"A shock of {shock} for {investment_type} is outside {MIN_SHOCK} to {MAX_SHOCK}.")
+        factors[investment_types == investment_type] = int(((1 + shock) * FACTOR_SCALE).to_integral_value(ROUND_HALF_UP))
+    return factors
+
+
+def revalue(holdings: Holdings, shocks: dict) -> dict:
+    """
+    What-if valuation with unit values moved by a relative shock per investment
+    type, e.g. {'STOCK': Decimal('-0.2'), 'CRYPTO': Decimal('-0.5')}. Returns the
+    revalued totals by type, the new total and the change from the current total.
+    """
+    scale = QUANTITY_SCALE * PRICE_SCALE
+    current = holding_values(holdings)
+    shocked = _exact_product(holdings.quantity, holdings.price, _factors(holdings.investment_types, shocks))
+    shocked_sum = int(shocked.sum())
+    return {
+        'by_type': _totals_by_type(holdings.investment_types, shocked, scale * FACTOR_SCALE),
+        'total': _to_decimal(shocked_sum, scale * FACTOR_SCALE),
+        'change': _to_decimal(shocked_sum - int(current.sum()) * FACTOR_SCALE, scale * FACTOR_SCALE),
+    }
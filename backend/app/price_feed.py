@@ -0,0 +1,147 @@
+"""
+Price-feed ingestion for Investment.current_value_per_unit.
+
+A feed is CSV text of (symbol, price, timestamp) quotes, read from a local file
+or streamed from a URL. Only the latest quote per symbol is kept, and quotes are
+applied a chunk of symbols at a time: one UPDATE per chunk sets every matching
+holding's price with a CASE on the symbol, so holdings are never loaded into
+Python. Symbols match case-insensitively (through the index on UPPER(symbol)).
+A quote only applies when it is newer than the holding's price_as_of; if the
+price is unchanged, a second UPDATE just advances price_as_of, so an older quote
+in a later feed cannot overwrite it. Re-running a feed is a no-op.
+"""
+import codecs
+import csv
+from datetime import datetime, timezone
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.db.models import Case, DateTimeField, DecimalField, Q, Value, When
+from django.db.models.functions import Upper
+from django.db.models.lookups import Exact, In
+from django.utils import timezone as django_timezone
+
+from .clients import get_http_session, get_timeout
+from .models import Investment
+from .net_worth import invalidate_net_worth
+
+DEFAULT_CHUNK_SIZE = 100
+PRICE_FIELD = Investment._meta.get_field('current_value_per_unit')
+
+
+class FeedResult:
+    """Counters for one ingestion run."""
+
+    def __init__(self):
+        self.quotes = 0
+        self.invalid = 0
+        self.symbols = 0
+        self.updated = 0
+
+    def as_dict(self) -> dict:
+        return {'quotes': self.quotes, 'invalid': self.invalid, 'symbols': self.symbols, 'updated': self.updated}
+
+
+def parse_timestamp(value: str) -> datetime:
+    """ISO 8601 (naive values are UTC) or Unix seconds."""
+    value = value.strip()
+    try:
+        return datetime.fromtimestamp(float(value), tz=timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        pass
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def parse_quote(row):
+    """(symbol, price, timestamp) from a CSV row, or None for a header or blank line."""
+    if not row or not any(cell.strip() for cell in row):
+        return None
+    if len(row) < 3:
+        raise ValueError(f"Expected symbol, price, timestamp; got {row!r}.")
+    symbol = row[0].strip().upper()
+    if symbol == 'SYMBOL':
+        return None
+    try:
+        price = Decimal(row[1].strip()).quantize(Decimal('0.01'))
+    except InvalidOperation:
+        raise ValueError(f"Invalid price {row[1]!r} for {symbol}.")
+    if not symbol or not price.is_finite() or price < 0:
+        raise ValueError(f"Invalid quote {row!r}.")
+    return symbol, price, parse_timestamp(row[2])
+
+
+def read_lines(source):
+    """Text lines of a feed from a local path or an http(s) URL, streamed."""
+    if source.startswith(('http://', 'https://')):
+        response = get_http_session().get(source, stream=True, timeout=get_timeout())
+        response.raise_for_status()
+        yield from response.iter_lines(decode_unicode=True)
+        return
+    with open(source, 'rb') as stream:
+        yield from codecs.iterdecode(stream, 'utf-8-sig')
+
+
+def latest_quotes(lines, result: FeedResult) -> dict:
+    """{symbol: (price, timestamp)} keeping the newest quote of each symbol."""
+    quotes = {}
+    for row in csv.reader(lines):
+        try:
+            quote = parse_quote(row)
+        except ValueError:
+            result.invalid += 1
+            continue
+        if quote is None:
+            continue
+        result.quotes += 1
+        symbol, price, timestamp = quote
+        if symbol not in quotes or timestamp > quotes[symbol][1]:
+            quotes[symbol] = (price, timestamp)
+    return quotes
+
+
+def _apply_chunk(chunk: dict) -> int:
+    """
+    Applies {symbol: (price, timestamp)} to the matching holdings; returns the
+    number of holdings whose price changed.
+    """
+    symbol = Upper('symbol')
+    price = Case(
+        *[When(Exact(symbol, ticker), then=Value(p, output_field=PRICE_FIELD)) for ticker, (p, _) in chunk.items()],
+        output_field=DecimalField(max_digits=15, decimal_places=2),
+    )
+    as_of = Case(
+        *[When(Exact(symbol, ticker), then=Value(ts)) for ticker, (_, ts) in chunk.items()],
+        output_field=DateTimeField(),
+    )
+    newer = Investment.objects.filter(In(symbol, list(chunk))).filter(
+        Q(price_as_of__isnull=True) | Q(price_as_of__lt=as_of)
+    )
+    changed = newer.exclude(current_value_per_unit=price)
+    with transaction.atomic():
+        user_ids = set(changed.values_list('user_id', flat=True).distinct())
+        updated = 0
+        if user_ids:
+            updated = changed.update(current_value_per_unit=price, price_as_of=as_of, updated_at=django_timezone.now())
+        newer.update(price_as_of=as_of)  # What is left: same price, newer quote.
+    if user_ids:
+        transaction.on_commit(lambda: invalidate_net_worth(*user_ids))
+    return updated
+
+
+def apply_quotes(quotes: dict, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Applies the quotes in chunks of symbols; returns the number of holdings updated."""
+    symbols = sorted(quotes)
+    updated = 0
+    for start in range(0, len(symbols), chunk_size):
+        updated += _apply_chunk({symbol: quotes[symbol] for symbol in symbols[start:start + chunk_size]})
+    return updated
+
+
+def ingest_price_feed(source: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> FeedResult:
+    """Reads a feed from a path or URL and applies it to every holding of each quoted symbol."""
+    result = FeedResult()
+    quotes = latest_quotes(read_lines(source), result)
+    result.symbols = len(quotes)
+    result.updated = apply_quotes(quotes, chunk_size)
+    return result
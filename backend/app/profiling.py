@@ -0,0 +1,206 @@
+"""
+Per-request profiling: Server-Timing headers and sampled cProfile dumps.
+
+ProfilingMiddleware samples PROFILING_SAMPLE_RATE of requests. For a sampled
+request it records the SQL query count and time (through an execute wrapper
+on every database connection, so queries run on worker threads count too),
+the time spent in each upstream call (`span('llm')`, `span('mock_api')`, ...)
+and in JSON serialization (`span('serialize')`), and returns them in a
+Server-Timing header, e.g.
+
+    Server-Timing: db;dur=3.1;desc="6 queries", llm;dur=812.4, serialize;dur=0.4, total;dur=820.2
+
+Unsampled requests cost one random() call, and every query or span outside a
+sampled request one ContextVar lookup. A PROFILING_CPROFILE_SAMPLE_RATE share
+of the sampled requests also run under cProfile (one at a time per process),
+and the profile is written to PROFILING_DUMP_DIR if the request took longer
+than PROFILING_SLOW_MS. Only requests served synchronously are profiled: under
+ASGI the event loop thread interleaves every in-flight request's coroutines, so
+a cProfile of one of them would mostly measure the others; async requests still
+get the Server-Timing header. Streaming responses only report what happened
+before their first byte.
+"""
+import cProfile
+import logging
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar('request_profile', default=None)
+_cprofile_lock = threading.Lock()  # cProfile hooks are per process on newer Pythons; profile one request at a time.
+
+
+class RequestProfile:
+    """Time and call counts per metric for one request. Shared with the request's worker threads."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.durations = {}
+        self.counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds: float):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+            self.counts[name] = self.counts.get(name, 0) + 1
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    def server_timing(self) -> str:
+        with self._lock:
+            metrics = sorted(self.durations.items(), key=lambda item: item[0] != 'db')
+            counts = dict(self.counts)
+        entries = []
+        for name, seconds in metrics:
+            entry = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                entry += f';desc="{counts[name]} queries"'
+            elif counts[name] > 1:
+                entry += f';desc="{counts[name]} calls"'
+            entries.append(entry)
+        entries.append(f'total;dur={self.elapsed() * 1000:.1f}')
+        return ', '.join(entries)
+
+
+def current_profile():
+    """The profile of the request being handled, if it is sampled."""
+    return _current.get()
+
+
+@contextmanager
+def span(name):
+    """Adds the time spent in the block to the current request's `name` metric (no-op if unsampled)."""
+    profile = _current.get()
+    if profile is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, time.perf_counter() - started)
+
+
+def _time_query(execute, sql, params, many, context):
+    profile = _current.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.add('db', time.perf_counter() - started)
+
+
+def _install_query_timer(connection):
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    _install_query_timer(connection)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """DRF's JSON renderer, timed as the `serialize` metric."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with span('serialize'):
+            return super().render(data, accepted_media_type, renderer_context)
+
+
+def _dump_name(request, elapsed: float) -> str:
+    slug = re.sub(r'[^A-Za-z0-9]+', '-', request.path).strip('-') or 'root'
+    return f'{time.strftime("%Y%m%d-%H%M%S")}-{request.method}-{slug[:80]}-{elapsed * 1000:.0f}ms.prof'
+
+
+class ProfilingMiddleware:
+    """Adds Server-Timing to sampled requests and dumps cProfile stats of slow ones."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+        for connection in connections.all(initialized_only=True):
+            _install_query_timer(connection)
+
+    @staticmethod
+    def _sampled() -> bool:
+        rate = settings.PROFILING_SAMPLE_RATE
+        return rate > 0 and (rate >= 1 or random.random() < rate)
+
+    def _start_cprofile(self):
+        rate = settings.PROFILING_CPROFILE_SAMPLE_RATE
+        if rate <= 0 or random.random() >= rate or not _cprofile_lock.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # Another profiler is already active.
+            _cprofile_lock.release()
+            return None
+        return profiler
+
+    def _finish(self, request, response, profile, profiler):
+        if profiler is not None:
+            profiler.disable()
+            _cprofile_lock.release()
+            elapsed = profile.elapsed()
+            if elapsed * 1000 >= settings.PROFILING_SLOW_MS:
+                directory = Path(settings.PROFILING_DUMP_DIR)
+                try:
+                    directory.mkdir(parents=True, exist_ok=True)
+                    profiler.dump_stats(directory / _dump_name(request, elapsed))
+                except OSError:
+                    logger.exception("Error writing profile dump to %s", directory)
+        response['Server-Timing'] = profile.server_timing()
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        profiler = self._start_cprofile()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            if profiler is not None:
+                profiler.disable()
+                _cprofile_lock.release()
+            raise
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile, profiler)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        # Not run under cProfile (see the module docstring): the loop also runs other requests' coroutines.
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self._finish(request, response, profile, None)
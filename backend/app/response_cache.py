@@ -0,0 +1,116 @@
+"""
+Cache of AI chat replies keyed on the normalized prompt inputs.
+
+The key is a hash of the permission-filtered financial data, the trimmed history
+window and the normalized user message, so a change to the user's data or
+permissions always produces a different key. Storage is the 'llm_responses'
+cache alias (bounded in-process LRU with a TTL, or the database cache), and the
+per-user generations live next to it in 'llm_reply_generations', which the same
+LLM_RESPONSE_CACHE_STORAGE setting moves to the database.
+"""
+import hashlib
+import json
+import uuid
+
+from django.core.cache import caches
+
+from .ai import ERROR_REPLIES
+from .metrics import CacheStatsMixin
+
+
+def normalize_message(message: str) -> str:
+    """Lowercases, collapses whitespace and drops trailing punctuation."""
+    return " ".join(message.lower().split()).rstrip("?!. ")
+
+
+def _digest(value) -> str:
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class LLMResponseCache(CacheStatsMixin):
+    """
+    Reply cache with per-user invalidation.
+
+    Each user has a generation token (kept in the bounded 'llm_reply_generations'
+    cache) that is part of every key; invalidate_user() replaces it so all earlier
+    replies for that user become unreachable and age out of the bounded store. A
+    token is random rather than a counter, so when one is evicted the user gets a
+    fresh token instead of falling back to one whose replies are still cached.
+    An invalidation reaches other workers only when both aliases are shared.
+    """
+
+    KEY_PREFIX = 'llm_reply'
+    GENERATION_PREFIX = 'llm_reply_generation'
+
+    def __init__(self, cache_alias='llm_responses', generation_alias='llm_reply_generations'):
+        super().__init__()
+        self._cache_alias = cache_alias
+        self._generation_alias = generation_alias
+
+    @property
+    def _cache(self):
+        return caches[self._cache_alias]
+
+    @property
+    def _generations(self):
+        return caches[self._generation_alias]
+
+    def _build_key(self, user_key, generation, history_window, accessible_data, user_message) -> str:
+        digest = _digest({
+            'data': accessible_data,
+            'history': history_window,
+            'message': normalize_message(user_message),
+        })
+        return f"{self.KEY_PREFIX}:{user_key}:{generation}:{digest}"
+
+    def _generation(self, user_key) -> str:
+        generation_key = f"{self.GENERATION_PREFIX}:{user_key}"
+        generation = self._generations.get(generation_key)
+        if generation is None:
+            # add() so that concurrent first requests agree on one token.
+            self._generations.add(generation_key, uuid.uuid4().hex, None)
+            generation = self._generations.get(generation_key)
+        return generation
+
+    async def _ageneration(self, user_key) -> str:
+        generation_key = f"{self.GENERATION_PREFIX}:{user_key}"
+        generation = await self._generations.aget(generation_key)
+        if generation is None:
+            await self._generations.aadd(generation_key, uuid.uuid4().hex, None)
+            generation = await self._generations.aget(generation_key)
+        return generation
+
+    def key_for(self, user_key, history_window, accessible_data, user_message) -> str:
+        generation = self._generation(user_key)
+        return self._build_key(user_key, generation, history_window, accessible_data, user_message)
+
+    async def akey_for(self, user_key, history_window, accessible_data, user_message) -> str:
+        generation = await self._ageneration(user_key)
+        return self._build_key(user_key, generation, history_window, accessible_data, user_message)
+
+    def get(self, key):
+        reply = self._cache.get(key)
+        self._count('hits' if reply is not None else 'misses')
+        return reply
+
+    async def aget(self, key):
+        reply = await self._cache.aget(key)
+        self._count('hits' if reply is not None else 'misses')
+        return reply
+
+    def set(self, key, reply: str):
+        """Stores a reply; error replies are never cached."""
+        if reply and reply not in ERROR_REPLIES:
+            self._cache.set(key, reply)
+
+    async def aset(self, key, reply: str):
+        if reply and reply not in ERROR_REPLIES:
+            await self._cache.aset(key, reply)
+
+    def invalidate_user(self, user_key):
+        """Makes every cached reply for the user unreachable."""
+        self._generations.set(f"{self.GENERATION_PREFIX}:{user_key}", uuid.uuid4().hex, None)
+
+
+response_cache = LLMResponseCache()
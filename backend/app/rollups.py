@@ -0,0 +1,178 @@
+"""
+Incremental monthly rollups of Transaction rows.
+
+Each (user, month, category, transaction_type) has one MonthlyTransactionRollup
+row holding the sum and count of its transactions. Single-row saves and deletes
+adjust it through the signals in app/signals.py. bulk_create and
+QuerySet.update() send no signals, so code using them calls rebuild_rollups()
+for the affected users once it is done, as imports and seeding do.
+
+QuerySet.delete() does send post_delete for every row. Transaction's queryset
+overrides it (delete_transactions()) to subtract the deleted rows from the
+rollups with one write per affected rollup row, and the per-row signal
+handler does nothing meanwhile. Deleting a user skips the per-row work too,
+since the user's rollup rows are deleted with them.
+"""
+from contextvars import ContextVar
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import MonthlyTransactionRollup, Transaction
+
+_bulk_deleting = ContextVar('rollup_bulk_deleting', default=False)
+
+
+def _month(value) -> date:
+    if isinstance(value, str):
+        value = date.fromisoformat(value[:10])
+    return value.replace(day=1)
+
+
+def rollup_key(user_id, day, category, transaction_type) -> tuple:
+    """The rollup row a transaction with these values belongs to."""
+    return (user_id, _month(day), category or '', transaction_type)
+
+
+def _apply(key, amount: Decimal, count: int):
+    """Adds amount/count to one rollup row, creating or removing the row as needed."""
+    user_id, month, category, transaction_type = key
+    rows = MonthlyTransactionRollup.objects.filter(
+        user_id=user_id, month=month, category=category, transaction_type=transaction_type
+    )
+    with transaction.atomic():
+        updated = rows.update(
+            total_amount=F('total_amount') + amount,
+            transaction_count=F('transaction_count') + count,
+        )
+        if not updated and count > 0:
+            try:
+                with transaction.atomic():
+                    MonthlyTransactionRollup.objects.create(
+                        user_id=user_id, month=month, category=category, transaction_type=transaction_type,
+                        total_amount=amount, transaction_count=count,
+                    )
+            except IntegrityError:
+                # Another writer created the row first.
+                rows.update(
+                    total_amount=F('total_amount') + amount,
+                    transaction_count=F('transaction_count') + count,
+                )
+        elif count < 0:
+            rows.filter(transaction_count=0).delete()
+
+
+def apply_transaction_change(previous, current):
+    """
+    Moves one transaction between rollup rows. `previous` and `current` are
+    (key, amount) pairs, or None for a create or delete respectively.
+    """
+    if previous and current and previous[0] == current[0]:
+        if previous[1] != current[1]:
+            _apply(current[0], current[1] - previous[1], 0)
+        return
+    if previous:
+        _apply(previous[0], -previous[1], -1)
+    if current:
+        _apply(current[0], current[1], 1)
+
+
+def rollup_entry(user_id, day, category, transaction_type, amount):
+    return rollup_key(user_id, day, category, transaction_type), Decimal(str(amount))
+
+
+def _grouped_totals(transactions) -> dict:
+    """{rollup key: [total, count]} for a queryset of transactions, grouped in the database."""
+    grouped = (
+        transactions.order_by()
+        .annotate(month=TruncMonth('date'))
+        .values('user_id', 'month', 'category', 'transaction_type')
+        .annotate(total=Sum('amount'), count=Count('id'))
+    )
+    merged = defaultdict(lambda: [Decimal('0'), 0])
+    for row in grouped.iterator():
+        key = rollup_key(row['user_id'], row['month'], row['category'], row['transaction_type'])
+        merged[key][0] += row['total']
+        merged[key][1] += row['count']
+    return merged
+
+
+def deleting_in_bulk() -> bool:
+    """True while delete_transactions() is deleting, so the per-row signal handler can skip."""
+    return _bulk_deleting.get()
+
+
+def delete_transactions(transactions, delete):
+    """Runs `delete` (the queryset's own delete) and subtracts the deleted rows from the rollups."""
+    with transaction.atomic():
+        totals = _grouped_totals(transactions)
+        token = _bulk_deleting.set(True)
+        try:
+            result = delete()
+        finally:
+            _bulk_deleting.reset(token)
+        for key, (amount, count) in totals.items():
+            _apply(key, -amount, -count)
+    return result
+
+
+def rebuild_rollups(user=None, user_ids=None) -> int:
+    """
+    Recomputes the rollups from scratch (for one user, the given user ids, or
+    everyone); returns rows written.
+    """
+    transactions = Transaction.objects.all()
+    rollups = MonthlyTransactionRollup.objects.all()
+    if user is not None:
+        transactions = transactions.filter(user=user)
+        rollups = rollups.filter(user=user)
+    if user_ids is not None:
+        transactions = transactions.filter(user_id__in=user_ids)
+        rollups = rollups.filter(user_id__in=user_ids)
+
+    merged = _grouped_totals(transactions)
+    with transaction.atomic():
+        rollups.delete()
+        MonthlyTransactionRollup.objects.bulk_create(
+            [
+                MonthlyTransactionRollup(
+                    user_id=user_id, month=month, category=category, transaction_type=transaction_type,
+                    total_amount=total, transaction_count=count,
+                )
+                for (user_id, month, category, transaction_type), (total, count) in merged.items()
+            ],
+            batch_size=1000,
+        )
+    return len(merged)
+
+
+def monthly_rollups(user, start=None, end=None):
+    """Rollup rows for a user, optionally limited to months in [start, end]."""
+    rows = MonthlyTransactionRollup.objects.filter(user=user)
+    if start is not None:
+        rows = rows.filter(month__gte=_month(start))
+    if end is not None:
+        rows = rows.filter(month__lte=_month(end))
+    return rows
+
+
+def monthly_totals(user, start=None, end=None) -> dict:
+    """{month: {transaction_type: total}} read from O(months) rollup rows."""
+    totals = defaultdict(dict)
+    grouped = (
+        monthly_rollups(user, start, end).order_by('month')
+        .values('month', 'transaction_type').annotate(total=Sum('total_amount'))
+    )
+    for row in grouped:
+        totals[row['month']][row['transaction_type']] = row['total']
+    return dict(totals)
+
+
+def month_spending(user, today: date = None) -> Decimal:
+    """Total EXPENSE amount of the current month, read from the rollups."""
+    month = _month(today or date.today())
+    return monthly_totals(user, month, month).get(month, {}).get('EXPENSE', Decimal('0'))
@@ -0,0 +1,239 @@
+"""
+Full-text search over a user's documents and transactions.
+
+On SQLite, FTS5 tables (created by migration 0011) index Document title,
+author, summary and filename and Transaction description and category. They
+are kept in sync by triggers on every insert, update and delete, including
+bulk_create, QuerySet.update() and raw SQL, which signals would miss.
+
+The index is partitioned by user: the triggers index each word as
+u<owner id>_<word>, and a search for "groc" by user 5 is the prefix query
+"u5_groc"*. A query therefore only reads the user's own entries, however many
+rows other users have; an index of plain words plus an owner column has to
+walk every user's matches of a common word and is tens of times slower over a
+million rows. The words are split in SQL by replacing separators
+(SEPARATORS) with the owner prefix; a word joined to the previous one by a rarer
+punctuation mark is not found. The tables are
+contentless (they hold only the index), results are ordered by bm25 with
+per-column weights, and every term is a prefix ("groc" finds "Groceries").
+SQLite drops triggers when a migration rebuilds their table; repair_index()
+restores them after every migrate, and searches fall back to icontains while
+any is missing.
+
+On PostgreSQL the same search runs on to_tsvector/to_tsquery with prefix terms
+and ts_rank, over GIN expression indexes from the same migration. Other
+databases, and SQLite builds without FTS5, fall back to icontains filters,
+newest first.
+"""
+import re
+from dataclasses import dataclass
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from .models import Document, Transaction
+
+MAX_TERMS = 8
+MAX_LIMIT = 100
+# Characters the triggers split words on: whitespace and the punctuation common in bank
+# descriptions and file names. SQLite's parser limits how many replace() calls can nest, so
+# the list is short; other punctuation still separates words for FTS5, but leaves the word
+# after it unsearchable.
+SEPARATORS = ' \t\r\n\u00a0-/.,\'\u2019&():;#*"+@|\u2013'
+
+
+@dataclass(frozen=True)
+class SearchIndex:
+    model: type
+    table: str
+    owner: str
+    columns: tuple  # Indexed columns, in FTS table order.
+    weights: tuple  # bm25 weight per column.
+    newest_first: tuple
+
+
+DOCUMENTS = SearchIndex(Document, 'app_document_fts', 'uploader_id', ('title', 'author', 'summary', 'filename'),
+                        (10.0, 5.0, 2.0, 4.0), ('-upload_date', '-id'))
+TRANSACTIONS = SearchIndex(Transaction, 'app_transaction_fts', 'user_id', ('description', 'category'),
+                           (4.0, 2.0), ('-date', '-id'))
+INDEXES = (DOCUMENTS, TRANSACTIONS)
+TRIGGERS = ('insert', 'delete', 'update')
+
+_fts5_available = {}
+
+
+def parse_terms(query: str) -> list:
+    """The words of a search query, lowercased, at most MAX_TERMS."""
+    return re.findall(r'\w+', (query or '').lower())[:MAX_TERMS]
+
+
+def _sqlite_objects(cursor) -> set:
+    cursor.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def _trigger_names(index: SearchIndex) -> list:
+    return [f'{index.table}_{trigger}' for trigger in TRIGGERS]
+
+
+def _has_fts5() -> bool:
+    """
+    Whether this database has the FTS5 tables and all their triggers (checked
+    once per database). Without a trigger the index goes stale, so searches
+    use the fallback until repair_index() restores it.
+    """
+    name = connection.settings_dict['NAME']
+    if name not in _fts5_available:
+        with connection.cursor() as cursor:
+            objects = _sqlite_objects(cursor)
+        _fts5_available[name] = all(
+            index.table in objects and objects.issuperset(_trigger_names(index)) for index in INDEXES
+        )
+    return _fts5_available[name]
+
+
+def _fts5_match(user_id, terms) -> str:
+    """An FTS5 query for `terms` as prefixes within the user's partition. Quoted, so operators are literal."""
+    return ' '.join('"u%d_%s"*' % (int(user_id), term) for term in terms)
+
+
+def _fts5_ids(index: SearchIndex, user_id, terms, limit: int) -> list:
+    weights = ', '.join(str(weight) for weight in index.weights)
+    sql = (f'SELECT rowid FROM {index.table} WHERE {index.table} MATCH %s '
+           f'ORDER BY bm25({index.table}, {weights}), rowid DESC LIMIT %s')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [_fts5_match(user_id, terms), limit])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _postgres_ids(index: SearchIndex, user_id, terms, limit: int) -> list:
+    from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+
+    vector = SearchVector(*index.columns, config='simple')  # Same expression as the GIN index.
+    query = SearchQuery(' & '.join(f"'{term}'" + (':*' if len(term) > 1 else '') for term in terms),
+                        config='simple', search_type='raw')
+    rows = (index.model.objects.filter(**{index.owner: user_id})
+            .annotate(search=vector).filter(search=query)
+            .annotate(rank=SearchRank(vector, query)).order_by('-rank', '-id'))
+    return list(rows.values_list('id', flat=True)[:limit])
+
+
+def _fallback_ids(index: SearchIndex, user_id, terms, limit: int) -> list:
+    rows = index.model.objects.filter(**{index.owner: user_id})
+    for term in terms:
+        matches = Q()
+        for column in index.columns:
+            matches |= Q(**{f'{column}__icontains': term})
+        rows = rows.filter(matches)
+    return list(rows.order_by(*index.newest_first).values_list('id', flat=True)[:limit])
+
+
+def search_ids(index: SearchIndex, user_id, query: str, limit: int = 20) -> list:
+    """Ids of the user's best matches for `query`, best first."""
+    terms = parse_terms(query)
+    if not terms:
+        return []
+    limit = max(1, min(limit, MAX_LIMIT))
+    if connection.vendor == 'sqlite' and _has_fts5():
+        return _fts5_ids(index, user_id, terms, limit)
+    if connection.vendor == 'postgresql':
+        return _postgres_ids(index, user_id, terms, limit)
+    return _fallback_ids(index, user_id, terms, limit)
+
+
+def search(index: SearchIndex, user_id, query: str, limit: int = 20, defer=()) -> list:
+    """The user's best matches for `query` as model instances, best first."""
+    ids = search_ids(index, user_id, query, limit)
+    rows = index.model.objects.filter(**{index.owner: user_id}).defer(*defer).in_bulk(ids)
+    return [rows[pk] for pk in ids if pk in rows]
+
+
+def fts5_supported(cursor) -> bool:
+    cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+    return bool(cursor.fetchone()[0])
+
+
+def _sql_string(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _partitioned(owner: str, column: str) -> str:
+    """SQL for a column's text with every word prefixed by u<owner>_."""
+    prefix = f"('u' || {owner} || '_')"
+    expression = f"coalesce({column}, '')"
+    for separator in SEPARATORS:
+        expression = f"replace({expression}, {_sql_string(separator)}, ' ' || {prefix})"
+    return f"{prefix} || {expression}"
+
+
+def _fts5_values(index: SearchIndex, row: str) -> str:
+    return ', '.join(_partitioned(f'{row}.{index.owner}', f'{row}.{column}') for column in index.columns)
+
+
+def fts5_schema(index: SearchIndex) -> list:
+    """SQL creating an index's FTS5 table and the triggers that keep it in sync, if missing."""
+    fts, source = index.table, index.model._meta.db_table
+    names = ', '.join(index.columns)
+    delete = f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {_fts5_values(index, 'old')});"
+    insert = f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {_fts5_values(index, 'new')});"
+    watched = ', '.join((index.owner,) + index.columns)
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({names}, content='', "
+        f"tokenize=\"unicode61 remove_diacritics 2 tokenchars '_'\")",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_insert AFTER INSERT ON {source} BEGIN {insert} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_delete AFTER DELETE ON {source} BEGIN {delete} END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_update AFTER UPDATE OF {watched} ON {source} BEGIN {delete} {insert} END",
+    ]
+
+
+def fts5_fill(index: SearchIndex) -> list:
+    """SQL emptying an index's FTS5 table and indexing every source row again."""
+    fts, source = index.table, index.model._meta.db_table
+    return [
+        f"INSERT INTO {fts}({fts}) VALUES ('delete-all')",
+        f"INSERT INTO {fts}(rowid, {', '.join(index.columns)}) "
+        f"SELECT id, {_fts5_values(index, source)} FROM {source}",
+    ]
+
+
+def rebuild_index(optimize: bool = False):
+    """
+    Recreates missing FTS5 tables and triggers and reindexes the source tables;
+    with `optimize`, only merges index segments, which is worth doing after a
+    large import. A no-op on other databases.
+    """
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        if not fts5_supported(cursor):
+            return
+        for index in INDEXES:
+            if optimize:
+                cursor.execute(f"INSERT INTO {index.table}({index.table}) VALUES ('optimize')")
+                continue
+            for sql in fts5_schema(index) + fts5_fill(index):
+                cursor.execute(sql)
+    _fts5_available.clear()
+
+
+def repair_index(using: str = 'default') -> list:
+    """
+    Recreates the triggers of FTS5 tables that lost them and reindexes those
+    tables; returns their names. SQLite drops a table's triggers when a
+    migration rebuilds it (e.g. to alter a column), so this runs after every
+    migrate. Tables that do not exist (migration 0011 not applied, no FTS5)
+    are left alone.
+    """
+    db = connections[using]
+    if db.vendor != 'sqlite':
+        return []
+    repaired = []
+    with db.cursor() as cursor:
+        objects = _sqlite_objects(cursor)
+        for index in INDEXES:
+            if index.table in objects and not objects.issuperset(_trigger_names(index)):
+                for sql in fts5_schema(index) + fts5_fill(index):
+                    cursor.execute(sql)
+                repaired.append(index.table)
+    _fts5_available.clear()
+    return repaired
@@ -0,0 +1,213 @@
+"""
+Synthetic users with realistic-looking finances, for load tests and benchmarks.
+
+seed_users() creates users with assets, liabilities, a year of transactions,
+investments, a retirement account, a credit score and a financial profile,
+all with bulk_create, a chunk of users at a time. Amounts are drawn from
+log-normal distributions around typical values for each kind of row, so the
+data is skewed the way real balances are. The same seed gives the same data.
+"""
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+
+from .models import (
+    Asset, CreditScore, CustomUser, Investment, Liability, RetirementAccount, Transaction, UserProfile,
+)
+from .rollups import rebuild_rollups
+
+CHUNK_USERS = 250
+
+# (category, typical amount, share of expenses)
+EXPENSE_CATEGORIES = (
+    ('Groceries', 60, 0.28), ('Dining', 35, 0.16), ('Transport', 25, 0.14), ('Shopping', 80, 0.12),
+    ('Utilities', 120, 0.08), ('Entertainment', 40, 0.08), ('Health', 90, 0.06), ('Travel', 400, 0.03),
+    (None, 50, 0.05),
+)
+STOCKS = (('Apple', 'AAPL'), ('Microsoft', 'MSFT'), ('Reliance Industries', 'RELIANCE'), ('Infosys', 'INFY'),
+          ('Tata Motors', 'TATAMOTORS'), ('Alphabet', 'GOOGL'), ('HDFC Bank', 'HDFCBANK'), ('Amazon', 'AMZN'))
+FUNDS = (('Nifty 50 Index Fund', 'NIFTY50'), ('S&P 500 Index Fund', 'SPX500'), ('Flexi Cap Fund', 'FLEXICAP'))
+BONDS = (('Government Bond 2033', 'GB2033'), ('Corporate Bond Fund', 'CORPBOND'))
+CRYPTO = (('Bitcoin', 'BTC'), ('Ethereum', 'ETH'))
+
+
+@dataclass
+class SeedResult:
+    users: int = 0
+    rows: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+
+def _money(value) -> Decimal:
+    return Decimal(f'{value:.2f}')
+
+
+def _lognormal(rng, typical: float, spread: float = 0.6) -> float:
+    """A log-normal draw whose median is `typical`."""
+    return rng.lognormvariate(0, spread) * typical
+
+
+class _UserRows:
+    """Generates one user's rows; amounts scale with the user's income."""
+
+    def __init__(self, rng, user_id, transactions: int, today: date):
+        self.rng = rng
+        self.user_id = user_id
+        self.transactions = transactions
+        self.today = today
+        self.income = round(_lognormal(rng, 4000, 0.5), -1)
+
+    def assets(self):
+        rng = self.rng
+        rows = [Asset(user_id=self.user_id, name='Checking', asset_type='BANK',
+                      current_value=_money(_lognormal(rng, self.income * 0.8)))]
+        if rng.random() < 0.8:
+            rows.append(Asset(user_id=self.user_id, name='Savings', asset_type='BANK',
+                              current_value=_money(_lognormal(rng, self.income * 4, 0.9))))
+        if rng.random() < 0.5:
+            rows.append(Asset(user_id=self.user_id, name='Cash', asset_type='CASH',
+                              current_value=_money(_lognormal(rng, 300))))
+        if rng.random() < 0.3:
+            rows.append(Asset(user_id=self.user_id, name='Home', asset_type='PROPERTY',
+                              current_value=_money(_lognormal(rng, self.income * 70, 0.4))))
+        return rows
+
+    def liabilities(self):
+        rng, rows = self.rng, []
+        if rng.random() < 0.6:
+            rows.append(Liability(user_id=self.user_id, name='Credit Card', liability_type='CREDIT_CARD',
+                                  amount_owed=_money(_lognormal(rng, 1500, 0.9)),
+                                  interest_rate=_money(rng.uniform(18, 36))))
+        if rng.random() < 0.35:
+            rows.append(Liability(user_id=self.user_id, name='Personal Loan', liability_type='LOAN',
+                                  amount_owed=_money(_lognormal(rng, 12000, 0.7)),
+                                  interest_rate=_money(rng.uniform(7, 14))))
+        if rng.random() < 0.25:
+            rows.append(Liability(user_id=self.user_id, name='Mortgage', liability_type='MORTGAGE',
+                                  amount_owed=_money(_lognormal(rng, self.income * 50, 0.4)),
+                                  interest_rate=_money(rng.uniform(3, 8))))
+        return rows
+
+    def transaction_rows(self):
+        """A monthly salary plus expenses spread over the last year, newest first."""
+        rng, rows = self.rng, []
+        months = min(12, max(1, self.transactions // 20)) if self.transactions else 0
+        for month in range(months):
+            year, month_index = divmod(self.today.year * 12 + self.today.month - 1 - month, 12)
+            day = date(year, month_index + 1, 1)
+            rows.append(Transaction(user_id=self.user_id, description='Salary', amount=_money(self.income),
+                                    transaction_type='INCOME', category='Salary', date=day))
+        categories = [c for c, _, _ in EXPENSE_CATEGORIES]
+        weights = [w for _, _, w in EXPENSE_CATEGORIES]
+        typical = {c: t for c, t, _ in EXPENSE_CATEGORIES}
+        for _ in range(self.transactions - len(rows)):
+            day = self.today - timedelta(days=rng.randrange(365))
+            if rng.random() < 0.04:
+                rows.append(Transaction(user_id=self.user_id, description='Transfer to savings', date=day,
+                                        amount=_money(_lognormal(rng, self.income * 0.2)),
+                                        transaction_type='TRANSFER', category='Savings'))
+                continue
+            category = rng.choices(categories, weights)[0]
+            rows.append(Transaction(user_id=self.user_id, description=f'{category or "Card"} purchase', date=day,
+                                    amount=_money(_lognormal(rng, typical[category], 0.8)),
+                                    transaction_type='EXPENSE', category=category))
+        return rows
+
+    def investments(self):
+        rng, rows = self.rng, []
+        for choices, investment_type, share, price in (
+            (STOCKS, 'STOCK', 0.5, 150), (FUNDS, 'MUTUAL_FUND', 0.45, 40), (BONDS, 'BOND', 0.15, 1000),
+            (CRYPTO, 'CRYPTO', 0.12, 2500),
+        ):
+            if rng.random() >= share:
+                continue
+            for name, symbol in rng.sample(choices, rng.randint(1, min(3, len(choices)))):
+                rows.append(Investment(
+                    user_id=self.user_id, name=name, symbol=symbol, investment_type=investment_type,
+                    quantity=Decimal(f'{_lognormal(rng, self.income / price / 2, 1.0):.6f}'),
+                    current_value_per_unit=_money(_lognormal(rng, price, 0.3)),
+                ))
+        return rows
+
+    def retirement(self):
+        if self.rng.random() >= 0.8:
+            return None
+        contribution = _lognormal(self.rng, self.income * 1.5, 0.8)
+        return RetirementAccount(
+            user_id=self.user_id, current_balance=_money(contribution * 2.4),
+            employee_contribution=_money(contribution), employer_contribution=_money(contribution * 0.8),
+        )
+
+    def credit_score(self):
+        return CreditScore(user_id=self.user_id, score=int(min(850, max(300, self.rng.gauss(700, 65)))))
+
+    def profile(self, assets, liabilities, investments):
+        total_assets = sum(a.current_value for a in assets) + sum(i.quantity * i.current_value_per_unit for i in investments)
+        owed = sum(l.amount_owed for l in liabilities)
+        return UserProfile(
+            user_id=self.user_id,
+            Net_worth=_money(total_assets - owed),
+            Monthly_Budget=_money(self.income * 0.7),
+            Monthly_Expenses=_money(_lognormal(self.rng, self.income * 0.6, 0.3)),
+            Investments=_money(sum(i.quantity * i.current_value_per_unit for i in investments)),
+            Total_Balance=_money(sum(a.current_value for a in assets if a.asset_type in ('BANK', 'CASH'))),
+        )
+
+
+def seed_usernames(prefix: str, count: int, start: int = 0):
+    return [f'{prefix}{index:06d}@example.com' for index in range(start, start + count)]
+
+
+def seed_users(count: int, transactions_per_user: int = 200, seed: int = 0, password: str = 'password',
+               prefix: str = 'seed', today: date = None, progress=None) -> SeedResult:
+    """
+    Creates `count` users named <prefix><n>@example.com (numbered after any that
+    already exist) who all log in with `password`, plus their financial rows.
+    """
+    rng = random.Random(seed)
+    today = today or date.today()
+    password_hash = make_password(password)  # One hash for everyone: hashing is the slow part of a user.
+    start = CustomUser.objects.filter(username__startswith=prefix, username__endswith='@example.com').count()
+    result = SeedResult(rows=dict.fromkeys(
+        ('assets', 'liabilities', 'transactions', 'investments', 'retirement_accounts', 'credit_scores', 'profiles'), 0,
+    ))
+    started = time.perf_counter()
+
+    for offset in range(0, count, CHUNK_USERS):
+        names = seed_usernames(prefix, min(CHUNK_USERS, count - offset), start + offset)
+        rows = {name: [] for name in result.rows}
+        with transaction.atomic():
+            users = CustomUser.objects.bulk_create(
+                [CustomUser(username=name, email=name, password=password_hash) for name in names],
+            )
+            for user in users:
+                generator = _UserRows(rng, user.pk, transactions_per_user, today)
+                assets, liabilities, investments = generator.assets(), generator.liabilities(), generator.investments()
+                rows['assets'] += assets
+                rows['liabilities'] += liabilities
+                rows['investments'] += investments
+                rows['transactions'] += generator.transaction_rows()
+                retirement = generator.retirement()
+                if retirement is not None:
+                    rows['retirement_accounts'].append(retirement)
+                rows['credit_scores'].append(generator.credit_score())
+                rows['profiles'].append(generator.profile(assets, liabilities, investments))
+
+            for name, model in (('assets', Asset), ('liabilities', Liability), ('transactions', Transaction),
+                                ('investments', Investment), ('retirement_accounts', RetirementAccount),
+                                ('credit_scores', CreditScore), ('profiles', UserProfile)):
+                model.objects.bulk_create(rows[name], batch_size=1000)
+                result.rows[name] += len(rows[name])
+            # bulk_create skips the signals that keep the rollups current.
+            rebuild_rollups(user_ids=[user.pk for user in users])
+        result.users += len(users)
+        if progress:
+            progress(result.users, count)
+
+    result.seconds = time.perf_counter() - started
+    return result
@@ -1,10 +1,37 @@
+from decimal import Decimal
+
 from rest_framework import serializers
-from .models import UserProfile, CustomUser
+from .models import UserProfile, CustomUser, Document, MonthlyTransactionRollup, Transaction
+
+CENT = Decimal('0.01')
 
 class FinancialProfileSerializer(serializers.ModelSerializer):
+    """
+    A user's financial profile (UserProfile), under the field names the frontend uses.
+    """
+    net_worth = serializers.DecimalField(source='Net_worth', max_digits=15, decimal_places=2, required=False)
+    monthly_budget = serializers.DecimalField(source='Monthly_Budget', max_digits=15, decimal_places=2, required=False)
+    total_balance = serializers.DecimalField(source='Total_Balance', max_digits=15, decimal_places=2, required=False)
+    monthly_spending = serializers.DecimalField(source='Monthly_Expenses', max_digits=15, decimal_places=2, required=False)
+    investments = serializers.DecimalField(source='Investments', max_digits=15, decimal_places=2, required=False)
+    # From the transaction rollups; the view passes the month's spending in the context.
+    spent_this_month = serializers.SerializerMethodField()
+    budget_remaining = serializers.SerializerMethodField()
+
     class Meta:
         model = UserProfile
-        fields = ['id', 'user', 'net_worth', 'monthly_budget', 'total_balance', 'monthly_spending', 'investments', 'credit_score', 'created_at', 'updated_at']
+        fields = ['id', 'user', 'net_worth', 'monthly_budget', 'total_balance', 'monthly_spending', 'investments',
+                  'spent_this_month', 'budget_remaining']
+        read_only_fields = ['user']  # Always the requesting user.
+
+    def _spent(self) -> Decimal:
+        return self.context.get('spent_this_month', Decimal('0'))
+
+    def get_spent_this_month(self, profile):
+        return str(self._spent().quantize(CENT))
+
+    def get_budget_remaining(self, profile):
+        return str((Decimal(str(profile.Monthly_Budget)) - self._spent()).quantize(CENT))
 
 class UserSerializer(serializers.ModelSerializer):
     """
@@ -50,4 +77,42 @@ class RegistrationSerializer(serializers.ModelSerializer):
         )
         user.set_password(validated_data['password'])
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+
+class TransactionSerializer(serializers.ModelSerializer):
+    """
+    Serializer for listing a user's transactions.
+    """
+    class Meta:
+        model = Transaction
+        fields = ('id', 'description', 'amount', 'transaction_type', 'category', 'date')
+
+
+class MonthlyTransactionRollupSerializer(serializers.ModelSerializer):
+    """
+    Read-only serializer for the per-month transaction totals.
+    """
+    month = serializers.DateField(format='%Y-%m')
+
+    class Meta:
+        model = MonthlyTransactionRollup
+        fields = ('month', 'category', 'transaction_type', 'total_amount', 'transaction_count')
+
+
+class DocumentSerializer(serializers.ModelSerializer):
+    """
+    Serializer for listing a user's documents, without the extracted text.
+    """
+    class Meta:
+        model = Document
+        fields = ('id', 'filename', 'content_type', 'size', 'content_hash', 'upload_date', 'status', 'error',
+                  'category', 'title', 'author', 'summary')
+
+
+class DocumentDetailSerializer(DocumentSerializer):
+    """
+    Serializer for a single document, including its extracted text.
+    """
+    class Meta(DocumentSerializer.Meta):
+        fields = DocumentSerializer.Meta.fields + ('text',)
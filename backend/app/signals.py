@@ -0,0 +1,103 @@
+"""
+Model signal handlers. Connected in AppConfig.ready().
+"""
+from django.db import transaction
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from .authentication import token_cache
+from .models import Asset, CustomUser, DataPermissions, Investment, Liability, RetirementAccount, Transaction
+from .net_worth import invalidate_net_worth
+from .permissions import permission_cache
+from .rollups import apply_transaction_change, deleting_in_bulk, rollup_entry
+from .search import repair_index
+
+
+def _entry(instance):
+    return rollup_entry(instance.user_id, instance.date, instance.category, instance.transaction_type, instance.amount)
+
+
+# --- Transaction rollups ---
+
+@receiver(pre_save, sender=Transaction)
+def remember_previous_transaction(sender, instance, **kwargs):
+    """Keeps the stored values of an updated transaction so its old rollup can be adjusted."""
+    instance._rollup_previous = None
+    if instance.pk:
+        previous = (
+            Transaction.objects.filter(pk=instance.pk)
+            .values_list('user_id', 'date', 'category', 'transaction_type', 'amount')
+            .first()
+        )
+        if previous:
+            instance._rollup_previous = rollup_entry(*previous)
+
+
+@receiver(post_save, sender=Transaction)
+def update_rollups_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return  # Fixture loading; run rebuild_transaction_rollups afterwards.
+    previous = None if created else getattr(instance, '_rollup_previous', None)
+    apply_transaction_change(previous, _entry(instance))
+
+
+@receiver(post_delete, sender=Transaction)
+def update_rollups_on_delete(sender, instance, origin=None, **kwargs):
+    if deleting_in_bulk():
+        return  # delete_transactions() adjusts the rollups once for the whole delete.
+    if isinstance(origin, CustomUser) or getattr(origin, 'model', None) is CustomUser:
+        return  # The user's rollup rows are deleted along with them.
+    apply_transaction_change(_entry(instance), None)
+
+
+# --- Net worth cache ---
+
+@receiver([post_save, post_delete], sender=Asset)
+@receiver([post_save, post_delete], sender=Liability)
+@receiver([post_save, post_delete], sender=Investment)
+@receiver([post_save, post_delete], sender=RetirementAccount)
+def invalidate_net_worth_on_change(sender, instance, **kwargs):
+    """Drops the owner's cached net worth once the change is committed."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: invalidate_net_worth(user_id))
+
+
+# --- Chat data permissions ---
+
+@receiver([post_save, post_delete], sender=DataPermissions)
+def invalidate_permissions_on_change(sender, instance, **kwargs):
+    """Drops this process's cached permissions for the user once the change is committed."""
+    user_id = instance.user_id
+    transaction.on_commit(lambda: permission_cache.invalidate(user_id))
+
+
+# --- Token authentication cache ---
+
+@receiver(post_delete, sender=Token)
+def revoke_token_on_delete(sender, instance, **kwargs):
+    """Rejects a deleted token (logout, rotation, expiry) from the cache once the delete is committed."""
+    key = instance.key
+    transaction.on_commit(lambda: token_cache.revoke(key))
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_tokens_on_user_change(sender, instance, update_fields=None, raw=False, **kwargs):
+    """Drops the cached lookups of a changed user's tokens, so e.g. deactivation applies at once."""
+    if raw or update_fields == frozenset({'last_login'}):
+        return
+    keys = list(Token.objects.filter(user_id=instance.pk).values_list('key', flat=True))
+    if keys:
+        transaction.on_commit(lambda: [token_cache.invalidate(key) for key in keys])
+
+
+# --- Search index ---
+
+@receiver(post_migrate)
+def repair_search_index(sender, using, verbosity=1, stdout=None, **kwargs):
+    """Restores FTS5 triggers dropped by a migration that rebuilt app_document or app_transaction."""
+    if sender.name != 'app':
+        return
+    repaired = repair_index(using)
+    if repaired and verbosity and stdout is not None:
+        stdout.write(f"  Restored the search triggers of {', '.join(repaired)} and reindexed them.")
@@ -0,0 +1,75 @@
+from django.core.cache import caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from app.authentication import check_token_cache, issue_token, token_cache
+from app.models import CustomUser
+
+DATABASE_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'llm_responses': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'llm-responses'},
+    'llm_reply_generations': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'llm-reply-generations'},
+    'auth_tokens': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'auth_token_cache'},
+    'net_worth': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'net_worth_cache'},
+}
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        caches['auth_tokens'].clear()
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.key = issue_token(self.user).key
+
+    def get(self, key):
+        return self.client.get('/api/portfolio/', HTTP_AUTHORIZATION=f'Token {key}').status_code
+
+    def post(self, path, key):
+        with self.captureOnCommitCallbacks(execute=True):  # Revocation happens on commit.
+            return self.client.post(path, HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_lookup_is_cached(self):
+        self.assertEqual(self.get(self.key), 200)
+        with self.assertNumQueries(2):  # The portfolio's two aggregates; no token or user query.
+            self.assertEqual(self.get(self.key), 200)
+
+    def test_logout_revokes_cached_token(self):
+        self.assertEqual(self.get(self.key), 200)
+        self.assertEqual(self.post('/api/logout/', self.key).status_code, 200)
+        self.assertEqual(self.get(self.key), 401)
+
+    def test_rotation_revokes_old_token(self):
+        self.assertEqual(self.get(self.key), 200)
+        new_key = self.post('/api/token/rotate/', self.key).json()['token']
+        self.assertEqual(self.get(self.key), 401)
+        self.assertEqual(self.get(new_key), 200)
+
+    def test_deactivation_applies_at_once(self):
+        self.assertEqual(self.get(self.key), 200)
+        self.user.is_active = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.save()
+        self.assertEqual(self.get(self.key), 401)
+
+    @override_settings(CACHES=DATABASE_CACHES)
+    def test_revocation_is_shared_through_database_cache(self):
+        call_command('createcachetable', 'auth_token_cache', verbosity=0)
+        self.assertEqual(self.get(self.key), 200)
+        caches['auth_tokens'].close()
+        del caches['auth_tokens']  # A fresh handle, as another worker would have, reads the shared entry.
+        self.assertEqual(token_cache.get(self.key)[0], self.user)
+        self.post('/api/logout/', self.key)
+        del caches['auth_tokens']
+        self.assertEqual(self.get(self.key), 401)
+
+
+class TokenCacheCheckTests(TestCase):
+    @override_settings(DEBUG=False)
+    def test_per_process_cache_fails_outside_debug(self):
+        self.assertEqual([error.id for error in check_token_cache()], ['app.E001'])
+        with self.settings(DEBUG=True):
+            self.assertEqual(check_token_cache(), [])
+
+    @override_settings(DEBUG=False, CACHES=DATABASE_CACHES)
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_token_cache(), [])
@@ -0,0 +1,50 @@
+import threading
+
+from django.test import SimpleTestCase
+
+from app.batching import MicroBatcher
+
+
+class MicroBatcherTests(SimpleTestCase):
+    def test_concurrent_requests_share_a_batch(self):
+        calls = []
+        batcher = MicroBatcher('double', lambda items: calls.append(list(items)) or [i * 2 for i in items],
+                               max_batch_size=100, max_wait=0.2)
+        results = {}
+        barrier = threading.Barrier(5)
+
+        def request(n):
+            barrier.wait()
+            results[n] = batcher.score([n, n + 100], timeout=5)
+
+        threads = [threading.Thread(target=request, args=(n,)) for n in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, {n: [n * 2, (n + 100) * 2] for n in range(5)})
+        self.assertLess(len(calls), 5)
+        self.assertEqual(sorted(item for call in calls for item in call), sorted(range(5)) + list(range(100, 105)))
+        self.assertEqual(batcher.stats()['requests'], 5)
+
+    def test_batches_respect_the_maximum_size(self):
+        calls = []
+        batcher = MicroBatcher('identity', lambda items: calls.append(len(items)) or list(items),
+                               max_batch_size=3, max_wait=0.05)
+        futures = [batcher.submit([n, n]) for n in range(4)]
+        self.assertEqual([future.result(5) for future in futures], [[n, n] for n in range(4)])
+        self.assertTrue(all(size <= 3 for size in calls), calls)
+        self.assertEqual(batcher.score([1, 2, 3, 4, 5], timeout=5), [1, 2, 3, 4, 5])  # Oversized: alone.
+
+    def test_a_bad_request_only_fails_itself(self):
+        def score(items):
+            if 'bad' in items:
+                raise ValueError('bad record')
+            return [item.upper() for item in items]
+
+        batcher = MicroBatcher('upper', score, max_batch_size=10, max_wait=0.2)
+        good, bad = batcher.submit(['a']), batcher.submit(['bad'])
+        self.assertEqual(good.result(5), ['A'])
+        with self.assertRaisesMessage(ValueError, 'bad record'):
+            bad.result(5)
+        self.assertEqual(batcher.stats()['errors'], 1)
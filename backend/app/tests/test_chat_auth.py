@@ -0,0 +1,42 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from app.authentication import issue_token
+from app.models import Conversation, CustomUser
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], OPENROUTER_API_KEY='')
+class ChatTokenAuthTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.token = issue_token(self.user)
+
+    def chat(self, path, key):
+        return self.client.post(path, {'message': 'How much did I spend?'}, content_type='application/json',
+                                HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_token_user_owns_the_conversation(self):
+        for path in ('/api/chat/', '/api/chat/async/'):
+            with self.subTest(path=path):
+                response = self.chat(path, self.token.key)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(Conversation.objects.filter(user=self.user).exists())
+                self.assertFalse(Conversation.objects.filter(user=None).exists())
+
+    async def test_stream_accepts_token(self):
+        response = await self.async_client.post('/api/chat/stream/', {'message': 'How much did I spend?'},
+                                                content_type='application/json',
+                                                headers={'Authorization': f'Token {self.token.key}'})
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertIn(b'event: done', body)
+        self.assertTrue(await Conversation.objects.filter(user=self.user).aexists())
+
+    def test_invalid_or_revoked_token_is_rejected(self):
+        key = self.token.key
+        self.token.delete()
+        for path in ('/api/chat/', '/api/chat/async/', '/api/chat/stream/'):
+            with self.subTest(path=path):
+                self.assertEqual(self.chat(path, key).status_code, 401)
+        self.assertFalse(Conversation.objects.exists())
@@ -0,0 +1,61 @@
+import json
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from app.ai import _stream_delta
+from app.models import ChatMessage, CustomUser
+
+
+def events(body: bytes) -> list:
+    """(event, data) pairs of a server-sent events body."""
+    parsed = []
+    for block in body.decode().strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.splitlines())
+        parsed.append((fields.get('event'), json.loads(fields['data'])))
+    return parsed
+
+
+async def fake_stream(prompt):
+    for chunk in ('You spent ', '42.50.'):
+        yield chunk
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class StreamChatTests(TestCase):
+    def setUp(self):
+        caches['llm_reply_generations'].clear()
+        caches['llm_responses'].clear()
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+
+    async def stream(self, message):
+        await self.async_client.aforce_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = await self.async_client.post('/api/chat/stream/', {'message': message},
+                                                content_type='application/json')
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return events(b''.join([chunk async for chunk in response.streaming_content]))
+
+    async def test_tokens_then_done_and_turn_saved(self):
+        with mock.patch('app.views.astream_openrouter_api', fake_stream):
+            received = await self.stream('What did I spend?')
+        self.assertEqual(received[:2], [(None, {'token': 'You spent '}), (None, {'token': '42.50.'})])
+        self.assertEqual(received[2][0], 'done')
+        self.assertEqual(received[2][1]['reply'], 'You spent 42.50.')
+        self.assertIn('context_tokens', received[2][1])
+        saved = [(m.role, m.content) async for m in ChatMessage.objects.order_by('id')]
+        self.assertEqual(saved, [('user', 'What did I spend?'), ('assistant', 'You spent 42.50.')])
+
+    async def test_empty_message_is_rejected(self):
+        await self.async_client.aforce_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = await self.async_client.post('/api/chat/stream/', {'message': ''}, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class StreamDeltaTests(SimpleTestCase):
+    def test_parse(self):
+        self.assertEqual(_stream_delta('data: {"choices": [{"delta": {"content": "Hi"}}]}'), 'Hi')
+        self.assertEqual(_stream_delta(': keep-alive'), '')
+        self.assertEqual(_stream_delta('data: {"choices": []}'), '')
+        self.assertEqual(_stream_delta('data: not json'), '')
+        self.assertIsNone(_stream_delta('data: [DONE]'))
@@ -0,0 +1,32 @@
+import asyncio
+
+from asgiref.sync import async_to_sync
+from django.test import SimpleTestCase
+
+from app import clients
+
+
+class AsyncClientTests(SimpleTestCase):
+    def test_client_is_reused_within_a_loop(self):
+        async def get_twice():
+            return clients.get_async_client() is clients.get_async_client()
+
+        self.assertTrue(async_to_sync(get_twice)())
+
+    def test_client_is_closed_when_its_loop_shuts_down(self):
+        async def get():
+            return clients.get_async_client()
+
+        first = async_to_sync(get)()
+        second = async_to_sync(get)()
+        self.assertIsNot(first, second)
+        self.assertTrue(first.is_closed)
+        self.assertTrue(second.is_closed)
+
+    def test_aclose_async_client(self):
+        async def close():
+            client = clients.get_async_client()
+            await clients.aclose_async_client()
+            return client.is_closed, clients.get_async_client() is not client
+
+        self.assertEqual(asyncio.run(close()), (True, True))
@@ -0,0 +1,58 @@
+import json
+from datetime import date
+
+from django.test import SimpleTestCase, override_settings
+
+from app.context_builder import OMITTED, build_chat_context, resolve_date_range, select_categories
+
+TODAY = date(2024, 6, 15)
+
+
+def data_section(prompt: str) -> dict:
+    return json.loads(prompt.split("DATA: USER'S ACCESSIBLE FINANCIAL DATA\n")[1].split('\n---\n')[0])
+
+
+class ContextBuilderTests(SimpleTestCase):
+    def test_categories_follow_the_question(self):
+        available = ['assets', 'transactions', 'investments']
+        self.assertEqual(select_categories('How much did I spend on groceries?', available), ['transactions'])
+        self.assertEqual(select_categories("What's my net worth?", available), available)
+        self.assertEqual(select_categories('Hello', available), available)
+
+    def test_date_ranges(self):
+        self.assertEqual(resolve_date_range('spending last month', TODAY), (date(2024, 5, 1), date(2024, 5, 31)))
+        self.assertEqual(resolve_date_range('in august', TODAY), (date(2023, 8, 1), date(2023, 8, 31)))
+        self.assertEqual(resolve_date_range('past 2 weeks', TODAY), (date(2024, 6, 1), TODAY))
+        self.assertIsNone(resolve_date_range('may I buy a car?', TODAY))
+
+    def test_out_of_range_dates_apply_no_filter(self):
+        for message in ('past 10000 years', 'last 99999999 days', 'last 30000 months', 'in may 0000'):
+            with self.subTest(message=message):
+                self.assertIsNone(resolve_date_range(message, TODAY))
+        self.assertEqual(resolve_date_range('past 100 years', TODAY)[0], date(1924, 7, 10))
+
+    def test_unrelated_categories_and_dates_are_left_out(self):
+        data = {
+            'assets': [{'name': 'Savings', 'value': 1000}],
+            'transactions': [{'date': '2024-05-03', 'amount': 10}, {'date': '2024-06-02', 'amount': 20}],
+        }
+        context = build_chat_context([], data, 'What did I spend last month?', today=TODAY)
+        section = data_section(context.prompt)
+        self.assertEqual(section['assets'], OMITTED)
+        self.assertEqual(section['transactions'], [{'date': '2024-05-03', 'amount': 10}])
+        self.assertEqual(section['transactions_date_range'], ['2024-05-01', '2024-05-31'])
+
+    @override_settings(PROMPT_TOKEN_BUDGET=600, PROMPT_HISTORY_SHARE=0.25)
+    def test_prompt_fits_the_budget(self):
+        transactions = [{'date': f'2024-06-{day % 28 + 1:02d}', 'description': f'Purchase number {day}',
+                         'amount': day} for day in range(500)]
+        history = [{'role': 'summary', 'content': 'Earlier chat.'}] + [
+            {'role': 'user' if i % 2 == 0 else 'assistant', 'content': 'word ' * 40} for i in range(20)
+        ]
+        context = build_chat_context(history, {'transactions': transactions}, 'What did I spend?', today=TODAY)
+        self.assertLessEqual(context.token_usage['total'], 600 + 10)  # Section joins cost a few tokens.
+        section = data_section(context.prompt)
+        self.assertLess(len(section['transactions']), 500)
+        self.assertEqual(section['transactions'][0]['date'], '2024-06-28')  # Newest kept.
+        self.assertEqual(section['truncated_categories'], ['transactions'])
+        self.assertIn('Earlier chat.', context.prompt)  # The summary survives history trimming.
@@ -0,0 +1,56 @@
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.test import TestCase, override_settings
+
+from app.ai import CONNECTION_ERROR_REPLY
+from app.conversations import SESSION_KEY, append_turn, compact_conversation, get_conversation, load_history
+from app.models import ChatMessage, Conversation, CustomUser
+
+
+@override_settings(CHAT_HISTORY_WINDOW=4, CHAT_COMPACT_THRESHOLD=6)
+class ConversationTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+
+    def test_session_holds_only_the_conversation_id(self):
+        session = {}
+        conversation = get_conversation(session, self.user)
+        self.assertEqual(session, {SESSION_KEY: conversation.pk})
+        self.assertEqual(get_conversation(session, self.user), conversation)
+        # Another user (or an anonymous visitor) with the same session gets a conversation of their own.
+        self.assertNotEqual(get_conversation(session, AnonymousUser()), conversation)
+
+    def test_history_is_summary_plus_recent_window(self):
+        conversation = Conversation.objects.create(user=self.user, summary='Earlier: rent is 900.')
+        for i in range(3):
+            ChatMessage.objects.bulk_create([ChatMessage(conversation=conversation, role='user', content=f'q{i}'),
+                                             ChatMessage(conversation=conversation, role='assistant', content=f'a{i}')])
+        history = load_history(conversation)
+        self.assertEqual(history[0], {'role': 'summary', 'content': 'Earlier: rent is 900.'})
+        self.assertEqual([m['content'] for m in history[1:]], ['q1', 'a1', 'q2', 'a2'])
+
+    def test_long_conversation_is_compacted(self):
+        conversation = Conversation.objects.create(user=self.user)
+        with mock.patch('app.conversations.schedule_compaction') as schedule:
+            for i in range(4):
+                append_turn(conversation, f'q{i}', f'a{i}')
+        schedule.assert_called_with(conversation.pk)  # 8 messages > CHAT_COMPACT_THRESHOLD.
+
+        with mock.patch('app.conversations.call_openrouter_api', return_value='Asked q0 and q1.') as llm:
+            compact_conversation(conversation.pk)
+        self.assertIn('q0', llm.call_args[0][0])
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.summary, 'Asked q0 and q1.')
+        self.assertEqual([m.content for m in conversation.messages.order_by('id')], ['q2', 'a2', 'q3', 'a3'])
+
+    def test_failed_summary_keeps_messages(self):
+        conversation = Conversation.objects.create(user=self.user)
+        with mock.patch('app.conversations.schedule_compaction'):
+            for i in range(4):
+                append_turn(conversation, f'q{i}', f'a{i}')
+        with mock.patch('app.conversations.call_openrouter_api', return_value=CONNECTION_ERROR_REPLY):
+            compact_conversation(conversation.pk)
+        self.assertEqual(conversation.messages.count(), 8)
+        conversation.refresh_from_db()
+        self.assertEqual(conversation.summary, '')
@@ -0,0 +1,66 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+
+from app.documents import extract_document
+from app.models import CustomUser, Document
+
+CONTENT = b'Payslip May 2024\nNet pay: 2,345.67\nEmployer: ACME Ltd\n'
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], OPENROUTER_API_KEY='')
+class DocumentUploadTests(TestCase):
+    def setUp(self):
+        self.storage = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.storage)
+        settings = self.settings(DOCUMENT_STORAGE_DIR=self.storage)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.other = CustomUser.objects.create_user(username='b@example.com', password='x')
+
+    def upload(self, user, content=CONTENT, name='payslip.txt'):
+        self.client.force_login(user, backend='django.contrib.auth.backends.ModelBackend')
+        return self.client.post('/api/documents/', {'file': SimpleUploadedFile(name, content)})
+
+    def stored_files(self):
+        return sorted(os.path.relpath(os.path.join(root, name), self.storage)
+                      for root, _, names in os.walk(self.storage) for name in names)
+
+    def test_same_content_is_stored_once(self):
+        first = self.upload(self.user)
+        self.assertEqual(first.status_code, 201)
+        again = self.upload(self.user, name='renamed.txt')
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.json()['id'], first.json()['id'])
+
+        other = self.upload(self.other)
+        self.assertEqual(other.status_code, 201)
+        self.assertNotEqual(other.json()['id'], first.json()['id'])
+        document = Document.objects.get(pk=first.json()['id'])
+        self.assertEqual(Document.objects.get(pk=other.json()['id']).filepath, document.filepath)
+        self.assertEqual(self.stored_files(), [document.filepath])  # One blob, no temporary files left.
+
+    def test_extraction_result_is_reused(self):
+        document = Document.objects.get(pk=self.upload(self.user, name='payslip.md').json()['id'])
+        extract_document(document.pk)
+        document.refresh_from_db()
+        self.assertEqual((document.status, document.title, document.category), ('DONE', 'Payslip May 2024', 'text'))
+        self.assertIn('Net pay: 2,345.67', document.summary)  # First lines, as the AI is not configured.
+
+        copy = self.upload(self.other).json()
+        self.assertEqual((copy['status'], copy['title']), ('DONE', 'Payslip May 2024'))
+
+    def test_oversized_upload_is_rejected(self):
+        with self.settings(DOCUMENT_UPLOAD_MAX_BYTES=16):
+            response = self.upload(self.user)
+        self.assertEqual(response.status_code, 413)
+        self.assertFalse(Document.objects.exists())
+        self.assertEqual(self.stored_files(), [])
+
+    def test_empty_upload_is_rejected(self):
+        self.assertEqual(self.upload(self.user, content=b'').status_code, 400)
+        self.assertEqual(self.stored_files(), [])
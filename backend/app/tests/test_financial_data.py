@@ -0,0 +1,49 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, override_settings
+
+from app.financial_data import FinancialSnapshotCache
+
+
+@override_settings(FINANCIAL_SNAPSHOT_TTL=60, FINANCIAL_SNAPSHOT_STALE_TTL=300)
+class FinancialSnapshotCacheTests(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.fetches = []
+        self.snapshots = FinancialSnapshotCache(fetch=self.fetch)
+        self.now = 1000.0
+        clock = mock.patch('app.financial_data.time.time', lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def fetch(self):
+        self.fetches.append(self.now)
+        return {'version': len(self.fetches)}
+
+    def test_fresh_stale_and_expired(self):
+        self.assertEqual(self.snapshots.get('u1'), {'version': 1})  # Miss: fetched inline.
+        self.now += 30
+        self.assertEqual(self.snapshots.get('u1'), {'version': 1})  # Hit.
+        self.assertEqual(len(self.fetches), 1)
+
+        self.now += 60
+        self.assertEqual(self.snapshots.get('u1'), {'version': 1})  # Stale: served, refreshed in the background.
+        self.snapshots._executor.shutdown(wait=True)
+        self.assertEqual(len(self.fetches), 2)
+        self.assertEqual(self.snapshots.get('u1'), {'version': 2})
+
+        self.now += 1000
+        self.assertEqual(self.snapshots.get('u1'), {'version': 3})  # Expired: fetched inline again.
+        stats = self.snapshots.stats()
+        self.assertEqual((stats['hits'], stats['stale_hits'], stats['misses']), (2, 1, 2))
+
+    def test_failed_fetch_is_not_cached(self):
+        snapshots = FinancialSnapshotCache(fetch=lambda: {})
+        self.assertEqual(snapshots.get('u1'), {})
+        self.assertIsNone(cache.get(snapshots._key('u1')))
+
+    def test_invalidate(self):
+        self.snapshots.get('u1')
+        self.snapshots.invalidate('u1')
+        self.assertEqual(self.snapshots.get('u1'), {'version': 2})
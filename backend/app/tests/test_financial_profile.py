@@ -0,0 +1,51 @@
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from app.authentication import issue_token
+from app.models import CustomUser, Transaction, UserProfile
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class FinancialProfileTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.other = CustomUser.objects.create_user(username='b@example.com', password='x')
+        UserProfile.objects.create(user=self.other, Net_worth=Decimal('999'))
+        self.auth = {'HTTP_AUTHORIZATION': f'Token {issue_token(self.user).key}'}
+
+    def test_requires_authentication(self):
+        self.assertEqual(self.client.get('/api/financial-profile/').status_code, 401)
+        self.assertEqual(self.client.post('/api/financial-profile/', {'net_worth': '1'}).status_code, 401)
+
+    def test_lists_only_own_profile(self):
+        self.assertEqual(self.client.get('/api/financial-profile/', **self.auth).json(), [])
+        UserProfile.objects.create(user=self.user, Net_worth=Decimal('10'))
+        body = self.client.get('/api/financial-profile/', **self.auth).json()
+        self.assertEqual([row['user'] for row in body], [self.user.pk])
+
+    def test_post_owner_is_request_user(self):
+        response = self.client.post('/api/financial-profile/', {'net_worth': '100.00', 'user': self.other.pk},
+                                    content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['user'], self.user.pk)
+        self.assertEqual(UserProfile.objects.get(user=self.user).Net_worth, Decimal('100.00'))
+        self.assertEqual(UserProfile.objects.get(user=self.other).Net_worth, Decimal('999'))
+
+    def test_post_updates_existing_profile(self):
+        UserProfile.objects.create(user=self.user, Net_worth=Decimal('10'), Monthly_Budget=Decimal('5'))
+        response = self.client.post('/api/financial-profile/', {'net_worth': '20.00'},
+                                    content_type='application/json', **self.auth)
+        self.assertEqual(response.status_code, 200)
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.Net_worth, profile.Monthly_Budget), (Decimal('20.00'), Decimal('5')))
+
+    def test_spending_this_month_comes_from_the_rollups(self):
+        UserProfile.objects.create(user=self.user, Monthly_Budget=Decimal('500'))
+        today = date.today()
+        for amount, transaction_type in (('120.50', 'EXPENSE'), ('30', 'EXPENSE'), ('1000', 'INCOME')):
+            Transaction.objects.create(user=self.user, description='t', amount=Decimal(amount), date=today,
+                                       transaction_type=transaction_type)
+        body = self.client.get('/api/financial-profile/', **self.auth).json()[0]
+        self.assertEqual((body['spent_this_month'], body['budget_remaining']), ('150.50', '349.50'))
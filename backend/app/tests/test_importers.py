@@ -0,0 +1,80 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from app.importers import StatementImportError, _Occurrences, detect_format, import_transactions
+from app.models import CustomUser, MonthlyTransactionRollup, Transaction
+
+UNSORTED_CSV = b"""date,description,amount
+2026-01-05,Coffee,-3.50
+2026-01-06,Salary,2000.00
+2026-01-05,Coffee,-3.50
+2026-01-04,Rent,-900.00
+2026-01-05,Coffee,-3.50
+"""
+
+OFX = b"""OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260110<TRNAMT>-12.00<FITID>A1<NAME>Lunch</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20260110<TRNAMT>-12.00<FITID>A2<NAME>Lunch</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+
+    def test_repeated_rows_in_an_unsorted_file_are_all_imported(self):
+        result = import_transactions(io.BytesIO(UNSORTED_CSV), 'csv', user=self.user)
+        self.assertEqual((result.created, result.duplicates, result.error_count), (5, 0, 0))
+        self.assertEqual(Transaction.objects.filter(user=self.user, description='Coffee').count(), 3)
+
+    def test_occurrences_are_counted_per_run_of_same_day_rows(self):
+        occurrences = _Occurrences()
+        numbers = [occurrences.next(1, date(2026, 1, day), 'coffee') for day in (1, 1, 2, 2, 2, 1)]
+        self.assertEqual(numbers, [(0, 0), (1, 0), (0, 0), (1, 0), (2, 0), (0, 1)])
+        self.assertEqual(occurrences._current, {1: (date(2026, 1, 1), 1, {'coffee': 1})})  # Earlier days are dropped.
+
+    def test_reimport_creates_nothing(self):
+        import_transactions(io.BytesIO(UNSORTED_CSV), 'csv', user=self.user)
+        result = import_transactions(io.BytesIO(UNSORTED_CSV), 'csv', user=self.user, batch_size=2)
+        self.assertEqual((result.created, result.duplicates), (0, 5))
+        self.assertEqual(Transaction.objects.filter(user=self.user).count(), 5)
+
+    def test_a_longer_statement_only_adds_the_new_rows(self):
+        import_transactions(io.BytesIO(UNSORTED_CSV), 'csv', user=self.user)
+        longer = UNSORTED_CSV + b"2026-01-05,Coffee,-3.50\n"
+        result = import_transactions(io.BytesIO(longer), 'csv', user=self.user)
+        self.assertEqual((result.created, result.duplicates), (1, 5))
+
+    def test_ofx_rows_are_deduplicated_by_fitid(self):
+        self.assertEqual(import_transactions(io.BytesIO(OFX), 'ofx', user=self.user).created, 2)
+        self.assertEqual(import_transactions(io.BytesIO(OFX), 'ofx', user=self.user).created, 0)
+
+    def test_invalid_rows_are_reported_and_rollups_rebuilt(self):
+        data = b"date,description,amount\n2026-02-01,Book,-20\nnot a date,Book,-1\n2026-02-02,,-1\n"
+        result = import_transactions(io.BytesIO(data), 'csv', user=self.user)
+        self.assertEqual((result.created, result.error_count), (1, 2))
+        self.assertEqual([e['row'] for e in result.errors], [3, 4])
+        rollup = MonthlyTransactionRollup.objects.get(user=self.user)
+        self.assertEqual((rollup.month, rollup.total_amount, rollup.transaction_count), (date(2026, 2, 1), Decimal('20.00'), 1))
+
+    def test_detect_format(self):
+        self.assertEqual(detect_format('march.CSV'), 'csv')
+        self.assertEqual(detect_format('march.qfx'), 'ofx')
+        with self.assertRaises(StatementImportError):
+            detect_format('march.pdf')
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ImportApiTests(TestCase):
+    def test_upload_twice(self):
+        user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.client.force_login(user, backend='django.contrib.auth.backends.ModelBackend')
+        first = self.client.post('/api/transactions/import/', {'file': io.BytesIO(UNSORTED_CSV), 'format': 'csv'})
+        second = self.client.post('/api/transactions/import/', {'file': io.BytesIO(UNSORTED_CSV), 'format': 'csv'})
+        self.assertEqual((first.status_code, first.json()['created']), (201, 5))
+        self.assertEqual((second.status_code, second.json()['duplicates']), (200, 5))
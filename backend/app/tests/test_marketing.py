@@ -0,0 +1,101 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from app import ml
+from app.batching import reset_batchers
+from app.benchmarks import synthetic_bank_marketing
+from app.models import CustomUser
+
+
+def write_dataset(directory, rows=3000, seed=0) -> Path:
+    path = Path(directory) / 'bank.csv'
+    synthetic_bank_marketing(rows, seed).to_csv(path, sep=';', index=False)
+    return path
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], MARKETING_MODEL_VERSION=None)
+class MarketingModelTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.dataset = write_dataset(cls.directory)
+        cls.records = ml.load_dataset(cls.dataset).head(5)[ml.FEATURES].astype(object).to_dict('records')
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def setUp(self):
+        model_dir = tempfile.mkdtemp(dir=self.directory)
+        settings = self.settings(MARKETING_MODEL_DIR=model_dir)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        for reset in (ml.clear_model_cache, reset_batchers):
+            reset()
+            self.addCleanup(reset)
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+    def score(self, records):
+        return self.client.post('/api/marketing/score/', {'records': records}, content_type='application/json')
+
+    def test_artifacts_are_versioned_and_scored(self):
+        self.assertEqual(self.score(self.records).status_code, 503)  # Nothing trained yet.
+        pipeline, metrics = ml.train_marketing_model(self.dataset)
+        self.assertGreater(metrics['accuracy'], 0.6)
+        self.assertEqual(ml.save_model_artifact(pipeline, metrics), 1)
+        self.assertEqual(ml.save_model_artifact(pipeline, metrics), 2)
+        self.assertEqual(ml.artifact_versions(), [1, 2])
+
+        body = self.score(self.records).json()
+        self.assertEqual(body['version'], 2)
+        expected = pipeline.predict_proba(ml.load_dataset(self.dataset).head(5)[ml.FEATURES])[:, 1]
+        for score, probability in zip(body['scores'], expected):
+            self.assertAlmostEqual(score, probability, places=5)
+
+        ml.clear_model_cache()
+        with self.settings(MARKETING_MODEL_VERSION='1'):
+            self.assertEqual(self.score(self.records).json()['version'], 1)
+
+    def test_invalid_records_are_rejected(self):
+        ml.save_model_artifact(*ml.train_marketing_model(self.dataset))
+        incomplete = [{key: value for key, value in self.records[0].items() if key != 'age'}]
+        response = self.score(incomplete)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('age', response.json()['error'])
+        self.assertEqual(self.score([dict(self.records[0], balance='lots')]).status_code, 400)
+        self.assertEqual(self.score('nope').status_code, 400)
+
+
+class MarketingTrainingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.mkdtemp()
+        cls.dataset = write_dataset(cls.directory, rows=4000, seed=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.directory)
+        super().tearDownClass()
+
+    def test_dataset_uses_compact_dtypes(self):
+        frame = ml.load_dataset(self.dataset)
+        self.assertEqual(str(frame['age'].dtype), 'int16')
+        self.assertEqual(str(frame['job'].dtype), 'category')
+        self.assertEqual(list(frame['y'].cat.categories), ml.YES_NO)
+
+    def test_chunked_training_matches_in_memory_training(self):
+        _, full = ml.train_marketing_model(self.dataset)
+        _, small_chunks = ml.train_marketing_model_incremental(self.dataset, chunk_size=500, epochs=3)
+        _, large_chunks = ml.train_marketing_model_incremental(self.dataset, chunk_size=1500, epochs=3)
+        # The held-out rows are drawn from one seeded sequence, so chunking does not change the split.
+        self.assertEqual((small_chunks['train_rows'], small_chunks['test_rows']),
+                         (large_chunks['train_rows'], large_chunks['test_rows']))
+        self.assertEqual(small_chunks['train_rows'] + small_chunks['test_rows'], 4000)
+        self.assertAlmostEqual(small_chunks['accuracy'], full['accuracy'], delta=0.05)
@@ -0,0 +1,126 @@
+import json
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from unittest import mock
+
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from app import metrics
+from app.models import CustomUser
+
+
+def sample(text, line_prefix):
+    """The value of the exposition line starting with `line_prefix`, or None."""
+    match = re.search('^' + re.escape(line_prefix) + r' (\S+)$', text, re.M)
+    return float(match.group(1)) if match else None
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], METRICS_DIR=None, METRICS_TOKEN='')
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+    def test_requests_are_counted(self):
+        labels = '{view="portfolio_api",method="GET",status="200"}'
+        before = sample(self.client.get('/metrics').content.decode(), 'http_requests_total' + labels) or 0
+        for _ in range(3):
+            self.client.get('/api/portfolio/')
+        text = self.client.get('/metrics').content.decode()
+        self.assertEqual(sample(text, 'http_requests_total' + labels), before + 3)
+        self.assertIn('# TYPE http_request_duration_seconds histogram', text)
+        count = sample(text, 'http_request_queries_count{view="portfolio_api"}')
+        self.assertEqual(sample(text, 'http_request_queries_bucket{view="portfolio_api",le="+Inf"}'), count)
+        self.assertGreaterEqual(sample(text, 'http_request_queries_sum{view="portfolio_api"}'), 2 * count)
+        self.assertIsNotNone(sample(text, 'cache_lookups_total{cache="auth_token",result="hit"}'))
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_token_is_required_when_set(self):
+        self.assertEqual(self.client.get('/metrics').status_code, 401)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+
+
+class MetricsFormatTests(SimpleTestCase):
+    def test_render(self):
+        text = metrics.render({
+            'jobs_total': {'type': 'counter', 'help': 'Jobs.', 'labels': ['name'],
+                           'samples': {json.dumps(['a "b"\n']): 2}},
+            'wait_seconds': {'type': 'histogram', 'help': 'Wait.', 'labels': [], 'buckets': [0.5, 1],
+                             'samples': {json.dumps([]): [[1, 0, 2], 7.25]}},
+        })
+        self.assertEqual(text.splitlines(), [
+            '# HELP jobs_total Jobs.',
+            '# TYPE jobs_total counter',
+            'jobs_total{name="a \\"b\\"\\n"} 2',
+            '# HELP wait_seconds Wait.',
+            '# TYPE wait_seconds histogram',
+            'wait_seconds_bucket{le="0.5"} 1',
+            'wait_seconds_bucket{le="1.0"} 1',
+            'wait_seconds_bucket{le="+Inf"} 3',
+            'wait_seconds_sum 7.25',
+            'wait_seconds_count 3',
+        ])
+
+    def test_snapshots_of_other_processes_are_summed(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        key = json.dumps(['llm', 'timeout'])
+        other = {'upstream_errors_total': {'type': 'counter', 'help': 'Failed calls.', 'labels': ['upstream', 'reason'],
+                                           'samples': {key: 5}}}
+        Path(directory, '1-1.json').write_text(json.dumps(other))
+        Path(directory, '2-1.json').write_text('{"truncated')  # Being replaced; skipped.
+        # A separate flusher, so the process-wide one does not keep writing to the removed directory.
+        with self.settings(METRICS_DIR=directory, METRICS_FLUSH_INTERVAL=3600), \
+                mock.patch.object(metrics, '_flusher', metrics._Flusher()):
+            own = metrics.upstream_errors.value(upstream='llm', reason='timeout')
+            merged = metrics.aggregated_snapshot()
+        self.assertEqual(merged['upstream_errors_total']['samples'][key], own + 5)
+
+
+class _Cache(metrics.CacheStatsMixin):
+    STATS = ('hits', 'stale_hits', 'misses', 'errors')
+    HIT_STATS = ('hits', 'stale_hits')
+
+
+class HelperTests(SimpleTestCase):
+    def test_cache_stats(self):
+        cache = _Cache()
+        for name in ('hits', 'stale_hits', 'misses', 'misses', 'errors'):
+            cache._count(name)
+        self.assertEqual(cache.stats(), {'hits': 1, 'stale_hits': 1, 'misses': 2, 'errors': 1, 'hit_ratio': 0.5})
+        cache.reset_stats()
+        self.assertEqual(cache.stats()['hit_ratio'], 0.0)
+
+    def test_background_tasks_run_once_per_pending_key(self):
+        started, release, calls = threading.Event(), threading.Event(), []
+
+        def work(key):
+            calls.append(key)
+            started.set()
+            release.wait(5)
+            raise RuntimeError("logged, not raised")
+
+        tasks = metrics.BackgroundTasks(work, 'test-tasks')
+        self.assertTrue(tasks.schedule('a'))
+        started.wait(5)
+        self.assertFalse(tasks.schedule('a'))  # Still running.
+        with self.assertLogs('app.metrics', 'ERROR'):
+            release.set()
+            tasks.shutdown()
+        self.assertEqual(calls, ['a'])
+
+    def test_broken_collector_is_logged_and_skipped(self):
+        def broken():
+            raise RuntimeError("collector failed")
+
+        with mock.patch.object(metrics, '_collectors', [broken]):
+            with self.assertLogs('app.metrics', 'ERROR') as logs:
+                snapshot = metrics.snapshot()
+        self.assertIn('broken', logs.output[0])
+        self.assertIn('http_requests_total', snapshot)
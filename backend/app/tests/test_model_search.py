@@ -0,0 +1,53 @@
+import shutil
+import tempfile
+import warnings
+from pathlib import Path
+
+from django.test import SimpleTestCase
+
+from app import model_search
+from app.ml import FEATURES, load_dataset, target_labels
+from app.benchmarks import synthetic_bank_marketing
+
+
+class ModelSearchTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings = self.settings(MARKETING_MODEL_DIR=directory)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.dataset = Path(directory) / 'bank.csv'
+        synthetic_bank_marketing(1500, seed=2).to_csv(self.dataset, sep=';', index=False)
+
+    def test_candidates(self):
+        self.assertEqual(len(model_search.candidates('grid')), 16)
+        drawn = model_search.candidates('random', n_iter=6)
+        self.assertEqual(drawn, model_search.candidates('random', n_iter=6))  # Seeded, so re-runs hit the cache.
+        self.assertTrue(all(1e-3 <= params['classifier__C'] <= 1e2 for params in drawn))
+
+    def test_scores_are_cached_per_candidate(self):
+        grid = model_search.candidates('grid')
+        first = [grid[0]]
+        rows = model_search.search(self.dataset, first, folds=3, n_jobs=1)
+        self.assertFalse(rows[0]['cached'])
+        self.assertTrue(0.5 < rows[0]['roc_auc'] <= 1.0)
+
+        second = first + [grid[-1]]
+        rows = model_search.search(self.dataset, second, folds=3, n_jobs=1)
+        self.assertEqual(sorted(row['cached'] for row in rows), [False, True])
+        self.assertGreaterEqual(rows[0]['roc_auc'], rows[1]['roc_auc'])  # Best first.
+
+        synthetic_bank_marketing(1500, seed=3).to_csv(self.dataset, sep=';', index=False)
+        rows = model_search.search(self.dataset, first, folds=3, n_jobs=1)
+        self.assertFalse(rows[0]['cached'])  # New data, new cache.
+
+    def test_grid_fits_without_deprecation_warnings(self):
+        df = load_dataset(self.dataset)
+        X, y = df[FEATURES], target_labels(df)
+        train, test = list(range(0, len(y), 2)), list(range(1, len(y), 2))
+        with warnings.catch_warnings():
+            warnings.filterwarnings('error', category=FutureWarning)  # scikit-learn's deprecations.
+            warnings.filterwarnings('error', message='Inconsistent values')
+            for params in model_search.candidates('grid'):
+                model_search._score_fold(X, y, train, test, params)
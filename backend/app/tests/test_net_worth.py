@@ -0,0 +1,77 @@
+from decimal import Decimal
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from app.models import Asset, CustomUser, Investment, Liability, RetirementAccount
+from app.net_worth import check_net_worth_cache, compute_net_worth, get_net_worth
+
+SHARED_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'net_worth': {'BACKEND': 'django.core.cache.backends.db.DatabaseCache', 'LOCATION': 'net_worth_cache'},
+}
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class NetWorthTests(TestCase):
+    def setUp(self):
+        caches['net_worth'].clear()
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+    def test_components(self):
+        Asset.objects.create(user=self.user, name='Bank', asset_type='BANK', current_value=Decimal('1000.10'))
+        Asset.objects.create(user=self.user, name='Home', asset_type='PROPERTY', current_value=Decimal('50000.00'))
+        Investment.objects.create(user=self.user, name='Fund', investment_type='MUTUAL_FUND',
+                                  quantity=Decimal('3.333333'), current_value_per_unit=Decimal('30.03'))
+        RetirementAccount.objects.create(user=self.user, current_balance=Decimal('200.00'))
+        Liability.objects.create(user=self.user, name='Card', liability_type='CREDIT_CARD', amount_owed=Decimal('300.55'))
+        totals = compute_net_worth(self.user.pk)
+        self.assertEqual(totals['assets'], Decimal('51000.10'))
+        self.assertEqual(totals['liquid_assets'], Decimal('1000.10'))
+        self.assertEqual(totals['investments'], Decimal('100.10'))  # 99.99999...9 rounds to the cent.
+        self.assertEqual(totals['net_worth'], Decimal('51000.10') + Decimal('100.10') + Decimal('200.00') - Decimal('300.55'))
+
+    def test_one_query(self):
+        Asset.objects.create(user=self.user, name='Bank', asset_type='BANK', current_value=Decimal('10.00'))
+        for price in ('0.10', '0.20'):
+            Investment.objects.create(user=self.user, name='Coin', investment_type='CRYPTO',
+                                      quantity=Decimal('0.333333'), current_value_per_unit=Decimal(price))
+        with self.assertNumQueries(1):
+            totals = compute_net_worth(self.user.pk)
+        self.assertEqual(totals['investments'], Decimal('0.10'))  # 0.0333333 + 0.0666666, summed exactly.
+
+    def test_investments_are_exact_and_match_the_portfolio(self):
+        quantity, price = Decimal('999999999.999999'), Decimal('9999999999999.99')
+        for _ in range(3):
+            Investment.objects.create(user=self.user, name='Big', investment_type='STOCK',
+                                      quantity=quantity, current_value_per_unit=price)
+        exact = (3 * quantity * price).quantize(Decimal('0.01'))
+        self.assertEqual(compute_net_worth(self.user.pk)['investments'], exact)
+        self.assertEqual(self.client.get('/api/net-worth/').json()['investments'],
+                         self.client.get('/api/portfolio/').json()['total'])
+
+    def test_cache_is_invalidated_on_change(self):
+        asset = Asset.objects.create(user=self.user, name='Bank', asset_type='BANK', current_value=Decimal('10.00'))
+        self.assertEqual(get_net_worth(self.user.pk)['assets'], Decimal('10.00'))
+        asset.current_value = Decimal('25.00')
+        with self.captureOnCommitCallbacks(execute=True):
+            asset.save()
+        self.assertEqual(get_net_worth(self.user.pk)['assets'], Decimal('25.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            asset.delete()
+        self.assertEqual(get_net_worth(self.user.pk)['net_worth'], Decimal('0.00'))
+
+
+class NetWorthCacheCheckTests(TestCase):
+    @override_settings(DEBUG=False)
+    def test_per_process_cache_fails_outside_debug(self):
+        self.assertEqual([error.id for error in check_net_worth_cache()], ['app.E002'])
+        with self.settings(DEBUG=True):
+            self.assertEqual(check_net_worth_cache(), [])
+        with self.settings(NET_WORTH_CACHE_TTL=0):
+            self.assertEqual(check_net_worth_cache(), [])
+
+    @override_settings(DEBUG=False, CACHES=SHARED_CACHES)
+    def test_shared_cache_passes(self):
+        self.assertEqual(check_net_worth_cache(), [])
@@ -0,0 +1,31 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from app.authentication import issue_token
+from app.models import CustomUser
+from app.permissions import SESSION_KEY, get_permissions
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class UpdatePermissionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.token = issue_token(self.user)
+
+    def update(self, key, **data):
+        return self.client.post('/api/update-permissions/', data, content_type='application/json',
+                                HTTP_AUTHORIZATION=f'Token {key}')
+
+    def test_token_user_permissions_are_stored(self):
+        for has_access in (True, False):
+            with self.captureOnCommitCallbacks(execute=True):  # The cached mask is dropped on commit.
+                response = self.update(self.token.key, category='transactions', has_access=has_access)
+            self.assertEqual(response.status_code, 200)
+            self.assertIs(get_permissions(self.user, {})['transactions'], has_access)
+        self.assertNotIn(SESSION_KEY, self.client.session.keys())  # Not stored as an anonymous session's.
+
+    def test_revoked_token_is_rejected(self):
+        key = self.token.key
+        self.token.delete()
+        self.assertEqual(self.update(key, category='transactions', has_access=True).status_code, 401)
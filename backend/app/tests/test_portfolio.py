@@ -0,0 +1,35 @@
+from decimal import Decimal
+
+from django.test import TestCase, override_settings
+
+from app.models import CustomUser, Investment
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class PortfolioTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        Investment.objects.create(user=self.user, name='A', investment_type='STOCK',
+                                  quantity=Decimal('10.5'), current_value_per_unit=Decimal('100.01'))
+        Investment.objects.create(user=self.user, name='B', investment_type='CRYPTO',
+                                  quantity=Decimal('0.123456'), current_value_per_unit=Decimal('50000.00'))
+
+    def revalue(self, shocks):
+        return self.client.post('/api/portfolio/revalue/', {'shocks': shocks}, content_type='application/json')
+
+    def test_totals(self):
+        body = self.client.get('/api/portfolio/').json()
+        self.assertEqual(body['total'], '7222.91')  # 1050.105 + 6172.80, each to the cent at the end.
+        self.assertEqual(body['by_type'], {'STOCK': '1050.11', 'CRYPTO': '6172.80'})
+        self.assertEqual(Investment.objects.filter(user=self.user).total_value(), Decimal('7222.91'))
+
+    def test_revalue(self):
+        body = self.revalue({'STOCK': '-0.2', '*': '0.5'}).json()
+        self.assertEqual(body['by_type'], {'STOCK': '840.08', 'CRYPTO': '9259.20'})
+        self.assertEqual(body['change'], '2876.38')
+
+    def test_shocks_out_of_range_are_rejected(self):
+        for shocks in ({'STOCK': '1e20'}, {'STOCK': '-1.5'}, {'*': '100.01'}, {'STOCK': 'NaN'}, {'STOCK': 'x'}):
+            self.assertEqual(self.revalue(shocks).status_code, 400, shocks)
+        self.assertEqual(self.revalue({'STOCK': '-1', '*': '100'}).status_code, 200)
@@ -0,0 +1,73 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from django.test import TestCase
+
+from app.models import CustomUser, Investment
+from app.price_feed import ingest_price_feed
+
+FEED = """symbol,price,timestamp
+aapl,190.125,2024-06-01T10:00:00Z
+AAPL,195.50,2024-06-01T12:00:00Z
+AAPL,180.00,2024-06-01T11:00:00Z
+MSFT,not-a-price,2024-06-01T12:00:00Z
+BTC,65000,1717236000
+"""
+
+
+class PriceFeedTests(TestCase):
+    def setUp(self):
+        self.users = [CustomUser.objects.create_user(username=f'{name}@example.com', password='x')
+                      for name in ('a', 'b')]
+        for user in self.users:
+            Investment.objects.create(user=user, name='Apple', symbol='AAPL', investment_type='STOCK',
+                                      quantity=Decimal('2'), current_value_per_unit=Decimal('150.00'))
+        Investment.objects.create(user=self.users[0], name='Bitcoin', symbol='BTC', investment_type='CRYPTO',
+                                  quantity=Decimal('0.5'), current_value_per_unit=Decimal('60000.00'),
+                                  price_as_of=datetime(2024, 6, 2, tzinfo=timezone.utc))
+
+    def ingest(self, text, chunk_size=1):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as feed:
+            feed.write(text)
+        self.addCleanup(os.unlink, feed.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            return ingest_price_feed(feed.name, chunk_size)
+
+    def test_latest_quote_is_applied_to_every_holding(self):
+        result = self.ingest(FEED)
+        self.assertEqual(result.as_dict(), {'quotes': 4, 'invalid': 1, 'symbols': 2, 'updated': 2})
+        for holding in Investment.objects.filter(symbol='AAPL'):
+            self.assertEqual(holding.current_value_per_unit, Decimal('195.50'))
+            self.assertEqual(holding.price_as_of, datetime(2024, 6, 1, 12, tzinfo=timezone.utc))
+        # The BTC quote is older than the holding's price, so it is ignored.
+        self.assertEqual(Investment.objects.get(symbol='BTC').current_value_per_unit, Decimal('60000.00'))
+
+    def test_rerun_is_a_no_op(self):
+        self.ingest(FEED)
+        self.assertEqual(self.ingest(FEED).updated, 0)
+        self.assertEqual(self.ingest('AAPL,195.50,2024-06-02T00:00:00Z\n').updated, 0)  # Same price.
+
+    def test_net_worth_sees_new_prices(self):
+        self.client.force_login(self.users[1], backend='django.contrib.auth.backends.ModelBackend')
+        with self.settings(ALLOWED_HOSTS=['testserver']):
+            before = self.client.get('/api/net-worth/').json()
+            self.ingest(FEED)
+            after = self.client.get('/api/net-worth/').json()
+        self.assertEqual(Decimal(after['investments']) - Decimal(before['investments']), Decimal('91.00'))
+
+    def test_unchanged_price_still_advances_price_as_of(self):
+        self.ingest(FEED)
+        self.assertEqual(self.ingest('AAPL,195.50,2024-06-03T00:00:00Z\n').updated, 0)
+        holding = Investment.objects.filter(symbol='AAPL').first()
+        self.assertEqual(holding.price_as_of, datetime(2024, 6, 3, tzinfo=timezone.utc))
+        # A quote older than the last one seen, though newer than the last price change, is ignored.
+        self.assertEqual(self.ingest('AAPL,170.00,2024-06-02T00:00:00Z\n').updated, 0)
+        self.assertEqual(Investment.objects.filter(symbol='AAPL').first().current_value_per_unit, Decimal('195.50'))
+
+    def test_symbols_match_case_insensitively(self):
+        Investment.objects.filter(symbol='AAPL').update(symbol='aapl')
+        self.assertEqual(self.ingest(FEED).updated, 2)
+        self.assertEqual(set(Investment.objects.filter(symbol='aapl').values_list('current_value_per_unit', flat=True)),
+                         {Decimal('195.50')})
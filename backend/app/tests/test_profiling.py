@@ -0,0 +1,57 @@
+import re
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test import TestCase, override_settings
+
+from app.models import CustomUser
+
+TIMING = re.compile(r'^(\w+);dur=[\d.]+(?:;desc="([^"]+)")?$')
+
+
+def timings(header: str) -> dict:
+    """{metric: desc or None} from a Server-Timing header."""
+    return {match.group(1): match.group(2) for match in map(TIMING.match, header.split(', '))}
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], PROFILING_CPROFILE_SAMPLE_RATE=0)
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+    @override_settings(PROFILING_SAMPLE_RATE=1.0)
+    def test_sampled_request_reports_db_and_serialization(self):
+        response = self.client.get('/api/portfolio/')
+        metrics = timings(response['Server-Timing'])
+        self.assertEqual(list(metrics)[0], 'db')
+        self.assertRegex(metrics['db'], r'^\d+ queries$')
+        self.assertGreaterEqual(int(metrics['db'].split()[0]), 2)  # At least the portfolio's two aggregates.
+        self.assertIn('serialize', metrics)
+        self.assertEqual(list(metrics)[-1], 'total')
+
+    @override_settings(PROFILING_SAMPLE_RATE=0)
+    def test_unsampled_request_has_no_header(self):
+        self.assertNotIn('Server-Timing', self.client.get('/api/portfolio/'))
+
+    def test_slow_sampled_request_is_dumped(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_CPROFILE_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0,
+                           PROFILING_DUMP_DIR=directory):
+            self.client.get('/api/portfolio/')
+        dumps = [path.name for path in Path(directory).iterdir()]
+        self.assertEqual(len(dumps), 1)
+        self.assertRegex(dumps[0], r'-GET-api-portfolio-\d+ms\.prof$')
+
+    def test_dump_failure_is_logged(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        blocker = Path(directory) / 'file'
+        blocker.touch()  # The dump directory cannot be created over a file.
+        with self.settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_CPROFILE_SAMPLE_RATE=1.0, PROFILING_SLOW_MS=0,
+                           PROFILING_DUMP_DIR=str(blocker)):
+            with self.assertLogs('app.profiling', 'ERROR'):
+                response = self.client.get('/api/portfolio/')
+        self.assertEqual(response.status_code, 200)
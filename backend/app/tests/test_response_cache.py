@@ -0,0 +1,81 @@
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+from app.ai import CONNECTION_ERROR_REPLY
+from app.models import CustomUser
+from app.response_cache import LLMResponseCache, normalize_message
+
+
+class LLMResponseCacheTests(TestCase):
+    def setUp(self):
+        caches['llm_reply_generations'].clear()
+        caches['llm_responses'].clear()
+        self.replies = LLMResponseCache()
+
+    def test_key_ignores_case_spacing_and_trailing_punctuation(self):
+        self.assertEqual(normalize_message('  How much did I   SPEND?! '), 'how much did i spend')
+        self.assertEqual(self.replies.key_for('1', [], {'a': 1}, 'How much?'),
+                         self.replies.key_for('1', [], {'a': 1}, 'how much'))
+
+    def test_key_changes_with_data_history_and_user(self):
+        key = self.replies.key_for('1', [], {'a': 1}, 'q')
+        self.assertNotEqual(key, self.replies.key_for('1', [], {'a': 2}, 'q'))
+        self.assertNotEqual(key, self.replies.key_for('1', [{'role': 'user', 'content': 'hi'}], {'a': 1}, 'q'))
+        self.assertNotEqual(key, self.replies.key_for('2', [], {'a': 1}, 'q'))
+
+    def test_invalidate_user(self):
+        key = self.replies.key_for('1', [], {}, 'q')
+        self.replies.set(key, 'Cached')
+        other = self.replies.key_for('2', [], {}, 'q')
+        self.replies.set(other, 'Other')
+        self.replies.invalidate_user('1')
+        self.assertIsNone(self.replies.get(self.replies.key_for('1', [], {}, 'q')))
+        self.assertEqual(self.replies.get(other), 'Other')
+
+    def test_evicted_generation_does_not_revive_old_replies(self):
+        key = self.replies.key_for('1', [], {}, 'q')
+        self.replies.set(key, 'Cached')
+        self.replies.invalidate_user('1')
+        caches['llm_reply_generations'].clear()  # As if the LRU had evicted the user's generation.
+        new_key = self.replies.key_for('1', [], {}, 'q')
+        self.assertNotEqual(new_key, key)
+        self.assertIsNone(self.replies.get(new_key))
+        self.assertEqual(new_key, self.replies.key_for('1', [], {}, 'q'))
+
+    def test_error_replies_are_not_cached(self):
+        key = self.replies.key_for('1', [], {}, 'q')
+        self.replies.set(key, CONNECTION_ERROR_REPLY)
+        self.assertIsNone(self.replies.get(key))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class ChatReplyCachingTests(TestCase):
+    def setUp(self):
+        caches['llm_reply_generations'].clear()
+        caches['llm_responses'].clear()
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        patcher = mock.patch('app.views.call_openrouter_api', return_value='You spent nothing.')
+        self.llm = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def chat(self, message):
+        return self.client.post('/api/chat/', {'message': message}, content_type='application/json').json()
+
+    def test_repeated_question_skips_the_llm_until_permissions_change(self):
+        # A new conversation each time, so the history window (part of the key) stays empty.
+        self.assertEqual(self.chat('How much did I spend?')['reply'], 'You spent nothing.')
+        self.client.session.flush()
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.assertEqual(self.chat('how much did i spend')['reply'], 'You spent nothing.')
+        self.assertEqual(self.llm.call_count, 1)
+
+        # Re-granting an already granted category leaves the data as it was; only the invalidation misses.
+        self.client.post('/api/update-permissions/', {'category': 'assets', 'has_access': True},
+                         content_type='application/json')
+        self.client.session.flush()
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+        self.chat('How much did I spend?')
+        self.assertEqual(self.llm.call_count, 2)
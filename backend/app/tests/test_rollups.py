@@ -0,0 +1,83 @@
+from datetime import date
+from decimal import Decimal
+
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from app.models import CustomUser, MonthlyTransactionRollup, Transaction
+from app.data_loaders import load_transactions
+from app.rollups import rebuild_rollups
+
+
+def rollup_rows(user):
+    return sorted(
+        MonthlyTransactionRollup.objects.filter(user=user)
+        .values_list('month', 'category', 'transaction_type', 'total_amount', 'transaction_count')
+    )
+
+
+class RollupTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+
+    def add(self, amount, day, category='Groceries', transaction_type='EXPENSE'):
+        return Transaction.objects.create(user=self.user, description='t', amount=Decimal(amount), date=day,
+                                          category=category, transaction_type=transaction_type)
+
+    def assertMatchesRebuild(self):
+        incremental = rollup_rows(self.user)
+        rebuild_rollups(self.user)
+        self.assertEqual(incremental, rollup_rows(self.user))
+
+    def test_create_update_and_delete_keep_rollups_consistent(self):
+        first = self.add('10.50', date(2026, 1, 3))
+        self.add('4.25', date(2026, 1, 20))
+        self.add('100', date(2026, 2, 1), category='Salary', transaction_type='INCOME')
+        self.assertEqual(rollup_rows(self.user)[0][3:], (Decimal('14.75'), 2))
+
+        first.amount = Decimal('20.50')
+        first.save()
+        self.assertMatchesRebuild()
+        first.date = date(2026, 3, 1)
+        first.category = None
+        first.save()
+        self.assertMatchesRebuild()
+        first.delete()
+        self.assertMatchesRebuild()
+
+    def test_bulk_delete_writes_once_per_rollup_row(self):
+        for day in range(1, 21):
+            self.add('1.00', date(2026, 1, day))
+            self.add('2.00', date(2026, 2, day), category='Dining')
+        with CaptureQueriesContext(connection) as queries:
+            Transaction.objects.filter(user=self.user, date__day__gt=5).delete()
+        rollup_writes = [q for q in queries if 'app_monthlytransactionrollup' in q['sql'] and 'UPDATE' in q['sql']]
+        self.assertEqual(len(rollup_writes), 2)
+        self.assertEqual([row[3:] for row in rollup_rows(self.user)], [(Decimal('5.00'), 5), (Decimal('10.00'), 5)])
+        self.assertMatchesRebuild()
+
+    def test_bulk_delete_of_a_whole_month_removes_its_rollup_row(self):
+        self.add('1.00', date(2026, 1, 1))
+        self.add('2.00', date(2026, 2, 1))
+        Transaction.objects.filter(date__month=1).delete()
+        self.assertEqual([row[0] for row in rollup_rows(self.user)], [date(2026, 2, 1)])
+
+    def test_deleting_a_user_skips_per_row_rollup_updates(self):
+        for day in range(1, 11):
+            self.add('1.00', date(2026, 1, day))
+        with CaptureQueriesContext(connection) as queries:
+            self.user.delete()
+        self.assertFalse([q for q in queries if q['sql'].startswith('UPDATE "app_monthlytransactionrollup"')])
+        self.assertFalse(MonthlyTransactionRollup.objects.exists())
+
+    @override_settings(CHAT_TRANSACTIONS_LIMIT=3)
+    def test_chat_totals_for_a_date_range_cover_every_transaction(self):
+        for day in range(1, 11):
+            self.add('1.00', date(2025, 3, day))
+            self.add('2.00', date(2025, 4, day))
+        self.add('50', date(2025, 4, 15), category='Salary', transaction_type='INCOME')
+        data = load_transactions(self.user.pk, (date(2025, 1, 1), date(2025, 12, 31)))
+        self.assertEqual(data['monthly_totals'], {'2025-03': {'expense': 10.0}, '2025-04': {'expense': 20.0, 'income': 50.0}})
+        self.assertEqual([t['date'] for t in data['recent']], ['2025-04-15', '2025-04-10', '2025-04-09'])
+        self.assertEqual(len(load_transactions(self.user.pk)), 3)  # No range: just the newest rows.
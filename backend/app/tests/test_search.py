@@ -0,0 +1,79 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+
+from django.apps import apps
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from app import search
+from app.models import CustomUser, Document, Transaction
+from app.search import DOCUMENTS, TRANSACTIONS, repair_index, search_ids
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class SearchTests(TestCase):
+    def setUp(self):
+        search._fts5_available.clear()
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        self.other = CustomUser.objects.create_user(username='b@example.com', password='x')
+        self.mine = self.add(self.user, 'Weekly groceries at Lidl')
+        self.theirs = self.add(self.other, 'Groceries for the party')
+
+    def add(self, user, description, category='Food'):
+        return Transaction.objects.create(user=user, description=description, category=category, amount=Decimal('10'),
+                                          transaction_type='expense', date=date(2024, 5, 1))
+
+    def test_uses_fts5(self):
+        self.assertTrue(search._has_fts5())
+
+    def test_results_are_per_user(self):
+        self.assertEqual(search_ids(TRANSACTIONS, self.user.pk, 'groc'), [self.mine.pk])
+        self.assertEqual(search_ids(TRANSACTIONS, self.other.pk, 'groceries'), [self.theirs.pk])
+        self.assertEqual(search_ids(TRANSACTIONS, self.user.pk, 'party'), [])
+
+    def test_api_returns_only_own_rows(self):
+        self.client.force_login(self.other, backend='django.contrib.auth.backends.ModelBackend')
+        Document.objects.create(uploader=self.user, filename='groceries.txt', filepath='x', content_hash='a' * 64,
+                                size=1, title='Groceries receipt')
+        body = self.client.get('/api/search/', {'q': 'groceries'}).json()
+        self.assertEqual([row['id'] for row in body['transactions']], [self.theirs.pk])
+        self.assertEqual(body['documents'], [])
+
+    def test_index_follows_bulk_writes(self):
+        Transaction.objects.filter(pk=self.mine.pk).update(description='Rent for May')
+        bulk = Transaction.objects.bulk_create([
+            Transaction(user=self.user, description='Rent deposit', amount=Decimal('1'), transaction_type='expense',
+                        date=date(2024, 5, 2)),
+        ])
+        self.assertEqual(search_ids(TRANSACTIONS, self.user.pk, 'groceries'), [])
+        self.assertCountEqual(search_ids(TRANSACTIONS, self.user.pk, 'rent'), [self.mine.pk, bulk[0].pk])
+        Transaction.objects.filter(user=self.user).delete()
+        self.assertEqual(search_ids(TRANSACTIONS, self.user.pk, 'rent'), [])
+
+    def test_post_migrate_restores_dropped_triggers(self):
+        with connection.cursor() as cursor:  # What SQLite does when a migration rebuilds app_transaction.
+            for trigger in search.TRIGGERS:
+                cursor.execute(f'DROP TRIGGER {TRANSACTIONS.table}_{trigger}')
+        missed = self.add(self.user, 'Bakery on Sunday')
+        search._fts5_available.clear()
+        self.assertFalse(search._has_fts5())
+        self.assertEqual(search_ids(TRANSACTIONS, self.user.pk, 'bakery'), [missed.pk])  # The icontains fallback.
+
+        stdout = StringIO()
+        emit_post_migrate_signal(1, False, 'default', apps=apps, stdout=stdout)
+        self.assertIn(TRANSACTIONS.table, stdout.getvalue())
+        self.assertTrue(search._has_fts5())
+        self.assertEqual(search_ids(TRANSACTIONS, self.user.pk, 'bakery'), [missed.pk])  # Reindexed.
+        self.add(self.user, 'Bakery again')
+        self.assertEqual(len(search_ids(TRANSACTIONS, self.user.pk, 'bakery')), 2)
+        self.assertEqual(repair_index(), [])  # Nothing left to repair.
+        self.assertTrue(search._has_fts5())
+
+    def test_documents_index(self):
+        document = Document.objects.create(uploader=self.user, filename='payslip-2024-05.pdf', filepath='x',
+                                           content_hash='b' * 64, size=1, title='May payslip', author='ACME Ltd')
+        self.assertEqual(search_ids(DOCUMENTS, self.user.pk, 'acme'), [document.pk])
+        self.assertEqual(search_ids(DOCUMENTS, self.user.pk, '2024 payslip'), [document.pk])
+        self.assertEqual(search_ids(DOCUMENTS, self.other.pk, 'payslip'), [])
@@ -0,0 +1,37 @@
+from datetime import date
+
+from django.contrib.auth import authenticate
+from django.db.models import Count, Sum
+from django.test import TestCase
+
+from app.models import CustomUser, MonthlyTransactionRollup, Transaction, UserProfile
+from app.seeding import seed_users
+
+TODAY = date(2024, 6, 15)
+
+
+class SeedingTests(TestCase):
+    def test_seeded_users_have_consistent_data(self):
+        result = seed_users(3, transactions_per_user=40, today=TODAY)
+        self.assertEqual(result.users, 3)
+        self.assertEqual(result.rows['transactions'], 120)
+        self.assertEqual(result.rows['profiles'], 3)
+        users = CustomUser.objects.filter(username__startswith='seed')
+        self.assertEqual(users.count(), 3)
+        self.assertIsNotNone(authenticate(username='seed000000@example.com', password='password'))
+        self.assertEqual(UserProfile.objects.filter(user__in=users).count(), 3)
+        self.assertFalse(Transaction.objects.filter(date__gt=TODAY).exists())
+        # bulk_create skips the rollup signals; the rollups are rebuilt instead.
+        totals = Transaction.objects.aggregate(amount=Sum('amount'), count=Count('id'))
+        rollups = MonthlyTransactionRollup.objects.aggregate(amount=Sum('total_amount'), count=Sum('transaction_count'))
+        self.assertEqual((rollups['amount'], rollups['count']), (totals['amount'], totals['count']))
+
+    def test_same_seed_same_data_and_numbering_continues(self):
+        seed_users(2, transactions_per_user=10, seed=7, today=TODAY, prefix='a')
+        seed_users(2, transactions_per_user=10, seed=7, today=TODAY, prefix='b')
+        amounts = {prefix: list(Transaction.objects.filter(user__username__startswith=prefix)
+                                .order_by('user__username', 'date', 'amount').values_list('amount', flat=True))
+                   for prefix in 'ab'}
+        self.assertEqual(amounts['a'], amounts['b'])
+        seed_users(1, transactions_per_user=1, today=TODAY, prefix='a')
+        self.assertTrue(CustomUser.objects.filter(username='a000002@example.com').exists())
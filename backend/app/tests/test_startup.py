@@ -0,0 +1,20 @@
+import subprocess
+import sys
+
+from django.conf import settings
+from django.test import SimpleTestCase
+
+from app.management.commands.bench_import import COLD_START_SCRIPT, FORBIDDEN_MODULES
+
+LOADED_SCRIPT = COLD_START_SCRIPT + r"""
+print("LOADED=" + ",".join(sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[1:]))))
+"""
+
+
+class StartupTests(SimpleTestCase):
+    def test_startup_needs_no_network_or_ml_stack(self):
+        # COLD_START_SCRIPT makes any socket connection raise, so this also fails on import-time network I/O.
+        result = subprocess.run([sys.executable, '-c', LOADED_SCRIPT, *FORBIDDEN_MODULES],
+                                cwd=settings.BASE_DIR, capture_output=True, text=True, timeout=120)
+        self.assertEqual(result.returncode, 0, result.stderr[-2000:])
+        self.assertIn('LOADED=\n', result.stdout)
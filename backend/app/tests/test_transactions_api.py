@@ -0,0 +1,52 @@
+from datetime import date, timedelta
+
+from django.test import TestCase, override_settings
+
+from app.models import CustomUser, Transaction
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TransactionListTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user(username='a@example.com', password='x')
+        other = CustomUser.objects.create_user(username='b@example.com', password='x')
+        start = date(2026, 1, 1)
+        rows = []
+        for i in range(25):
+            # Several rows share a date, so pages have to break ties on id.
+            day = start + timedelta(days=i // 3)
+            rows.append(Transaction(user=self.user, description=f't{i}', amount=i + 1, date=day,
+                                    transaction_type='INCOME' if i % 5 == 0 else 'EXPENSE',
+                                    category='Food' if i % 2 else 'Rent'))
+        rows.append(Transaction(user=other, description='other', amount=1, date=start, transaction_type='EXPENSE'))
+        Transaction.objects.bulk_create(rows)
+        self.client.force_login(self.user, backend='django.contrib.auth.backends.ModelBackend')
+
+    def pages(self, url):
+        ids = []
+        while url:
+            body = self.client.get(url).json()
+            ids.extend(row['id'] for row in body['results'])
+            url = body['next']
+        return ids
+
+    def test_pages_cover_every_row_once_newest_first(self):
+        ids = self.pages('/api/transactions/?limit=4')
+        expected = list(Transaction.objects.filter(user=self.user).order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_filters(self):
+        ids = self.pages('/api/transactions/?limit=3&category=Food&type=expense&date_from=2026-01-03')
+        expected = list(Transaction.objects.filter(
+            user=self.user, category='Food', transaction_type='EXPENSE', date__gte=date(2026, 1, 3),
+        ).order_by('-date', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+    def test_bad_parameters(self):
+        self.assertEqual(self.client.get('/api/transactions/?type=gift').status_code, 400)
+        self.assertEqual(self.client.get('/api/transactions/?date_from=yesterday').status_code, 400)
+        self.assertEqual(self.client.get('/api/transactions/?cursor=not-a-cursor').status_code, 404)
+
+    def test_requires_login(self):
+        self.client.logout()
+        self.assertIn(self.client.get('/api/transactions/').status_code, (401, 403))
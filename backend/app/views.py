@@ -1,196 +1,287 @@
 # --- Django and REST Framework Imports ---
 from django.shortcuts import redirect
 from django.views.generic import TemplateView
-from django.http import HttpRequest, JsonResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.contrib.auth import authenticate
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
+from django.utils.crypto import constant_time_compare
 from rest_framework import status
-from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.decorators import api_view, parser_classes, permission_classes
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import FileUploadParser, MultiPartParser
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 
 # --- Local App Imports ---
-from app.models import CustomUser, UserProfile
-from .serializers import FinancialProfileSerializer, UserSerializer, RegistrationSerializer
+from .authentication import issue_token, rotate_token, token_auth
+from app.models import CustomUser, Document, Investment, Transaction, UserProfile
+from .serializers import (
+    DocumentDetailSerializer, DocumentSerializer, FinancialProfileSerializer, MonthlyTransactionRollupSerializer,
+    RegistrationSerializer, TransactionSerializer, UserSerializer,
+)
+from .ai import (
+    ERROR_REPLIES, acall_openrouter_api, astream_openrouter_api, call_openrouter_api,
+)
+from .context_builder import build_chat_context
+from .documents import DocumentError, store_upload, streamed_upload, too_large_error
+from .data_loaders import aload_accessible_data, load_accessible_data
+from .conversations import (
+    aappend_turn, aget_conversation, aload_history, append_turn, get_conversation, load_history,
+)
+from .financial_data import aget_financial_snapshot, get_financial_snapshot
+from .importers import StatementImportError, detect_format, import_transactions
+from . import metrics
+from .batching import get_batcher
+from .ml import ModelArtifactError, validate_records
+from .net_worth import get_net_worth
+from .pagination import KeysetPagination
+from .permissions import aget_permissions, get_permissions, set_permission
+from .portfolio import MAX_SHOCK, MIN_SHOCK, load_holdings, revalue
+from .response_cache import response_cache
+from .rollups import month_spending, monthly_rollups
+from .search import DOCUMENTS, TRANSACTIONS, parse_terms, search
 
 # --- Standard Library & Third-Party Imports ---
 import json
-import requests
-import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LogisticRegression
-from sklearn.metrics import accuracy_score, classification_report
+import logging
+from datetime import date
+from decimal import Decimal, InvalidOperation
 
-# --- API AND SERVICE CONFIGURATION ---
-# Get your Gemini key from Google AI Studio: https://aistudio.google.com/app/apikey
-import requests
+logger = logging.getLogger(__name__)
 
-OPENROUTER_API_KEY = "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"
-url = "https://openrouter.ai/api/v1/chat/completions"
-
-headers = {
-    "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-    "Content-Type": "application/json"
-}
-
-payload = {
-    "model": "openai/gpt-3.5-turbo",  # or another supported model
-    "messages": [
-        {"role": "user", "content": "Hello, OpenRouter!"}
-    ]
-}
+# ==============================================================================
+# --- 1. AI & Machine Learning Integration ---
+# ==============================================================================
+# The AI client lives in app/ai.py and the marketing model in app/ml.py. Neither
+# does any I/O or imports the ML stack until it is first used.
 
-response = requests.post(url, headers=headers, json=payload)
-print(response.json())
-MOCKAPI_KEY = "68c5e308a712aaca2b69c9fb"
-MOCK_API_URL = f"https://{MOCKAPI_KEY}.mockapi.io/UserProfile"
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def marketing_score_api(request):
+    """
+    Scores a batch of bank-marketing records, {"records": [{...}, ...]}, and returns
+    the subscription probability of each, in order, with the model version used.
+    """
+    records = request.data.get('records') if isinstance(request.data, dict) else None
+    if not isinstance(records, list) or not all(isinstance(record, dict) for record in records):
+        return Response({'error': 'Provide "records" as a list of objects.'}, status=status.HTTP_400_BAD_REQUEST)
+    if len(records) > settings.MARKETING_SCORE_MAX_BATCH:
+        return Response({'error': f'At most {settings.MARKETING_SCORE_MAX_BATCH} records per request.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    if not records:
+        return Response({'version': None, 'scores': []})
+    try:
+        validate_records(records)
+        # Micro-batched with other requests in this worker; see app/batching.py.
+        results = get_batcher('marketing').score(records, timeout=settings.MODEL_BATCH_TIMEOUT)
+    except (ModelArtifactError, TimeoutError) as e:
+        return Response({'error': str(e) or 'Scoring timed out.'}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    except (ValueError, TypeError) as e:
+        return Response({'error': f'Invalid records: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+    return Response({'version': results[0][0], 'scores': [score for _, score in results]})
 
 
 # ==============================================================================
-# --- 1. AI & Machine Learning Integration ---
+# --- 2. Core API Views (Authentication, Chat, Profiles) ---
 # ==============================================================================
 
-# Define your Gemini API key and endpoint here
-OPENROUTER_API_KEY = "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"
-OPENROUTER_API_URL = "https://openrouter.ai/api/v1/chat/completions"
+def _user_key(user) -> str:
+    """Cache key for per-user data and replies; anonymous users share one entry."""
+    return str(user.pk) if user.is_authenticated else 'anonymous'
+
+
+def _accessible_data(financial_data: dict, permissions: dict) -> dict:
+    return {
+        category: financial_data.get(category, {})
+        for category, has_access in permissions.items() if has_access
+    }
+
 
-def call_openrouter_api(prompt: str) -> str:
+def _chat_data(user, permissions: dict, user_message: str):
     """
-    Calls the OpenRouter API with the provided prompt and financial data.
+    The data the AI may see: a signed-in user's own rows, loaded only for the
+    granted categories the question needs; anonymous chats use the mock API
+    snapshot. None if the snapshot is unavailable.
     """
-    if not OPENROUTER_API_KEY or OPENROUTER_API_KEY == "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":
-        return "Error: OPENROUTER_API_KEY is not configured on the server."
+    if user.is_authenticated:
+        return load_accessible_data(user.pk, permissions, user_message)
+    financial_data = get_financial_snapshot(_user_key(user))
+    return _accessible_data(financial_data, permissions) if financial_data else None
 
-    payload = {"contents": [{"parts": [{"text": prompt}]}]}
-    headers = {"Content-Type": "application/json"}
 
+async def _achat_data(user, permissions: dict, user_message: str):
+    if user.is_authenticated:
+        return await aload_accessible_data(user.pk, permissions, user_message)
+    financial_data = await aget_financial_snapshot(_user_key(user))
+    return _accessible_data(financial_data, permissions) if financial_data else None
+
+
+def _reply_payload(ai_response: str, context=None) -> dict:
+    """The chat response body; includes per-section prompt token counts when a prompt was sent."""
+    payload = {'reply': ai_response}
+    if context is not None:
+        payload['context_tokens'] = context.token_usage
+    return payload
+
+
+@csrf_exempt
+@token_auth
+def chat_handler(request: HttpRequest) -> JsonResponse:
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Only POST method is allowed.'}, status=405)
+    
     try:
-        response = requests.post(OPENROUTER_API_URL, headers=headers, json=payload)
-        response.raise_for_status()  # Raise an exception for HTTP errors
-        result = response.json()
-
-        # Safely extract the text from the API response
-        if (
-            "candidates" in result and result["candidates"] and
-            "content" in result["candidates"][0] and
-            "parts" in result["candidates"][0]["content"] and
-            result["candidates"][0]["content"]["parts"]
-        ):
-            return result["candidates"][0]["content"]["parts"][0]["text"]
-        else:
-            return "Sorry, I received an unexpected response from the AI. Please try again."
+        # 1. PROCESS USER REQUEST AND PERMISSIONS
+        user_key = _user_key(request.user)
+        data = json.loads(request.body)
+        user_message = data.get('message')
+        if not user_message:
+            return JsonResponse({'status': 'error', 'message': 'Message cannot be empty.'}, status=400)
+        permissions = get_permissions(request.user, request.session)
 
-    except requests.exceptions.RequestException as e:
-        print(f"Gemini API Call Error: {e}")
-        return "Sorry, I'm having trouble connecting to the AI service right now."
+        # 2. LOAD ONLY THE GRANTED DATA THE QUESTION NEEDS
+        accessible_data = _chat_data(request.user, permissions, user_message)
+        if accessible_data is None:
+            return JsonResponse({'reply': 'Sorry, I am unable to access your financial data at the moment.'}, status=500)
 
+        # 3. LOAD THE CONVERSATION
+        conversation = get_conversation(request.session, request.user)
 
-def train_and_evaluate_marketing_model():
+        # 4. REUSE A CACHED REPLY, OR CREATE PROMPT AND CALL THE AI API
+        window = load_history(conversation)
+        cache_key = response_cache.key_for(user_key, window, accessible_data, user_message)
+        ai_response, context = response_cache.get(cache_key), None
+        if ai_response is None:
+            context = build_chat_context(window, accessible_data, user_message)
+            ai_response = call_openrouter_api(context.prompt)
+            response_cache.set(cache_key, ai_response)
+
+        # 5. APPEND THE TURN TO THE CONVERSATION
+        append_turn(conversation, user_message, ai_response)
+
+        return JsonResponse(_reply_payload(ai_response, context))
+
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
+    except Exception:
+        logger.exception("Error in chat_handler")
+        return JsonResponse({'status': 'error', 'message': 'An internal server error occurred.'}, status=500)
+
+
+@csrf_exempt
+@token_auth
+async def async_chat_handler(request: HttpRequest) -> JsonResponse:
     """
-    Utility function to train the bank marketing prediction model.
-    Note: This is a long-running task and should not be run on every web request.
-    Consider running this as a separate script or a Django management command.
+    Async version of chat_handler. Served through core_project/asgi.py, an in-flight
+    upstream call no longer holds a worker: both the mock-data fetch and the LLM call
+    await on the shared keep-alive client from app/clients.py.
     """
-    print("--- Starting Bank Marketing Model Training ---")
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Only POST method is allowed.'}, status=405)
+
     try:
-        # NOTE: Ensure 'bank-full.csv' is accessible to the Django application.
-        df = pd.read_csv('bank-full.csv', delimiter=';')
-        print("Step 1: Dataset loaded successfully.")
+        data = json.loads(request.body)
+        user_message = data.get('message')
+        if not user_message:
+            return JsonResponse({'status': 'error', 'message': 'Message cannot be empty.'}, status=400)
 
-        # Preprocessing
-        for col in ['default', 'housing', 'loan', 'y']:
-            df[col] = df[col].apply(lambda x: 1 if x == 'yes' else 0)
-        df = pd.get_dummies(df, columns=['job', 'marital', 'education', 'contact', 'month', 'poutcome'], drop_first=True)
+        user = await request.auser()
+        user_key = _user_key(user)
+        permissions = await aget_permissions(user, request.session)
+        accessible_data = await _achat_data(user, permissions, user_message)
+        if accessible_data is None:
+            return JsonResponse({'reply': 'Sorry, I am unable to access your financial data at the moment.'}, status=500)
 
-        X = df.drop('y', axis=1)
-        y = df['y']
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.3, random_state=42, stratify=y)
+        conversation = await aget_conversation(request.session, user)
+        window = await aload_history(conversation)
+        cache_key = await response_cache.akey_for(user_key, window, accessible_data, user_message)
+        ai_response, context = await response_cache.aget(cache_key), None
+        if ai_response is None:
+            context = build_chat_context(window, accessible_data, user_message)
+            ai_response = await acall_openrouter_api(context.prompt)
+            await response_cache.aset(cache_key, ai_response)
 
-        # Train and Evaluate
-        model = LogisticRegression(solver='liblinear', random_state=42)
-        model.fit(X_train, y_train)
-        predictions = model.predict(X_test)
-        accuracy = accuracy_score(y_test, predictions)
+        await aappend_turn(conversation, user_message, ai_response)
 
-        print("\n--- Model Evaluation Results ---")
-        print(f"Accuracy: {accuracy:.2f}")
-        print("\nClassification Report:\n", classification_report(y_test, predictions))
-        print("--- Model Training Complete ---")
+        return JsonResponse(_reply_payload(ai_response, context))
 
-    except FileNotFoundError:
-        print("\nERROR: 'bank-full.csv' not found.")
-    except Exception as e:
-        print(f"\nAn error occurred during model training: {e}")
+    except json.JSONDecodeError:
+        return JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
+    except Exception:
+        logger.exception("Error in async_chat_handler")
+        return JsonResponse({'status': 'error', 'message': 'An internal server error occurred.'}, status=500)
 
 
-# ==============================================================================
-# --- 2. Core API Views (Authentication, Chat, Profiles) ---
-# ==============================================================================
+def _sse(payload: dict, event: str = None) -> str:
+    """Formats one server-sent event."""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(payload)}\n\n"
+
 
 @csrf_exempt
-def chat_handler(request: HttpRequest) -> JsonResponse:
+@token_auth
+async def stream_chat_handler(request: HttpRequest):
+    """
+    Streaming version of async_chat_handler. Relays the reply as server-sent events
+    while it is generated: one {"token": ...} event per chunk, then a "done" event
+    carrying the full reply. The turn is appended to the conversation once the
+    stream completes.
+    """
     if request.method != 'POST':
         return JsonResponse({'status': 'error', 'message': 'Only POST method is allowed.'}, status=405)
-    
-    try:
-        # 1. FETCH LIVE FINANCIAL DATA FROM MOCK API
-        live_financial_data = fetch_mock_financial_data()
-        if not live_financial_data:
-             return JsonResponse({'reply': 'Sorry, I am unable to access your financial data at the moment.'}, status=500)
 
-        # 2. PROCESS USER REQUEST AND PERMISSIONS
+    try:
         data = json.loads(request.body)
         user_message = data.get('message')
         if not user_message:
             return JsonResponse({'status': 'error', 'message': 'Message cannot be empty.'}, status=400)
-        
-        permissions = request.session.get('permissions', {
-            "assets": True, "liabilities": True, "transactions": True,
-            "epf_retirement": True, "credit_score": True, "investments": True
-        })
-        chat_history = request.session.get('chat_history', [])
-
-        # 3. CONSTRUCT ACCESSIBLE DATA BASED ON PERMISSIONS
-        accessible_data = {
-            category: live_financial_data.get(category, {})
-            for category, has_access in permissions.items() if has_access
-        }
-
-        # 4. CREATE PROMPT AND CALL GEMINI API
-        prompt = f"""
-        You are a helpful and professional AI personal finance assistant. Your role is to analyze the user's financial data to answer their questions and provide actionable insights.
-        RULES:
-        1. Your knowledge is STRICTLY limited to the JSON data provided below. Do not use external knowledge.
-        2. You MUST respect the user's privacy. If a user asks about a data category that is NOT present in the provided JSON, you MUST state that you do not have access to that information and suggest they grant permission.
-        3. Provide clear, concise, and user-friendly answers.
-        ---
-        CONTEXT: PREVIOUS CONVERSATION
-        {json.dumps(chat_history, indent=2)}
-        ---
-        DATA: USER'S ACCESSIBLE FINANCIAL DATA
-        {json.dumps(accessible_data, indent=2)}
-        ---
-        Current user query: "{user_message}"
-        """
-
-        ai_response = call_openrouter_api(prompt)
-
-        # 5. UPDATE SESSION HISTORY
-        chat_history.append({"role": "user", "content": user_message})
-        chat_history.append({"role": "assistant", "content": ai_response})
-        request.session['chat_history'] = chat_history
-        request.session.modified = True
-
-        return JsonResponse({'reply': ai_response})
 
+        user = await request.auser()
+        user_key = _user_key(user)
+        permissions = await aget_permissions(user, request.session)
+        accessible_data = await _achat_data(user, permissions, user_message)
+        if accessible_data is None:
+            return JsonResponse({'reply': 'Sorry, I am unable to access your financial data at the moment.'}, status=500)
+
+        conversation = await aget_conversation(request.session, user)
+        window = await aload_history(conversation)
+        cache_key = await response_cache.akey_for(user_key, window, accessible_data, user_message)
+        cached_response = await response_cache.aget(cache_key)
     except json.JSONDecodeError:
         return JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
-    except Exception as e:
-        print(f"Error in chat_handler: {e}")
+    except Exception:
+        logger.exception("Error in stream_chat_handler")
         return JsonResponse({'status': 'error', 'message': 'An internal server error occurred.'}, status=500)
 
+    async def events():
+        context = None
+        if cached_response is not None:
+            chunks = [cached_response]
+        else:
+            chunks = []
+            context = build_chat_context(window, accessible_data, user_message)
+            async for chunk in astream_openrouter_api(context.prompt):
+                chunks.append(chunk)
+                yield _sse({'token': chunk})
+        ai_response = ''.join(chunks)
+        if cached_response is not None:
+            yield _sse({'token': ai_response})
+        elif not ERROR_REPLIES.intersection(chunks):
+            await response_cache.aset(cache_key, ai_response)
+
+        try:
+            await aappend_turn(conversation, user_message, ai_response)
+        except Exception:
+            logger.exception("Error saving chat history in stream_chat_handler")
+        yield _sse(_reply_payload(ai_response, context), event='done')
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # Disable proxy buffering (nginx).
+    return response
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -209,7 +300,7 @@ def login_user(request):
     password = request.data.get('password')
     user = authenticate(username=email, password=password)
     if user:
-        token, _ = Token.objects.get_or_create(user=user)
+        token = issue_token(user)
         return Response({
             'token': token.key,
             'user_info': UserSerializer(user).data
@@ -218,23 +309,231 @@ def login_user(request):
 
 
 @api_view(['POST', 'GET'])
-@permission_classes([AllowAny])
+@permission_classes([IsAuthenticated])
 def financial_profile_api(request):
+    """
+    The current user's financial profile. POST creates it, or updates it if the
+    user already has one; the owner is always the requesting user. This month's
+    spending and what is left of the budget come from the transaction rollups.
+    """
+    context = {'spent_this_month': month_spending(request.user)}
     if request.method == 'POST':
-        serializer = FinancialProfileSerializer(data=request.data)
+        profile = UserProfile.objects.filter(user=request.user).first()
+        serializer = FinancialProfileSerializer(profile, data=request.data, partial=profile is not None, context=context)
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+            serializer.save(user=request.user)
+            return Response(serializer.data, status=status.HTTP_201_CREATED if profile is None else status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     elif request.method == 'GET':
-        # Assuming FinancialProfile model exists and is what you want to query
-        from app.models import FinancialProfile
-        profiles = FinancialProfile.objects.all()
-        serializer = FinancialProfileSerializer(profiles, many=True)
+        profiles = UserProfile.objects.filter(user=request.user).order_by('id')
+        serializer = FinancialProfileSerializer(profiles, many=True, context=context)
         return Response(serializer.data)
 
 
+def _amounts(value):
+    """Renders Decimal amounts as strings, as DRF's DecimalField does, so no precision is lost to floats."""
+    if isinstance(value, dict):
+        return {key: _amounts(item) for key, item in value.items()}
+    return str(value) if isinstance(value, Decimal) else value
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def net_worth_api(request):
+    """
+    Returns the current user's net worth and its components (assets, liquid
+    assets, investments, retirement savings and liabilities).
+    """
+    return Response(_amounts(get_net_worth(request.user.pk)))
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def portfolio_api(request):
+    """Current value of the user's investments, in total and by investment type."""
+    holdings = Investment.objects.filter(user=request.user)
+    return Response(_amounts({'total': holdings.total_value(), 'by_type': holdings.value_by_type()}))
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def portfolio_revalue_api(request):
+    """
+    What-if revaluation of the user's investments. Expects relative price moves
+    per investment type, e.g. {"shocks": {"STOCK": "-0.2", "*": "0.05"}}, where
+    "*" applies to every type not listed.
+    """
+    shocks = request.data.get('shocks')
+    if not isinstance(shocks, dict):
+        return Response({'error': 'Provide "shocks" as an object of investment type to relative change.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        shocks = {investment_type: Decimal(str(shock)) for investment_type, shock in shocks.items()}
+    except InvalidOperation:
+        shocks = None
+    if shocks is None or not all(shock.is_finite() for shock in shocks.values()):
+        return Response({'error': 'Shocks must be numbers.'}, status=status.HTTP_400_BAD_REQUEST)
+    if not all(MIN_SHOCK <= shock <= MAX_SHOCK for shock in shocks.values()):
+        return Response({'error': f'Shocks must be between {MIN_SHOCK} and {MAX_SHOCK}.'},
+                        status=status.HTTP_400_BAD_REQUEST)
+    try:
+        result = revalue(load_holdings(Investment.objects.filter(user=request.user)), shocks)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(_amounts(result))
+
+
+TRANSACTION_TYPES = {choice for choice, _ in Transaction.TRANSACTION_TYPE_CHOICES}
+
+
+def _transaction_filters(params) -> dict:
+    """ORM filters from the ?date_from, date_to, category and type query parameters."""
+    filters = {}
+    if params.get('date_from'):
+        filters['date__gte'] = date.fromisoformat(params['date_from'])
+    if params.get('date_to'):
+        filters['date__lte'] = date.fromisoformat(params['date_to'])
+    if params.get('category'):
+        filters['category'] = params['category']
+    if params.get('type'):
+        transaction_type = params['type'].upper()
+        if transaction_type not in TRANSACTION_TYPES:
+            raise ValueError(f"Unknown transaction type {params['type']!r}.")
+        filters['transaction_type'] = transaction_type
+    return filters
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def transactions_api(request):
+    """
+    Lists the current user's transactions newest first, with keyset pagination
+    (?cursor=..., ?limit=...) and optional date_from/date_to/category/type filters.
+    """
+    try:
+        filters = _transaction_filters(request.query_params)
+    except ValueError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    paginator = KeysetPagination()
+    page = paginator.paginate_queryset(Transaction.objects.filter(user=request.user, **filters), request)
+    return paginator.get_paginated_response(TransactionSerializer(page, many=True).data)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_transactions_api(request):
+    """
+    Imports a CSV or OFX bank statement uploaded as `file` for the current user.
+    The format comes from the file extension unless a `format` field is given.
+    Rows already imported from an earlier upload are skipped.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({'error': 'Upload a statement in the "file" field.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        fmt = request.data.get('format') or detect_format(upload.name)
+        result = import_transactions(upload, fmt, user=request.user)
+    except StatementImportError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(result.as_dict(), status=status.HTTP_201_CREATED if result.created else status.HTTP_200_OK)
+
+
+def _parse_month(value):
+    """Parses an optional YYYY-MM query parameter into the first day of that month."""
+    if not value:
+        return None
+    return date.fromisoformat(f"{value}-01")
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def monthly_transactions_api(request):
+    """
+    Monthly transaction totals per category and type for the current user, read from
+    the rollup table. Optional ?from=YYYY-MM&to=YYYY-MM limits the months returned.
+    """
+    try:
+        start = _parse_month(request.query_params.get('from'))
+        end = _parse_month(request.query_params.get('to'))
+    except ValueError:
+        return Response({'error': 'from/to must be in YYYY-MM format.'}, status=status.HTTP_400_BAD_REQUEST)
+    rows = monthly_rollups(request.user, start, end)
+    return Response(MonthlyTransactionRollupSerializer(rows, many=True).data)
+
+
+@streamed_upload
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+@parser_classes([MultiPartParser, FileUploadParser])
+def documents_api(request):
+    """
+    GET lists the current user's documents, newest first. POST uploads one, as
+    multipart `file` or as the raw body with a Content-Disposition filename; the
+    file is streamed to disk, and an upload the user already has returns the
+    existing document with 200. Text, title, author and summary are extracted in
+    the background: poll the document until `status` is DONE or FAILED.
+    """
+    if request.method == 'GET':
+        documents = Document.objects.filter(uploader=request.user).defer('text').order_by('-upload_date', '-id')
+        return Response(DocumentSerializer(documents, many=True).data)
+
+    try:
+        upload = request.FILES.get('file')
+    except ParseError as e:
+        upload, error = None, str(e.detail)
+    else:
+        error = 'Upload a document in the "file" field.'
+    if request.document_upload_handler.too_large:
+        return Response(too_large_error(), status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE)
+    if upload is None:
+        return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        document, created = store_upload(request.user, upload)
+    except DocumentError as e:
+        return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+    return Response(DocumentSerializer(document).data,
+                    status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def document_detail_api(request, document_id):
+    """A document of the current user, with its extracted text."""
+    document = Document.objects.filter(uploader=request.user, pk=document_id).first()
+    if document is None:
+        return Response({'error': 'Document not found.'}, status=status.HTTP_404_NOT_FOUND)
+    return Response(DocumentDetailSerializer(document).data)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def search_api(request):
+    """
+    Full-text search over the current user's documents and transactions, best
+    match first: ?q=<words> (each word also matches as a prefix), optional
+    ?type=documents|transactions and ?limit= (default 20, at most 100) per type.
+    """
+    query = request.query_params.get('q', '')
+    if not parse_terms(query):
+        return Response({'error': 'Give some words to search for in ?q=.'}, status=status.HTTP_400_BAD_REQUEST)
+    kind = request.query_params.get('type')
+    if kind not in (None, 'documents', 'transactions'):
+        return Response({'error': 'type must be documents or transactions.'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = int(request.query_params.get('limit', 20))
+    except ValueError:
+        return Response({'error': 'limit must be a number.'}, status=status.HTTP_400_BAD_REQUEST)
+    results = {'query': query}
+    if kind in (None, 'documents'):
+        documents = search(DOCUMENTS, request.user.pk, query, limit, defer=('text',))
+        results['documents'] = DocumentSerializer(documents, many=True).data
+    if kind in (None, 'transactions'):
+        transactions = search(TRANSACTIONS, request.user.pk, query, limit)
+        results['transactions'] = TransactionSerializer(transactions, many=True).data
+    return Response(results)
+
+
 # ==============================================================================
 # --- 3. Utility and Helper Views ---
 # ==============================================================================
@@ -244,22 +543,8 @@ class ReactAppView(TemplateView):
     template_name = "index.html"
 
 
-def fetch_mock_financial_data():
-    """Fetches financial data from the external mock API service."""
-    try:
-        response = requests.get(MOCK_API_URL)
-        if response.status_code == 200:
-            data = response.json()
-            if isinstance(data, list) and len(data) > 0:
-                return data[0]  # Return the first user's data object
-        print(f"Error fetching mock data: Status {response.status_code}")
-        return {}
-    except Exception as e:
-        print(f"Exception during mock data fetch: {e}")
-        return {}
-
-
 @csrf_exempt
+@token_auth
 def update_permissions(request: HttpRequest) -> JsonResponse:
     if request.method == 'POST':
         try:
@@ -269,13 +554,11 @@ def update_permissions(request: HttpRequest) -> JsonResponse:
             if category is None or has_access is None:
                 return JsonResponse({'status': 'error', 'message': 'Missing category or access status.'}, status=400)
             
-            if 'permissions' not in request.session:
-                request.session['permissions'] = {
-                    "assets": True, "liabilities": True, "transactions": True,
-                    "epf_retirement": True, "credit_score": True, "investments": True
-                }
-            request.session['permissions'][category] = bool(has_access)
-            request.session.modified = True
+            try:
+                set_permission(request.user, request.session, category, bool(has_access))
+            except ValueError as e:
+                return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+            response_cache.invalidate_user(_user_key(request.user))
             return JsonResponse({'status': 'success', 'message': f'Permissions for {category} updated.'})
         except json.JSONDecodeError:
             return JsonResponse({'status': 'error', 'message': 'Invalid JSON.'}, status=400)
@@ -302,9 +585,25 @@ def google_auth_callback(request):
 
 @api_view(['POST'])
 def logout_view(request):
-    """Logs the user out by deleting their authentication token."""
+    """Logs the user out by deleting their authentication token, which revokes it at once."""
     try:
         request.user.auth_token.delete()
     except (AttributeError, Token.DoesNotExist):
         pass
     return Response({"detail": "Successfully logged out."}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def rotate_token_api(request):
+    """Replaces the user's authentication token; the old one stops working immediately."""
+    return Response({'token': rotate_token(request.user).key})
+
+
+def metrics_view(request):
+    """Prometheus metrics, summed over all worker processes when METRICS_DIR is set (see app/metrics.py)."""
+    if settings.METRICS_TOKEN and not constant_time_compare(
+        request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'
+    ):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render(metrics.aggregated_snapshot()), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -62,6 +63,8 @@ LOGOUT_REDIRECT_URL = '/login/'
 # (Move this code after TEMPLATES definition below)
 
 MIDDLEWARE = [
+    'app.metrics.MetricsMiddleware',
+    'app.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -109,6 +112,108 @@ DATABASES = {
 }
 
 
+# Caches
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# 'llm_responses' holds AI chat replies (app/response_cache.py) and
+# 'llm_reply_generations' the per-user tokens that invalidate them. Both are
+# in-process LRUs by default; set LLM_RESPONSE_CACHE_STORAGE=db to share them between
+# workers through the database (run `python manage.py createcachetable` once).
+# 'auth_tokens' holds API token lookups and revocations (app/authentication.py); it
+# must be shared by every worker, so TOKEN_AUTH_CACHE_STORAGE=db is required with
+# DEBUG off (`manage.py check --deploy` fails otherwise).
+# 'net_worth' holds per-user net worth totals (app/net_worth.py); their invalidation
+# must also reach every worker, so NET_WORTH_CACHE_STORAGE=db is required likewise.
+
+LLM_RESPONSE_CACHE_STORAGE = os.environ.get('LLM_RESPONSE_CACHE_STORAGE', 'memory')
+TOKEN_AUTH_CACHE_STORAGE = os.environ.get('TOKEN_AUTH_CACHE_STORAGE', 'memory')
+NET_WORTH_CACHE_STORAGE = os.environ.get('NET_WORTH_CACHE_STORAGE', 'memory')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'llm_responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'llm-responses',
+        'TIMEOUT': 3600,
+        'OPTIONS': {'MAX_ENTRIES': 1000},
+    },
+    'llm_reply_generations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'llm-reply-generations',
+        'TIMEOUT': None,
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'auth_tokens': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'auth-tokens',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+    'net_worth': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'net-worth',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
+}
+if LLM_RESPONSE_CACHE_STORAGE == 'db':
+    CACHES['llm_responses'].update({
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'llm_response_cache',
+    })
+    CACHES['llm_reply_generations'].update({
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'llm_reply_generation_cache',
+    })
+if TOKEN_AUTH_CACHE_STORAGE == 'db':
+    CACHES['auth_tokens'].update({
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'auth_token_cache',
+    })
+if NET_WORTH_CACHE_STORAGE == 'db':
+    CACHES['net_worth'].update({
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'net_worth_cache',
+    })
+
+
+# Sessions hold the chat conversation id and anonymous users' permissions.
+# SESSION_BACKEND picks the engine: 'cached_db' (default) reads through the
+# default cache and only writes the database when the session changes,
+# 'signed_cookies' keeps the session in the cookie with no database access at all,
+# and 'db' is Django's plain database backend.
+
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'cached_db')
+SESSION_ENGINE = {
+    'db': 'django.contrib.sessions.backends.db',
+    'cached_db': 'django.contrib.sessions.backends.cached_db',
+    'signed_cookies': 'django.contrib.sessions.backends.signed_cookies',
+}[SESSION_BACKEND]
+
+# API tokens (app/authentication.py). The token-to-user lookup is cached in
+# TOKEN_AUTH_CACHE_ALIAS for TOKEN_AUTH_CACHE_TTL seconds (0 disables the cache);
+# deleted tokens are rejected at once by every process sharing that cache, so it
+# must be a shared backend unless DEBUG is on (see TOKEN_AUTH_CACHE_STORAGE above).
+# Tokens older than TOKEN_EXPIRY seconds are rejected and deleted (unset: tokens
+# never expire).
+TOKEN_AUTH_CACHE_ALIAS = 'auth_tokens'
+TOKEN_AUTH_CACHE_TTL = 60
+TOKEN_EXPIRY = int(os.environ.get('TOKEN_EXPIRY') or 0) or None
+
+# Signed-in users' data-sharing permissions (app/permissions.py) are cached per
+# process; other workers see a change within PERMISSIONS_CACHE_TTL seconds.
+PERMISSIONS_CACHE_TTL = 10
+PERMISSIONS_CACHE_MAX_ENTRIES = 10000
+
+# Signed-in users' chat data is read from their own rows (app/data_loaders.py),
+# one loader per granted category, run concurrently on CHAT_DATA_LOADER_WORKERS
+# threads (1 runs them inline). Prompts include at most CHAT_TRANSACTIONS_LIMIT
+# of the newest transactions in the question's date range, plus that range's
+# monthly totals from the rollups.
+CHAT_DATA_LOADER_WORKERS = 6
+CHAT_TRANSACTIONS_LIMIT = 200
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -128,6 +233,39 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Django REST Framework
+# The frontend authenticates with the token returned by /api/login/.
+
+REST_FRAMEWORK = {
+    'DEFAULT_AUTHENTICATION_CLASSES': [
+        'app.authentication.CachedTokenAuthentication',
+        'rest_framework.authentication.SessionAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'app.profiling.TimedJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+}
+
+# Metrics (app/metrics.py), served in Prometheus text format at /metrics. With
+# several worker processes set METRICS_DIR to a directory they share (emptied on
+# restart): each process writes its metrics there every METRICS_FLUSH_INTERVAL
+# seconds and the endpoint sums them. If METRICS_TOKEN is set, scrapes must send
+# "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_DIR = os.environ.get('METRICS_DIR') or None
+METRICS_FLUSH_INTERVAL = 5
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Request profiling (app/profiling.py). A PROFILING_SAMPLE_RATE share of requests
+# get a Server-Timing header (SQL, upstream calls, serialization); of those, a
+# PROFILING_CPROFILE_SAMPLE_RATE share run under cProfile, dumped to
+# PROFILING_DUMP_DIR when slower than PROFILING_SLOW_MS (sync requests only).
+PROFILING_SAMPLE_RATE = float(os.environ.get('PROFILING_SAMPLE_RATE') or (1.0 if DEBUG else 0.01))
+PROFILING_CPROFILE_SAMPLE_RATE = float(os.environ.get('PROFILING_CPROFILE_SAMPLE_RATE') or 0)
+PROFILING_SLOW_MS = 1000
+PROFILING_DUMP_DIR = os.environ.get('PROFILING_DUMP_DIR', str(BASE_DIR / 'profiles'))
+
+
 # CORS settings for local frontend
 CORS_ALLOW_CREDENTIALS = True
 CORS_ALLOWED_ORIGINS = [
@@ -163,6 +301,73 @@ STATICFILES_DIRS = [
 ]
 TEMPLATES[0]['DIRS'] = [BASE_DIR / "app" / "templates"]
 
+# AI and upstream service configuration
+# Keys are read from the environment; an empty OPENROUTER_API_KEY disables the AI chat.
+
+OPENROUTER_API_KEY = os.environ.get('OPENROUTER_API_KEY', '')
+OPENROUTER_API_URL = os.environ.get('OPENROUTER_API_URL', 'https://openrouter.ai/api/v1/chat/completions')
+OPENROUTER_MODEL = os.environ.get('OPENROUTER_MODEL', 'openai/gpt-3.5-turbo')
+MOCK_API_URL = os.environ.get('MOCK_API_URL', 'https://68c5e308a712aaca2b69c9fb.mockapi.io/UserProfile')
+
+# Per-user financial snapshot cache (app/financial_data.py), in seconds. Snapshots
+# older than the TTL are served for up to the stale window while refreshing.
+FINANCIAL_SNAPSHOT_TTL = 300
+FINANCIAL_SNAPSHOT_STALE_TTL = 3600
+
+# Per-user net worth cache (app/net_worth.py): totals are kept in NET_WORTH_CACHE_ALIAS
+# for NET_WORTH_CACHE_TTL seconds (0 disables the cache). Entries are also invalidated
+# whenever an asset, liability, investment or retirement account changes, which only
+# reaches every worker through a shared backend (see NET_WORTH_CACHE_STORAGE above).
+NET_WORTH_CACHE_ALIAS = 'net_worth'
+NET_WORTH_CACHE_TTL = 3600
+
+# Number of most recent chat messages sent to the AI as context (and used in the
+# LLM response cache key). Once a conversation holds more than
+# CHAT_COMPACT_THRESHOLD messages, older ones are summarized in the background.
+CHAT_HISTORY_WINDOW = 10
+CHAT_COMPACT_THRESHOLD = 30
+
+# Token budget for the chat prompt (app/context_builder.py) and the share of it,
+# after the instructions and query, that the conversation history may use.
+PROMPT_TOKEN_BUDGET = 3000
+PROMPT_HISTORY_SHARE = 0.3
+
+# Bank marketing model (app/ml.py). `python manage.py train_marketing_model` reads
+# the dataset and saves numbered artifacts in MARKETING_MODEL_DIR; scoring uses
+# MARKETING_MODEL_VERSION if set, otherwise the latest artifact.
+MARKETING_DATASET_PATH = os.environ.get('MARKETING_DATASET_PATH', str(BASE_DIR / 'bank-full.csv'))
+MARKETING_MODEL_DIR = os.environ.get('MARKETING_MODEL_DIR', str(BASE_DIR / 'ml_models'))
+MARKETING_MODEL_VERSION = os.environ.get('MARKETING_MODEL_VERSION') or None
+MARKETING_SCORE_MAX_BATCH = 10000
+
+# Micro-batching of model predictions (app/batching.py): concurrent requests are
+# scored together once MODEL_BATCH_MAX_SIZE items are queued or the oldest has
+# waited MODEL_BATCH_MAX_WAIT_MS. With 0, a batch is whatever queued up while the
+# previous one was scoring, which adds no latency to a lone request; raise it when
+# a predict is cheap compared to the gap between requests. Requests give up after
+# MODEL_BATCH_TIMEOUT seconds.
+MODEL_BATCH_MAX_SIZE = 1000
+MODEL_BATCH_MAX_WAIT_MS = 0
+MODEL_BATCH_TIMEOUT = 30
+
+# Outbound HTTP clients (see app/clients.py). Timeouts are in seconds.
+UPSTREAM_CONNECT_TIMEOUT = 5.0
+UPSTREAM_READ_TIMEOUT = 60.0
+UPSTREAM_MAX_CONNECTIONS = 100
+
+# Document uploads (app/documents.py). Files are streamed to DOCUMENT_STORAGE_DIR
+# while being hashed and stored once per content hash; uploads over
+# DOCUMENT_UPLOAD_MAX_BYTES are rejected. Extraction keeps at most
+# DOCUMENT_TEXT_MAX_CHARS of text and sends the first DOCUMENT_SUMMARY_INPUT_CHARS
+# of it to the AI for a summary.
+DOCUMENT_STORAGE_DIR = os.environ.get('DOCUMENT_STORAGE_DIR', str(BASE_DIR / 'documents'))
+DOCUMENT_UPLOAD_MAX_BYTES = int(os.environ.get('DOCUMENT_UPLOAD_MAX_BYTES') or 100 * 1024 * 1024)
+DOCUMENT_TEXT_MAX_CHARS = 1_000_000
+DOCUMENT_SUMMARY_INPUT_CHARS = 8000
+
+# Stored benchmark baselines used by the bench_* management commands.
+BENCHMARK_BASELINE_DIR = BASE_DIR / 'benchmarks'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
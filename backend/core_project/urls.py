@@ -5,9 +5,25 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     path('', ReactAppView.as_view(), name='react_app'),
     path('api/chat/', chat_handler, name='chat_handler'),
+    path('api/chat/async/', async_chat_handler, name='async_chat_handler'),
+    path('api/chat/stream/', stream_chat_handler, name='stream_chat_handler'),
+    path('api/transactions/', transactions_api, name='transactions_api'),
+    path('api/transactions/import/', import_transactions_api, name='import_transactions_api'),
+    path('api/transactions/monthly/', monthly_transactions_api, name='monthly_transactions_api'),
+    path('api/net-worth/', net_worth_api, name='net_worth_api'),
+    path('api/portfolio/', portfolio_api, name='portfolio_api'),
+    path('api/portfolio/revalue/', portfolio_revalue_api, name='portfolio_revalue_api'),
+    path('api/documents/', documents_api, name='documents_api'),
+    path('api/documents/<int:document_id>/', document_detail_api, name='document_detail_api'),
+    path('api/search/', search_api, name='search_api'),
+    path('api/marketing/score/', marketing_score_api, name='marketing_score_api'),
     path('api/financial-profile/', financial_profile_api, name='financial_profile_api'),
+    path('api/update-permissions/', update_permissions, name='update_permissions'),
     path('api/register/', register_api, name='register_api'),
     path('api/login/', login_user, name='login_user'),
+    path('api/logout/', logout_view, name='logout'),
+    path('api/token/rotate/', rotate_token_api, name='rotate_token_api'),
+    path('metrics', metrics_view, name='metrics'),
     path('auth/', include('social_django.urls', namespace='social')),
     re_path(r'^(?:.*)/?$', ReactAppView.as_view(), name='react_app_catchall'),
 ]
\ No newline at end of file
@@ -1,17 +1,58 @@
 import React, { useState } from 'react';
 
+// Reads the server-sent events from /api/chat/stream/ and calls onEvent(event, data)
+// for each one as it arrives.
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const rawEvent = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+
+      let event = 'message';
+      let data = '';
+      rawEvent.split('\n').forEach(line => {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) data += line.slice(5).trim();
+      });
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 function ChatBox() {
   const [message, setMessage] = useState('');
   const [reply, setReply] = useState('');
 
   const sendMessage = async () => {
-    const response = await fetch('/api/chat/', {
+    setReply('');
+    const headers = { 'Content-Type': 'application/json' };
+    const token = localStorage.getItem('authToken');
+    if (token) headers.Authorization = `Token ${token}`;
+    const response = await fetch('/api/chat/stream/', {
       method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
+      headers,
       body: JSON.stringify({ message }),
     });
-    const data = await response.json();
-    setReply(data.reply);
+
+    if (!response.ok || !response.body) {
+      const data = await response.json();
+      setReply(data.reply || data.message);
+      return;
+    }
+
+    await readEventStream(response, (event, data) => {
+      if (event === 'done') setReply(data.reply);
+      else setReply(prev => prev + data.token);
+    });
   };
 
   return (
@@ -30,4 +71,4 @@ function ChatBox() {
   );
 }
 
-export default ChatBox;
\ No newline at end of file
+export default ChatBox;
@@ -12,7 +12,9 @@ const Dashboard = () => {
     // Check for saved language preference
     const savedLanguage = localStorage.getItem('preferredLanguage') || 'en';
     // Fetch financial profile from backend
-    fetch('http://127.0.0.1:8000/api/financial-profile/')
+    fetch('http://127.0.0.1:8000/api/financial-profile/', {
+      headers: { Authorization: `Token ${localStorage.getItem('authToken')}` }
+    })
       .then(res => res.json())
       .then(data => {
         if (Array.isArray(data) && data.length > 0) {
@@ -9,15 +9,17 @@ const UserFinancialFormPage = () => {
     // Send data to backend API
     fetch("http://127.0.0.1:8000/api/financial-profile/", {
       method: "POST",
-      headers: { "Content-Type": "application/json" },
+      headers: {
+        "Content-Type": "application/json",
+        Authorization: `Token ${localStorage.getItem("authToken")}`
+      },
       body: JSON.stringify({
         net_worth: data.netWorth,
         monthly_budget: data.monthlyBudget,
         total_balance: data.totalBalance,
         monthly_spending: data.monthlySpending,
         investments: data.investments,
-        credit_score: data.creditScore,
-        user: 1 // TODO: Replace with actual user ID from auth
+        credit_score: data.creditScore
       })
     })
       .then(async (res) => {